@@ -0,0 +1,161 @@
+from typing import Optional
+from sqlalchemy import func, case, literal
+from sqlalchemy.orm import Session
+
+from models import User, Task, TaskCompletion, Enrollment
+
+# Consultas de agregación (GROUP BY) sobre las filas de task_completions.
+# Los endpoints leen los contadores mantenidos en users/tasks; estas
+# consultas son la fuente de verdad con la que se reconcilian.
+
+
+def _completed_sum():
+    return func.coalesce(func.sum(case((TaskCompletion.completed == True, 1), else_=0)), 0)
+
+
+def _rate(completed, total):
+    """Porcentaje de completado calculado en SQL (0 si no hay asignaciones)"""
+    return func.coalesce(
+        func.round(completed * literal(100.0) / func.nullif(total, 0), 2),
+        0
+    )
+
+
+def task_statistics_query(db: Session):
+    total = func.count(TaskCompletion.id)
+    completed = _completed_sum()
+    return (
+        db.query(
+            Task.id.label("task_id"),
+            Task.title.label("task_title"),
+            total.label("total_assignments"),
+            completed.label("completed"),
+            (total - completed).label("pending"),
+            _rate(completed, total).label("completion_rate"),
+            Task.created_at.label("created_at"),
+        )
+        .outerjoin(TaskCompletion, TaskCompletion.task_id == Task.id)
+        .group_by(Task.id, Task.title, Task.created_at)
+        .order_by(Task.id)
+    )
+
+
+def student_statistics_query(db: Session):
+    total = func.count(TaskCompletion.id)
+    completed = _completed_sum()
+    return (
+        db.query(
+            User.id.label("student_id"),
+            User.username.label("student_name"),
+            User.email.label("student_email"),
+            total.label("total_tasks"),
+            completed.label("completed_tasks"),
+            (total - completed).label("pending_tasks"),
+            _rate(completed, total).label("completion_rate"),
+        )
+        .outerjoin(TaskCompletion, TaskCompletion.student_id == User.id)
+        .filter(User.is_admin == False)
+        .group_by(User.id, User.username, User.email)
+        .order_by(User.id)
+    )
+
+
+def enrollment_statistics_query(db: Session, group_id: Optional[int] = None):
+    """Completaciones de cada matriculado limitadas a las tareas de su grupo"""
+    total = func.count(TaskCompletion.id)
+    completed = _completed_sum()
+    query = (
+        db.query(
+            Enrollment.group_id.label("group_id"),
+            Enrollment.student_id.label("student_id"),
+            total.label("total_tasks"),
+            completed.label("completed_tasks"),
+        )
+        .outerjoin(Task, Task.group_id == Enrollment.group_id)
+        .outerjoin(
+            TaskCompletion,
+            (TaskCompletion.task_id == Task.id) & (TaskCompletion.student_id == Enrollment.student_id)
+        )
+        .group_by(Enrollment.group_id, Enrollment.student_id)
+    )
+    if group_id is not None:
+        query = query.filter(Enrollment.group_id == group_id)
+    return query
+
+
+def completion_rate(completed: int, total: int) -> float:
+    return round(completed / total * 100, 2) if total > 0 else 0
+
+
+def task_statistics(db: Session, assigned: Optional[int] = None, group_id: Optional[int] = None):
+    """
+    Estadísticas por tarea leídas de los contadores de cada fila.
+    `assigned` sustituye al contador de asignaciones cuando se deriva (modo sparse).
+    Con `group_id` solo se leen las tareas del grupo (índice group_id, id).
+    """
+    rows = db.query(
+        Task.id, Task.title, Task.assigned_count, Task.completed_count, Task.created_at
+    )
+    if group_id is not None:
+        rows = rows.filter(Task.group_id == group_id)
+    rows = rows.order_by(Task.id)
+    stats = []
+    for row in rows:
+        total = row.assigned_count if assigned is None else assigned
+        stats.append({
+            "task_id": row.id,
+            "task_title": row.title,
+            "total_assignments": total,
+            "completed": row.completed_count,
+            "pending": total - row.completed_count,
+            "completion_rate": completion_rate(row.completed_count, total),
+            "created_at": row.created_at
+        })
+    return stats
+
+
+def student_statistics(db: Session, assigned: Optional[int] = None):
+    """
+    Estadísticas por estudiante leídas de los contadores de cada fila.
+    `assigned` sustituye al contador de asignaciones cuando se deriva (modo sparse).
+    """
+    rows = db.query(
+        User.id, User.username, User.email, User.assigned_count, User.completed_count
+    ).filter(User.is_admin == False).order_by(User.id)
+    stats = []
+    for row in rows:
+        total = row.assigned_count if assigned is None else assigned
+        stats.append({
+            "student_id": row.id,
+            "student_name": row.username,
+            "student_email": row.email,
+            "total_tasks": total,
+            "completed_tasks": row.completed_count,
+            "pending_tasks": total - row.completed_count,
+            "completion_rate": completion_rate(row.completed_count, total)
+        })
+    return stats
+
+
+def group_student_statistics(db: Session, group_id: int):
+    """
+    Estadísticas de los estudiantes de un grupo leídas de los contadores de
+    sus matrículas (clave primaria group_id, student_id)
+    """
+    rows = db.query(
+        User.id, User.username, User.email, Enrollment.assigned_count, Enrollment.completed_count
+    ).join(Enrollment, Enrollment.student_id == User.id).filter(
+        Enrollment.group_id == group_id
+    ).order_by(Enrollment.student_id)
+    return [
+        {
+            "student_id": row.id,
+            "student_name": row.username,
+            "student_email": row.email,
+            "total_tasks": row.assigned_count,
+            "completed_tasks": row.completed_count,
+            "pending_tasks": row.assigned_count - row.completed_count,
+            "completion_rate": completion_rate(row.completed_count, row.assigned_count)
+        }
+        for row in rows
+    ]
@@ -1,38 +1,52 @@
-from fastapi import FastAPI, HTTPException, status, File, UploadFile, Form, Depends
+from fastapi import FastAPI, HTTPException, status, File, UploadFile, Form, Depends, BackgroundTasks, Query, Request
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
-from passlib.context import CryptContext
-from datetime import datetime
+from sqlalchemy.orm import Session, joinedload
+from starlette.concurrency import run_in_threadpool
+from datetime import datetime, timedelta
 from typing import List, Optional
+import asyncio
 import os
-import shutil
 import uuid
 from pathlib import Path
 from fastapi import Response
 
 # Importaciones locales
-from database import get_db, SessionLocal
-from models import User, Task, TaskCompletion
+from database import get_async_db, SessionLocal, engine, async_engine, replicas, async_replicas
+from models import User, Task, TaskCompletion, TaskTombstone, Group
+from aggregates import task_statistics, student_statistics, group_student_statistics, completion_rate
+import counters
+import assignments
+import images
+import storage
+import sync
+import batch
+import export
+import groups
+import serialization
+import dashboard
+import rollups
+from static_files import ImmutableStaticFiles
+from cache import ResponseCacheMiddleware
+from pagination import paginate, set_next_cursor, NEXT_CURSOR_HEADER
+from passwords import hasher, pwd_context
+from auth import principal_cache
+from events import hub, stream, RESYNC
+import metrics
+from config import (
+    FANOUT_BACKGROUND_THRESHOLD, MAX_PAGE_SIZE, MAX_BATCH_ITEMS, ROLLUP_INTERVAL_SECONDS, TIMESERIES_MAX_POINTS,
+    DASHBOARD_CACHE_SECONDS
+)
 from schemas import (
     UserCreate, UserResponse, TaskCreate, TaskResponse, 
-    TaskCompletionResponse, TaskWithCompletions
+    TaskCompletionResponse, TaskWithCompletions, SyncResponse,
+    CompletionChange, BatchResponse, GroupResponse, EnrollmentChange, StudentDashboard
 )
 
-# Contexto de contraseñas (aún necesario para registro)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # Configuración de archivos
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
 Path(UPLOAD_DIR).mkdir(exist_ok=True)
 
-# Funciones de utilidad
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
 # Inicializar FastAPI
 app = FastAPI(
     title="Sistema de Tareas Educativas", 
@@ -40,6 +54,32 @@ app = FastAPI(
     description="API para gestión de tareas educativas con MySQL (Sin Autenticación)"
 )
 
+# Caché de respuestas de lectura (dentro de CORS para que las respuestas
+# cacheadas reciban las cabeceras CORS de cada petición)
+app.add_middleware(
+    ResponseCacheMiddleware,
+    paths=[
+        r"^/tasks$",
+        r"^/tasks/\d+$",
+        r"^/statistics/(overview|tasks|students)$",
+        (r"^/users/\d+/dashboard$", DASHBOARD_CACHE_SECONDS),
+    ],
+    # Escrituras que cambian tareas, completaciones, estudiantes o matrículas
+    write_paths=[
+        ("POST", r"^/register$"),
+        ("POST", r"^/users:import$"),
+        ("POST", r"^/tasks$"),
+        ("DELETE", r"^/tasks/\d+$"),
+        ("PUT", r"^/tasks/\d+/(complete|uncomplete)$"),
+        ("POST", r"^/completions:batch$"),
+        ("POST", r"^/groups/\d+/students$"),
+        ("DELETE", r"^/groups/\d+/students/\d+$"),
+    ],
+)
+
+# Límite de tamaño de las imágenes, antes de que se lea el formulario
+app.add_middleware(images.UploadLimitMiddleware, paths=["/tasks"])
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -47,59 +87,107 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
 
+# Métricas por petición (la más externa: mide también caché y CORS)
+app.add_middleware(metrics.MetricsMiddleware, routes=app.routes)
+
 # Endpoints de usuarios
 @app.post("/register", response_model=UserResponse)
-def register_user(
+async def register_user(
     email: str = Form(...),
     username: str = Form(...),
     password: str = Form(...),
     is_admin: bool = Form(False),
-    db: Session = Depends(get_db)
+    database = Depends(get_async_db)
 ):
-    # Verificar si el email ya existe
-    if db.query(User).filter(User.email == email).first():
-        raise HTTPException(status_code=400, detail="Email already registered")
-
-    # Verificar si el username ya existe
-    if db.query(User).filter(User.username == username).first():
-        raise HTTPException(status_code=400, detail="Username already registered")
-
-    hashed_password = get_password_hash(password)
-    db_user = User(
-        email=email,
-        username=username,
-        hashed_password=hashed_password,
-        is_admin=is_admin,
-        created_at=datetime.utcnow()
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+    def check_available(db: Session):
+        # Verificar si el email ya existe
+        if db.query(User).filter(User.email == email).first():
+            raise HTTPException(status_code=400, detail="Email already registered")
+
+        # Verificar si el username ya existe
+        if db.query(User).filter(User.username == username).first():
+            raise HTTPException(status_code=400, detail="Username already registered")
+
+    await database.run(check_available)
+    # El hash se calcula en el pool de bcrypt (503 si está saturado)
+    hashed_password = await hasher.hash(password)
+
+    def register(db: Session):
+        db_user = User(
+            email=email,
+            username=username,
+            hashed_password=hashed_password,
+            is_admin=is_admin,
+            created_at=datetime.utcnow()
+        )
+        db.add(db_user)
+        if not is_admin:
+            counters.increment(db, counters.TOTAL_STUDENTS)
+        db.commit()
+        db.refresh(db_user)
+        return UserResponse.model_validate(db_user)
+
+    user = await database.run(register)
+    principal_cache.invalidate(user.username)
+    return user
+
+@app.post("/users:import", response_model=BatchResponse)
+async def import_users(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    database = Depends(get_async_db)
+):
+    """
+    Alta masiva de usuarios desde un CSV con cabecera (email,username,password,is_admin)
+    o NDJSON. El cuerpo se procesa a medida que llega, por bloques de una
+    transacción, y se devuelve el resultado de cada fila.
+    """
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    lines = batch.read_lines(request.stream())
+    summary = await batch.run_user_import(database, lines, fmt)
+    for item in summary["results"]:
+        if item["status"] == 200:
+            principal_cache.invalidate(item["username"])
+    return summary
 
 @app.post("/logout")
-def logout(response: Response):
+async def logout(response: Response):
     # Borrar cookie de sesión (si existiera)
     response.delete_cookie(key="session")
     return {"message": "Sesión cerrada, por favor inicia sesión nuevamente"}
 
 @app.post("/login")
-def login_user(
+async def login_user(
     username: str = Form(...), 
     password: str = Form(...), 
-    db: Session = Depends(get_db)
+    database = Depends(get_async_db)
 ):
     """
     Endpoint de login simplificado - solo verifica credenciales
     """
-    user = db.query(User).filter(User.username == username).first()
-    if not user or not verify_password(password, user.hashed_password):
+    user = await database.run(lambda db: db.query(User).filter(User.username == username).first())
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await hasher.verify_and_update(password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password"
         )
+
+    # Recalcular el hash si cambió el coste de bcrypt
+    if new_hash:
+        def rehash(db: Session):
+            db.query(User).filter(User.id == user.id).update(
+                {User.hashed_password: new_hash}, synchronize_session=False
+            )
+            db.commit()
+
+        await database.run(rehash)
+        principal_cache.invalidate(user.username)
   
     return {
         "message": "Login successful",
@@ -109,51 +197,65 @@ def login_user(
     }
 
 @app.get("/users/{user_id}", response_model=UserResponse)
-def get_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def get_user(user_id: int, database = Depends(get_async_db)):
+    user = await database.run(lambda db: db.query(User).filter(User.id == user_id).first())
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 @app.get("/users", response_model=List[UserResponse])
-def get_all_users(db: Session = Depends(get_db)):
-    users = db.query(User).all()
+async def get_all_users(
+    response: Response,
+    is_admin: Optional[bool] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    database = Depends(get_async_db)
+):
+    """
+    Listado de usuarios paginado por cursor: el siguiente cursor se devuelve
+    en la cabecera X-Next-Cursor y se pasa como `after`
+    """
+    def load(db: Session):
+        query = db.query(*serialization.USER_COLUMNS) if serialization.FAST else db.query(User)
+        if is_admin is not None:
+            query = query.filter(User.is_admin == is_admin)
+        return paginate(query, [User.id], lambda u: [u.id], after, limit)
+
+    users, next_cursor = await database.run(load)
+    if serialization.FAST:
+        return serialization.json_response(serialization.user_rows(users), serialization.USER_LIST, next_cursor)
+    set_next_cursor(response, next_cursor)
     return users
 
 # Endpoints de tareas
 @app.post("/tasks", response_model=TaskResponse)
-def create_task(
+async def create_task(
+    background_tasks: BackgroundTasks,
     title: str = Form(...),
     description: str = Form(...),
     due_date: Optional[str] = Form(None),
     image: UploadFile = File(...),
     creator_id: int = Form(...),  # Ahora se pasa el ID del creador directamente
-    db: Session = Depends(get_db)
+    group_id: Optional[int] = Form(None),  # Sin grupo: todos los estudiantes
+    background_assignment: bool = Form(False),
+    database = Depends(get_async_db)
 ):
     # Verificar que el creador existe y es admin
-    creator = db.query(User).filter(User.id == creator_id).first()
+    creator = await database.run(lambda db: db.query(User).filter(User.id == creator_id).first())
     if not creator:
         raise HTTPException(status_code=404, detail="Creator user not found")
   
     if not creator.is_admin:
         raise HTTPException(status_code=403, detail="Only admins can create tasks")
 
+    if group_id is not None:
+        groups.require_eager()
+
     # Validar tipo de archivo
     allowed_types = ["image/jpeg", "image/png", "image/jpg"]
     if image.content_type not in allowed_types:
         raise HTTPException(status_code=400, detail="Only JPEG and PNG images are allowed")
 
-    # Guardar imagen con nombre único
-    file_extension = image.filename.split(".")[-1] if image.filename else "jpg"
-    file_name = f"task_{uuid.uuid4().hex}.{file_extension}"
-    file_path = os.path.join(UPLOAD_DIR, file_name)
-
-    try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail="Error saving image")
-
     # Convertir fecha si se proporciona
     due_date_obj = None
     if due_date:
@@ -162,208 +264,646 @@ def create_task(
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid date format")
 
-    # Crear tarea
-    db_task = Task(
-        title=title,
-        description=description,
-        image_path=f"/uploads/{file_name}",
-        due_date=due_date_obj,
-        creator_id=creator_id
-    )
-    db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
-
-    # Crear TaskCompletion para todos los estudiantes
-    students = db.query(User).filter(User.is_admin == False).all()
-    for student in students:
-        task_completion = TaskCompletion(
-            task_id=db_task.id,
-            student_id=student.id,
-            completed=False,
-            created_at=datetime.utcnow()
+    # Guardar imagen por contenido: el SHA-256 se calcula mientras se copia
+    # y las imágenes repetidas se guardan una sola vez
+    file_extension = "png" if image.content_type == "image/png" else "jpg"
+    temp_path = os.path.join(UPLOAD_DIR, f".upload_{uuid.uuid4().hex}.tmp")
+
+    try:
+        size, sha256 = await run_in_threadpool(images.copy_with_limit, image.file, temp_path)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Error saving image")
+    file_name = storage.blob_name(sha256, file_extension)
+    # La copia temporal se mueve al almacén dentro de create(); si la petición
+    # falla antes, se borra al final
+    written = False
+    assigned = 0
+
+    def create(db: Session):
+        nonlocal written, assigned
+        group = None
+        if group_id is not None:
+            group = groups.get_group(db, group_id)
+            if group.owner_id != creator_id:
+                raise HTTPException(status_code=403, detail="Only the group owner can assign tasks to it")
+
+        # Crear tarea
+        db_task = Task(
+            title=title,
+            description=description,
+            image_path=storage.get_storage().url(file_name),
+            due_date=due_date_obj,
+            creator_id=creator_id,
+            group_id=group_id
         )
-        db.add(task_completion)
-  
-    db.commit()
-    return db_task
+        db.add(db_task)
+        db.flush()
+        # Con la fila del blob bloqueada (o recién creada) gc no puede borrar el
+        # fichero: ya se puede decidir si se reutiliza el existente
+        created = storage.add_reference(db, file_name, size)
+        try:
+            written = storage.store_upload(temp_path, file_name, reuse=not created)
+        except Exception:
+            raise HTTPException(status_code=500, detail="Error saving image")
+        counters.increment(db, counters.TOTAL_TASKS)
+
+        # Crear TaskCompletion para los estudiantes (todos o los del grupo): en la
+        # misma transacción o, para cohortes grandes, en segundo plano
+        if group is not None:
+            total_students = group.student_count
+        else:
+            total_students = counters.read_all(db)[counters.TOTAL_STUDENTS]
+        assigned = total_students
+        if not assignments.SPARSE and (background_assignment or total_students > FANOUT_BACKGROUND_THRESHOLD):
+            db_task.assignment_status = assignments.STATUS_PENDING
+            db.commit()
+            background_tasks.add_task(assignments.run_fan_out_job, db_task.id)
+        else:
+            assignments.fan_out(db, db_task.id, group_id)
+            db.commit()
+
+        db.refresh(db_task)
+        return TaskResponse.model_validate(db_task)
+
+    try:
+        task = await database.run(create)
+    finally:
+        Path(temp_path).unlink(missing_ok=True)
+
+    # Miniatura, tamaño medio y WebP se generan fuera de la petición
+    local_path = storage.get_storage().local_path(file_name)
+    if written and local_path:
+        images.schedule_variants(local_path)
+
+    hub.publish(
+        "task_created", task_id=task.id, group_id=group_id,
+        title=task.title, created_at=task.created_at, assigned=assigned
+    )
+    return task
+
+@app.delete("/tasks/{task_id}")
+async def delete_task(
+    task_id: int,
+    user_id: int,
+    database = Depends(get_async_db)
+):
+    """
+    Borrar una tarea y sus completaciones; su imagen pierde una referencia
+    y se elimina con `python storage.py gc` cuando ya nadie la usa
+    """
+    def delete(db: Session):
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        if not user.is_admin:
+            raise HTTPException(status_code=403, detail="Only admins can delete tasks")
+
+        task = db.query(Task).filter(Task.id == task_id).with_for_update().first()
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+
+        counters.remove_task(db, task)
+        storage.release_reference(db, task.image_path)
+        db.query(TaskCompletion).filter(TaskCompletion.task_id == task_id).delete(synchronize_session=False)
+        db.query(Task).filter(Task.id == task_id).delete(synchronize_session=False)
+        db.add(TaskTombstone(task_id=task_id))
+        db.commit()
+
+    await database.run(delete)
+    hub.publish("task_deleted", task_id=task_id)
+    return {"message": "Task deleted"}
+
+@app.get("/tasks/{task_id}/assignment")
+async def get_task_assignment_status(task_id: int, database = Depends(get_async_db)):
+    """
+    Estado de la creación de completaciones de una tarea
+    """
+    task = await database.run(lambda db: db.query(Task).filter(Task.id == task_id).first())
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    return {
+        "task_id": task.id,
+        "status": task.assignment_status,
+        "assigned_count": task.assigned_count
+    }
 
 @app.get("/tasks", response_model=List[TaskResponse])
-def get_all_tasks(db: Session = Depends(get_db)):
-    tasks = db.query(Task).all()
+async def get_all_tasks(
+    response: Response,
+    creator_id: Optional[int] = None,
+    group_id: Optional[int] = None,
+    due_from: Optional[datetime] = None,
+    due_to: Optional[datetime] = None,
+    sort: str = Query("id", pattern="^(id|due_date)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    database = Depends(get_async_db)
+):
+    """
+    Listado de tareas filtrable y paginado por cursor (cabecera X-Next-Cursor)
+    """
+    def load(db: Session):
+        # El creador se carga en la misma consulta (evita un SELECT por tarea)
+        if serialization.FAST:
+            query = db.query(*serialization.TASK_COLUMNS).outerjoin(User, User.id == Task.creator_id)
+        else:
+            query = db.query(Task).options(joinedload(Task.creator))
+        if creator_id is not None:
+            query = query.filter(Task.creator_id == creator_id)
+        if group_id is not None:
+            query = query.filter(Task.group_id == group_id)
+        if due_from is not None:
+            query = query.filter(Task.due_date >= due_from)
+        if due_to is not None:
+            query = query.filter(Task.due_date <= due_to)
+
+        if sort == "due_date":
+            columns, key = [Task.due_date, Task.id], lambda t: [t.due_date, t.id]
+        else:
+            columns, key = [Task.id], lambda t: [t.id]
+
+        return paginate(query, columns, key, after, limit, descending=order == "desc")
+
+    tasks, next_cursor = await database.run(load)
+    if serialization.FAST:
+        return serialization.json_response(serialization.task_rows(tasks), serialization.TASK_LIST, next_cursor)
+    set_next_cursor(response, next_cursor)
     return tasks
 
 @app.get("/tasks/{task_id}", response_model=TaskWithCompletions)
-def get_task_details(task_id: int, db: Session = Depends(get_db)):
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
+async def get_task_details(
+    task_id: int,
+    response: Response,
+    completed: Optional[bool] = None,
+    completions_limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    completions_after: Optional[str] = None,
+    database = Depends(get_async_db)
+):
+    """
+    Detalle de una tarea; la lista de completaciones se pagina por cursor
+    (cabecera X-Next-Cursor, que se pasa como `completions_after`)
+    """
+    def load(db: Session):
+        task = db.query(Task).filter(Task.id == task_id).first()
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+
+        query, key_column = assignments.task_completions_query(db, task_id)
+        query = assignments.filter_completed(query, completed)
+        rows, next_cursor = paginate(query, [key_column], lambda row: [row.User.id], completions_after, completions_limit)
+        completions = [
+            completion if completion is not None else assignments.pending(task_id, student)
+            for student, completion in rows
+        ]
+        assigned = assignments.assigned_per_task(db)
+        total = task.assigned_count if assigned is None else assigned
+
+        details = TaskWithCompletions(
+            id=task.id,
+            title=task.title,
+            description=task.description,
+            image_path=task.image_path,
+            created_at=task.created_at,
+            due_date=task.due_date,
+            total_students=total,
+            completed_count=task.completed_count,
+            pending_count=total - task.completed_count,
+            completion_rate=completion_rate(task.completed_count, total),
+            completions=completions
+        )
+        return details, next_cursor
 
-    completions = db.query(TaskCompletion).filter(TaskCompletion.task_id == task_id).all()
-    total_completions = len(completions)
-    completed_count = len([c for c in completions if c.completed])
-    pending_count = total_completions - completed_count
-    completion_rate = (completed_count / total_completions * 100) if total_completions > 0 else 0
-
-    return TaskWithCompletions(
-        id=task.id,
-        title=task.title,
-        description=task.description,
-        image_path=task.image_path,
-        created_at=task.created_at,
-        due_date=task.due_date,
-        total_students=total_completions,
-        completed_count=completed_count,
-        pending_count=pending_count,
-        completion_rate=round(completion_rate, 2),
-        completions=completions
-    )
+    details, next_cursor = await database.run(load)
+    set_next_cursor(response, next_cursor)
+    return details
 
 @app.get("/users/{user_id}/tasks", response_model=List[TaskCompletionResponse])
-def get_user_tasks(user_id: int, db: Session = Depends(get_db)):
+async def get_user_tasks(
+    user_id: int,
+    response: Response,
+    completed: Optional[bool] = None,
+    due_from: Optional[datetime] = None,
+    due_to: Optional[datetime] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    database = Depends(get_async_db)
+):
     """
-    Obtener las tareas asignadas a un usuario específico
+    Obtener las tareas asignadas a un usuario específico, ordenadas por tarea
+    y paginadas por cursor (cabecera X-Next-Cursor)
     """
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-  
-    if user.is_admin:
-        raise HTTPException(status_code=403, detail="Admins cannot have assigned tasks")
-
-    completions = db.query(TaskCompletion).filter(
-        TaskCompletion.student_id == user_id
-    ).all()
+    def load(db: Session):
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+      
+        if user.is_admin:
+            raise HTTPException(status_code=403, detail="Admins cannot have assigned tasks")
+
+        query, key_column = assignments.student_completions_query(db, user_id)
+        query = assignments.filter_completed(query, completed)
+        if due_from is not None:
+            query = query.filter(Task.due_date >= due_from)
+        if due_to is not None:
+            query = query.filter(Task.due_date <= due_to)
+
+        rows, next_cursor = paginate(query, [key_column], lambda row: [row[0]], after, limit)
+        completions = [
+            TaskCompletionResponse.model_validate(
+                completion if completion is not None else assignments.pending(task_id, user)
+            )
+            for task_id, completion in rows
+        ]
+        return completions, next_cursor
 
+    completions, next_cursor = await database.run(load)
+    set_next_cursor(response, next_cursor)
     return completions
 
+@app.get("/users/{user_id}/dashboard", response_model=StudentDashboard)
+async def get_user_dashboard(user_id: int, database = Depends(get_async_db)):
+    """
+    Panel del estudiante en una sola consulta: sus tareas con el estado de la
+    completación, agrupadas en vencidas, próximas, más adelante y completadas
+    """
+    return await database.run(dashboard.student_dashboard, user_id)
+
 @app.put("/tasks/{task_id}/complete")
-def mark_task_complete(
+async def mark_task_complete(
     task_id: int,
     user_id: int = Form(...),  # Ahora se pasa el ID del usuario directamente
     notes: Optional[str] = Form(None),
-    db: Session = Depends(get_db)
+    database = Depends(get_async_db)
 ):
-    # Verificar que el usuario existe y no es admin
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-  
-    if user.is_admin:
-        raise HTTPException(status_code=403, detail="Admins cannot complete tasks")
-
-    completion = db.query(TaskCompletion).filter(
-        TaskCompletion.task_id == task_id,
-        TaskCompletion.student_id == user_id
-    ).first()
-
-    if not completion:
-        raise HTTPException(status_code=404, detail="Task completion record not found")
-
-    completion.completed = True
-    completion.completed_at = datetime.utcnow()
-    if notes:
-        completion.notes = notes
-
-    db.commit()
+    def complete(db: Session):
+        # Verificar que el usuario existe y no es admin
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+      
+        if user.is_admin:
+            raise HTTPException(status_code=403, detail="Admins cannot complete tasks")
+
+        completion = assignments.get_or_create_completion(db, task_id, user_id)
+
+        if not completion:
+            raise HTTPException(status_code=404, detail="Task completion record not found")
+
+        changed = not completion.completed
+        if changed:
+            counters.record_completion(db, task_id, user_id, 1)
+            # Volver a completarla no cambia la fecha (ni la cuenta en las series temporales)
+            completion.completed_at = datetime.utcnow()
+        completion.completed = True
+        if notes:
+            completion.notes = notes
+
+        db.commit()
+        return changed
+
+    if await database.run(complete):
+        hub.publish("completion_changed", task_id=task_id, student_id=user_id, completed=True, delta=1)
     return {"message": "Task marked as completed"}
 
 @app.put("/tasks/{task_id}/uncomplete")
-def mark_task_incomplete(
+async def mark_task_incomplete(
     task_id: int,
     user_id: int = Form(...),  # Ahora se pasa el ID del usuario directamente
-    db: Session = Depends(get_db)
+    database = Depends(get_async_db)
 ):
-    # Verificar que el usuario existe y no es admin
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-  
-    if user.is_admin:
-        raise HTTPException(status_code=403, detail="Admins cannot uncomplete tasks")
+    def uncomplete(db: Session):
+        # Verificar que el usuario existe y no es admin
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+      
+        if user.is_admin:
+            raise HTTPException(status_code=403, detail="Admins cannot uncomplete tasks")
+
+        completion = assignments.get_or_create_completion(db, task_id, user_id)
+
+        if not completion:
+            raise HTTPException(status_code=404, detail="Task completion record not found")
+
+        changed = completion.completed
+        if changed:
+            counters.record_completion(db, task_id, user_id, -1)
+        completion.completed = False
+        completion.completed_at = None
+        completion.notes = None
+
+        db.commit()
+        return changed
+
+    if await database.run(uncomplete):
+        hub.publish("completion_changed", task_id=task_id, student_id=user_id, completed=False, delta=-1)
+    return {"message": "Task marked as not completed"}
+
+# Sincronización incremental
+@app.get("/sync", response_model=SyncResponse)
+async def sync_changes(
+    user_id: int,
+    since: Optional[str] = Query(None, description="Cursor devuelto por la sincronización anterior"),
+    database = Depends(get_async_db)
+):
+    """
+    Cambios de tareas y de las completaciones del estudiante desde `since`.
+    Sin cursor devuelve todo (full=true); el cliente guarda el cursor de la
+    respuesta para la siguiente llamada.
+    """
+    # Una réplica con retraso devolvería menos cambios de los que cubre el
+    # cursor nuevo y el cliente no los recibiría nunca
+    database.use_primary()
 
-    completion = db.query(TaskCompletion).filter(
-        TaskCompletion.task_id == task_id,
-        TaskCompletion.student_id == user_id
-    ).first()
+    def load(db: Session):
+        if not db.query(User.id).filter(User.id == user_id).first():
+            raise HTTPException(status_code=404, detail="User not found")
+        return sync.changes(db, user_id, since)
 
-    if not completion:
-        raise HTTPException(status_code=404, detail="Task completion record not found")
+    return await database.run(load)
 
-    completion.completed = False
-    completion.completed_at = None
-    completion.notes = None
+# Eventos en vivo
+@app.get("/events")
+async def subscribe_events(request: Request, user_id: Optional[int] = None):
+    """
+    Flujo server-sent events con los cambios de tareas y completaciones.
+    Con user_id solo llegan las completaciones de ese estudiante. Un evento
+    "resync" indica que la conexión se ha quedado atrás y debe recargar.
+    """
+    subscription = hub.subscribe(user_id)
+    return StreamingResponse(
+        stream(request, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    db.commit()
-    return {"message": "Task marked as not completed"}
+@app.post("/completions:batch", response_model=BatchResponse)
+async def batch_completions(changes: List[CompletionChange], database = Depends(get_async_db)):
+    """
+    Marcar varias tareas como completadas o pendientes en una sola petición.
+    Los cambios se aplican por bloques, cada uno en una transacción, y se
+    devuelve el resultado de cada elemento en el mismo orden.
+    """
+    if len(changes) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_ITEMS} changes per batch")
+
+    summary, changed = await batch.run_completion_batch(database, changes)
+    for task_id, user_id, delta in changed:
+        hub.publish("completion_changed", task_id=task_id, student_id=user_id, completed=delta > 0, delta=delta)
+    return summary
+
+# Endpoints de grupos
+@app.post("/groups", response_model=GroupResponse)
+async def create_group(
+    name: str = Form(...),
+    owner_id: int = Form(...),
+    database = Depends(get_async_db)
+):
+    groups.require_eager()
+
+    def create(db: Session):
+        owner = db.query(User).filter(User.id == owner_id).first()
+        if not owner:
+            raise HTTPException(status_code=404, detail="Owner user not found")
+        if not owner.is_admin:
+            raise HTTPException(status_code=403, detail="Only admins can create groups")
+
+        group = Group(name=name, owner_id=owner_id)
+        db.add(group)
+        db.commit()
+        db.refresh(group)
+        return group
+
+    return await database.run(create)
+
+@app.get("/groups", response_model=List[GroupResponse])
+async def get_groups(
+    response: Response,
+    owner_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    database = Depends(get_async_db)
+):
+    """Grupos (de un profesor si se indica owner_id), paginados por cursor"""
+    def load(db: Session):
+        query = db.query(Group)
+        if owner_id is not None:
+            query = query.filter(Group.owner_id == owner_id)
+        return paginate(query, [Group.id], lambda g: [g.id], after, limit)
+
+    found, next_cursor = await database.run(load)
+    set_next_cursor(response, next_cursor)
+    return found
+
+@app.post("/groups/{group_id}/students")
+async def enroll_students(group_id: int, change: EnrollmentChange, database = Depends(get_async_db)):
+    """
+    Matricular estudiantes en un grupo; reciben las tareas que el grupo ya tiene
+    """
+    def enroll(db: Session):
+        group = groups.get_group(db, group_id, lock=True)
+        enrolled = groups.enroll(db, group, change.student_ids)
+        db.commit()
+        return enrolled, group.student_count
+
+    enrolled, student_count = await database.run(enroll)
+    for student_id in enrolled:
+        hub.publish(RESYNC, student_id=student_id)
+    return {"group_id": group_id, "enrolled": enrolled, "student_count": student_count}
+
+@app.delete("/groups/{group_id}/students/{student_id}")
+async def unenroll_student(group_id: int, student_id: int, database = Depends(get_async_db)):
+    """
+    Dar de baja a un estudiante; se borran sus completaciones de las tareas del grupo
+    """
+    def unenroll(db: Session):
+        group = groups.get_group(db, group_id, lock=True)
+        groups.unenroll(db, group, student_id)
+        db.commit()
+
+    await database.run(unenroll)
+    hub.publish(RESYNC, student_id=student_id)
+    return {"message": "Student removed from group"}
 
 # Endpoints de estadísticas
 @app.get("/statistics/overview")
-def get_statistics_overview(db: Session = Depends(get_db)):
-    total_tasks = db.query(Task).count()
-    total_students = db.query(User).filter(User.is_admin == False).count()
-    total_completions = db.query(TaskCompletion).count()
-    completed_completions = db.query(TaskCompletion).filter(TaskCompletion.completed == True).count()
+async def get_statistics_overview(group_id: Optional[int] = None, database = Depends(get_async_db)):
+    if group_id is not None:
+        def load(db: Session):
+            group = groups.get_group(db, group_id)
+            return group.student_count, groups.overview(db, group)
+
+        total_students, (total_tasks, total_completions, completed_completions) = await database.run(load)
+        return {
+            "group_id": group_id,
+            "total_tasks": total_tasks,
+            "total_students": total_students,
+            "total_assignments": total_completions,
+            "completed_assignments": completed_completions,
+            "pending_assignments": total_completions - completed_completions,
+            "overall_completion_rate": completion_rate(completed_completions, total_completions)
+        }
 
-    overall_completion_rate = (completed_completions / total_completions * 100) if total_completions > 0 else 0
+    values = await database.run(counters.read_all)
+    total_completions = assignments.total_assignments(values)
+    completed_completions = values[counters.COMPLETED_ASSIGNMENTS]
 
     return {
-        "total_tasks": total_tasks,
-        "total_students": total_students,
+        "total_tasks": values[counters.TOTAL_TASKS],
+        "total_students": values[counters.TOTAL_STUDENTS],
         "total_assignments": total_completions,
         "completed_assignments": completed_completions,
         "pending_assignments": total_completions - completed_completions,
-        "overall_completion_rate": round(overall_completion_rate, 2)
+        "overall_completion_rate": completion_rate(completed_completions, total_completions)
     }
 
 @app.get("/statistics/tasks")
-def get_task_statistics(db: Session = Depends(get_db)):
-    tasks = db.query(Task).all()
-    task_stats = []
-
-    for task in tasks:
-        completions = db.query(TaskCompletion).filter(TaskCompletion.task_id == task.id).all()
-        total = len(completions)
-        completed = len([c for c in completions if c.completed])
-        completion_rate = (completed / total * 100) if total > 0 else 0
-
-        task_stats.append({
-            "task_id": task.id,
-            "task_title": task.title,
-            "total_assignments": total,
-            "completed": completed,
-            "pending": total - completed,
-            "completion_rate": round(completion_rate, 2),
-            "created_at": task.created_at
-        })
-
-    return task_stats
+async def get_task_statistics(group_id: Optional[int] = None, database = Depends(get_async_db)):
+    if group_id is not None:
+        return await database.run(lambda db: task_statistics(db, group_id=groups.get_group(db, group_id).id))
+    return await database.run(lambda db: task_statistics(db, assignments.assigned_per_task(db)))
 
 @app.get("/statistics/students")
-def get_student_statistics(db: Session = Depends(get_db)):
-    students = db.query(User).filter(User.is_admin == False).all()
-    student_stats = []
-
-    for student in students:
-        completions = db.query(TaskCompletion).filter(TaskCompletion.student_id == student.id).all()
-        total = len(completions)
-        completed = len([c for c in completions if c.completed])
-        completion_rate = (completed / total * 100) if total > 0 else 0
-
-        student_stats.append({
-            "student_id": student.id,
-            "student_name": student.username,
-            "student_email": student.email,
-            "total_tasks": total,
-            "completed_tasks": completed,
-            "pending_tasks": total - completed,
-            "completion_rate": round(completion_rate, 2)
-        })
-
-    return student_stats
+async def get_student_statistics(group_id: Optional[int] = None, database = Depends(get_async_db)):
+    if group_id is not None:
+        stats = await database.run(lambda db: group_student_statistics(db, groups.get_group(db, group_id).id))
+    else:
+        stats = await database.run(lambda db: student_statistics(db, assignments.assigned_per_student(db)))
+    if serialization.FAST:
+        return serialization.json_response(stats, serialization.STUDENT_STATS_LIST)
+    return stats
+
+@app.get("/statistics/timeseries")
+async def get_statistics_timeseries(
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    bucket: str = Query(rollups.DAY, pattern="^(hour|day)$"),
+    task_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+    group_id: Optional[int] = None,
+    database = Depends(get_async_db)
+):
+    """
+    Completaciones por hora o día en [from, to), del total o de una tarea,
+    estudiante o grupo, leídas de los rollups. Por defecto, los últimos 30
+    días (o 48 horas). `watermark` indica hasta dónde está agregada la serie.
+    """
+    scopes = [(scope, value) for scope, value in (
+        (rollups.TASK, task_id), (rollups.STUDENT, student_id), (rollups.GROUP, group_id)
+    ) if value is not None]
+    if len(scopes) > 1:
+        raise HTTPException(status_code=400, detail="Use only one of task_id, student_id and group_id")
+    scope, scope_id = scopes[0] if scopes else (rollups.ALL, 0)
+
+    start, end = rollups.as_naive_utc(start), rollups.as_naive_utc(end)
+    end = end or datetime.utcnow()
+    start = start or end - (timedelta(days=30) if bucket == rollups.DAY else timedelta(hours=48))
+    if start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+    if rollups.point_count(bucket, start, end) > TIMESERIES_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"Too many points (max {TIMESERIES_MAX_POINTS}), use a shorter range or a larger bucket")
+
+    def load(db: Session):
+        return rollups.series(db, bucket, scope, scope_id, start, end), rollups.watermark(db)
+
+    points, watermark = await database.run(load)
+    return {
+        "bucket": bucket,
+        "scope": scope,
+        "scope_id": scope_id if scopes else None,
+        "from": start,
+        "to": end,
+        "watermark": watermark,
+        "points": points
+    }
+
+# Exportaciones (CSV / NDJSON en streaming)
+def export_response(rows, name: str, fmt: str) -> StreamingResponse:
+    return StreamingResponse(
+        rows,
+        media_type=export.FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{export.filename(name, fmt)}"'},
+    )
+
+@app.get("/export/completions")
+async def export_completions(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    columns: Optional[str] = Query(None, description="Columnas separadas por comas"),
+    task_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+    completed: Optional[bool] = None,
+    completed_from: Optional[datetime] = None,
+    completed_to: Optional[datetime] = None,
+):
+    """
+    Todas las completaciones (tarea, estudiante y estado), filtrables por
+    tarea, estudiante, estado y rango de fechas de completado
+    """
+    selected = export.select_columns(columns, list(export.COMPLETION_COLUMNS))
+    statement = export.completions_statement(
+        selected, task_id, student_id, completed, completed_from, completed_to
+    )
+    return export_response(export.stream(statement, export.COMPLETION_KEYS, selected, format), "completions", format)
+
+@app.get("/export/students")
+async def export_students(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    columns: Optional[str] = Query(None, description="Columnas separadas por comas"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    database = Depends(get_async_db)
+):
+    """
+    Estadísticas por estudiante (como /statistics/students), filtrables por
+    fecha de alta
+    """
+    selected = export.select_columns(columns, export.STUDENT_COLUMNS)
+    total_tasks = await database.run(assignments.assigned_per_student)
+    statement = export.students_statement(created_from, created_to)
+    rows = export.stream(
+        statement, export.STUDENT_KEYS, selected, format, lambda row: export.student_row(row, total_tasks)
+    )
+    return export_response(rows, "students", format)
+
+# Métricas (formato de texto de Prometheus)
+def pool_metrics() -> list:
+    engines = {"sync": engine}
+    if async_engine is not None:
+        engines["async"] = async_engine.sync_engine
+    checked_out = {(name, ): e.pool.checkedout() for name, e in engines.items() if hasattr(e.pool, "checkedout")}
+    return metrics.sample_lines("db_pool_checked_out", "Conexiones del pool en uso", checked_out, ("engine",))
+
+def principal_cache_metrics() -> list:
+    stats = principal_cache.stats()
+    return (
+        metrics.sample_lines("principal_cache_size", "Usuarios en la caché de autenticación", {(): stats["size"]})
+        + metrics.sample_lines("principal_cache_hits_total", "Aciertos de la caché de autenticación", {(): stats["hits"]}, kind="counter")
+        + metrics.sample_lines("principal_cache_misses_total", "Fallos de la caché de autenticación", {(): stats["misses"]}, kind="counter")
+    )
+
+def replica_metrics() -> list:
+    healthy = {}
+    for replica_set in (replicas, async_replicas):
+        if replica_set is not None:
+            for replica in replica_set.status():
+                healthy[(replica["url"],)] = int(replica["healthy"])
+    return metrics.sample_lines("db_replica_healthy", "Réplicas de lectura disponibles (1) o caídas (0)", healthy, ("replica",))
+
+metrics.registry.add_collector(pool_metrics)
+metrics.registry.add_collector(replica_metrics)
+metrics.registry.add_collector(principal_cache_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
 
 # Montar carpeta estática para imágenes
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+app.mount("/uploads", ImmutableStaticFiles(directory=UPLOAD_DIR), name="uploads")
 
 @app.get("/")
 def root():
@@ -394,7 +934,7 @@ def create_default_admin():
             admin_user = User(
                 email="admin@example.com",
                 username="admin",
-                hashed_password=get_password_hash("admin123"),
+                hashed_password=pwd_context.hash("admin123"),
                 is_admin=True
             )
             db.add(admin_user)
@@ -405,6 +945,32 @@ def create_default_admin():
     finally:
         db.close()
 
+@app.on_event("startup")
+async def start_replica_monitors():
+    # Salud de las réplicas fuera del camino de las consultas
+    app.state.replica_monitors = [
+        asyncio.create_task(replica_set.monitor())
+        for replica_set in (replicas, async_replicas) if replica_set is not None
+    ]
+
+@app.on_event("startup")
+async def start_rollup_aggregator():
+    # Con varios workers cada uno lanza el suyo; la marca de agua bloqueada
+    # hace que solo uno agregue cada vez
+    if ROLLUP_INTERVAL_SECONDS > 0:
+        app.state.rollup_task = asyncio.create_task(rollups.run_forever(ROLLUP_INTERVAL_SECONDS))
+
+@app.on_event("shutdown")
+async def stop_rollup_aggregator():
+    task = getattr(app.state, "rollup_task", None)
+    if task is not None:
+        task.cancel()
+
+@app.on_event("shutdown")
+async def stop_replica_monitors():
+    for task in getattr(app.state, "replica_monitors", []):
+        task.cancel()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
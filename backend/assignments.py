@@ -0,0 +1,242 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import insert, select, literal, and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from models import User, Task, TaskCompletion, Enrollment
+from config import ASSIGNMENT_MODE
+from cache import response_cache
+import counters
+
+# En modo sparse cada tarea está asignada a todos los estudiantes, pero solo
+# se guarda una fila cuando el estudiante actúa sobre ella
+SPARSE = ASSIGNMENT_MODE == "sparse"
+
+# Estados de la creación de completaciones de una tarea
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+def fan_out(db: Session, task_id: int, group_id: Optional[int] = None) -> int:
+    """
+    Crear la TaskCompletion de cada estudiante (o de cada matriculado en el
+    grupo de la tarea) con un único INSERT ... SELECT y actualizar los
+    contadores en la misma transacción. Solo se crean las que faltan: una
+    matrícula hecha mientras el trabajo estaba pendiente ya asignó la tarea a
+    sus estudiantes. No hace commit.
+    """
+    if SPARSE:
+        db.query(Task).filter(Task.id == task_id).update(
+            {Task.assignment_status: STATUS_DONE}, synchronize_session=False
+        )
+        return 0
+
+    def unassigned(student_id):
+        return ~select(TaskCompletion.id).where(
+            TaskCompletion.task_id == task_id,
+            TaskCompletion.student_id == student_id
+        ).exists()
+
+    # Los contadores se actualizan antes del INSERT, mientras la condición
+    # todavía distingue a los estudiantes sin completación
+    if group_id is None:
+        db.query(User).filter(User.is_admin == False, unassigned(User.id)).update(
+            {User.assigned_count: User.assigned_count + 1}, synchronize_session=False
+        )
+    else:
+        enrolled = select(Enrollment.student_id).where(
+            Enrollment.group_id == group_id, unassigned(Enrollment.student_id)
+        )
+        db.query(User).filter(User.id.in_(enrolled.scalar_subquery())).update(
+            {User.assigned_count: User.assigned_count + 1}, synchronize_session=False
+        )
+        db.query(Enrollment).filter(
+            Enrollment.group_id == group_id, unassigned(Enrollment.student_id)
+        ).update(
+            {Enrollment.assigned_count: Enrollment.assigned_count + 1}, synchronize_session=False
+        )
+
+    now = datetime.utcnow()
+    if group_id is None:
+        students = select(
+            literal(task_id),
+            User.id,
+            literal(False),
+            literal(now),
+            literal(now)
+        ).where(User.is_admin == False, unassigned(User.id))
+    else:
+        students = select(
+            literal(task_id),
+            Enrollment.student_id,
+            literal(False),
+            literal(now),
+            literal(now)
+        ).where(Enrollment.group_id == group_id, unassigned(Enrollment.student_id))
+
+    result = db.execute(
+        insert(TaskCompletion).from_select(
+            ["task_id", "student_id", "completed", "created_at", "updated_at"], students
+        )
+    )
+    assigned = result.rowcount
+
+    db.query(Task).filter(Task.id == task_id).update(
+        {
+            Task.assigned_count: Task.assigned_count + assigned,
+            Task.assignment_status: STATUS_DONE,
+            Task.updated_at: Task.updated_at
+        },
+        synchronize_session=False
+    )
+    counters.increment(db, counters.TOTAL_ASSIGNMENTS, assigned)
+    return assigned
+
+
+async def run_fan_out_job(task_id: int):
+    """Tarea en segundo plano: crea las completaciones con su propia sesión"""
+    await run_in_threadpool(_fan_out_job, task_id)
+    # Las completaciones (o el estado failed) se confirman después de responder:
+    # invalidar las respuestas cacheadas mientras el trabajo estaba pendiente
+    await response_cache.bump_version()
+
+
+def _fan_out_job(task_id: int):
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        db.query(Task).filter(Task.id == task_id).update(
+            {Task.assignment_status: STATUS_RUNNING}, synchronize_session=False
+        )
+        db.commit()
+        group_id = db.query(Task.group_id).filter(Task.id == task_id).scalar()
+        fan_out(db, task_id, group_id)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        db.query(Task).filter(Task.id == task_id).update(
+            {Task.assignment_status: STATUS_FAILED}, synchronize_session=False
+        )
+        db.commit()
+        print(f"Error assigning task {task_id}: {e}")
+    finally:
+        db.close()
+
+
+def assigned_per_task(db: Session) -> Optional[int]:
+    """En modo sparse todas las tareas tienen asignados a todos los estudiantes"""
+    if not SPARSE:
+        return None
+    return counters.read_all(db)[counters.TOTAL_STUDENTS]
+
+
+def assigned_per_student(db: Session) -> Optional[int]:
+    """En modo sparse todos los estudiantes tienen asignadas todas las tareas"""
+    if not SPARSE:
+        return None
+    return counters.read_all(db)[counters.TOTAL_TASKS]
+
+
+def total_assignments(values: dict) -> int:
+    if SPARSE:
+        return values[counters.TOTAL_TASKS] * values[counters.TOTAL_STUDENTS]
+    return values[counters.TOTAL_ASSIGNMENTS]
+
+
+def get_or_create_completion(db: Session, task_id: int, student_id: int) -> Optional[TaskCompletion]:
+    """
+    Obtener (bloqueada) la completación de un estudiante. En modo sparse se crea
+    la fila la primera vez que el estudiante actúa sobre una tarea existente.
+    """
+    completion = db.query(TaskCompletion).filter(
+        TaskCompletion.task_id == task_id,
+        TaskCompletion.student_id == student_id
+    ).with_for_update().first()
+
+    if completion or not SPARSE:
+        return completion
+
+    if not db.query(Task.id).filter(Task.id == task_id).first():
+        return None
+
+    completion = TaskCompletion(
+        task_id=task_id,
+        student_id=student_id,
+        completed=False,
+        created_at=datetime.utcnow()
+    )
+    # Otra petición puede haber creado la fila a la vez: el índice único lo
+    # detecta y se usa la suya
+    try:
+        with db.begin_nested():
+            db.add(completion)
+    except IntegrityError:
+        completion = db.query(TaskCompletion).filter(
+            TaskCompletion.task_id == task_id,
+            TaskCompletion.student_id == student_id
+        ).with_for_update().first()
+    return completion
+
+
+def student_completions_query(db: Session, student_id: int):
+    """
+    Filas (task_id, TaskCompletion o None) con las tareas de un estudiante y la
+    columna por la que se ordenan. En modo sparse las tareas sin fila se
+    obtienen con un outer join y su completación es None.
+    """
+    if SPARSE:
+        query = db.query(Task.id, TaskCompletion).outerjoin(
+            TaskCompletion,
+            and_(TaskCompletion.task_id == Task.id, TaskCompletion.student_id == student_id)
+        )
+        return query, Task.id
+
+    query = db.query(TaskCompletion.task_id, TaskCompletion).join(
+        Task, Task.id == TaskCompletion.task_id
+    ).filter(TaskCompletion.student_id == student_id)
+    return query, TaskCompletion.task_id
+
+
+def task_completions_query(db: Session, task_id: int):
+    """
+    Filas (User, TaskCompletion o None) con los estudiantes de una tarea y la
+    columna por la que se ordenan. En modo sparse los estudiantes sin fila se
+    obtienen con un outer join y su completación es None. Como el User viene en
+    la misma fila, TaskCompletion.student se resuelve sin consultas adicionales.
+    """
+    if SPARSE:
+        query = db.query(User, TaskCompletion).outerjoin(
+            TaskCompletion,
+            and_(TaskCompletion.student_id == User.id, TaskCompletion.task_id == task_id)
+        ).filter(User.is_admin == False)
+        return query, User.id
+
+    query = db.query(User, TaskCompletion).join(
+        TaskCompletion, TaskCompletion.student_id == User.id
+    ).filter(TaskCompletion.task_id == task_id)
+    return query, TaskCompletion.student_id
+
+
+def filter_completed(query, completed: Optional[bool]):
+    """Filtrar por estado; una completación inexistente cuenta como pendiente"""
+    if completed is None:
+        return query
+    if completed:
+        return query.filter(TaskCompletion.completed == True)
+    return query.filter(or_(TaskCompletion.id == None, TaskCompletion.completed == False))
+
+
+def pending(task_id: int, student: User) -> dict:
+    """Completación pendiente sin fila en la base de datos (modo sparse)"""
+    return {
+        "id": None,
+        "task_id": task_id,
+        "user": student,
+        "completed_at": None,
+        "notes": None
+    }
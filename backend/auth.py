@@ -1,20 +1,86 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional
+from collections import OrderedDict
+import threading
+import time
 
-from database import get_db
+from database import get_db, get_async_db
 from models import User
 from schemas import TokenData
-from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from config import (
+    SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL
+)
+from passwords import pwd_context
 
 # Configuración de seguridad
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+class PrincipalCache:
+    """
+    Caché TTL + LRU en proceso de los usuarios resueltos por get_current_user,
+    indexada por el subject (username) del token. Guarda copias desvinculadas
+    de la sesión y sin el hash de la contraseña.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, username: str) -> Optional[User]:
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(username)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self.entries[username]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(username)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user: User):
+        principal = User(
+            id=user.id,
+            email=user.email,
+            username=user.username,
+            is_admin=user.is_admin,
+            created_at=user.created_at
+        )
+        with self.lock:
+            self.entries[user.username] = (time.monotonic() + self.ttl, principal)
+            self.entries.move_to_end(user.username)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, username: Optional[str] = None):
+        """Eliminar un usuario de la caché (o todos si no se indica)"""
+        with self.lock:
+            if username is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(username, None)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verificar contraseña"""
     return pwd_context.verify(plain_password, hashed_password)
@@ -55,9 +121,43 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
     
+    user = principal_cache.get(token_data.username)
+    if user is not None:
+        return user
+
     user = db.query(User).filter(User.username == token_data.username).first()
     if user is None:
         raise credentials_exception
+    principal_cache.set(user)
+    return user
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    database = Depends(get_async_db)
+) -> User:
+    """Obtener usuario actual desde el token (endpoints async)"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    try:
+        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        username: str = payload.get("sub")
+        if username is None:
+            raise credentials_exception
+    except JWTError:
+        raise credentials_exception
+
+    user = principal_cache.get(username)
+    if user is not None:
+        return user
+
+    user = await database.run(lambda db: db.query(User).filter(User.username == username).first())
+    if user is None:
+        raise credentials_exception
+    principal_cache.set(user)
     return user
 
 def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
@@ -74,4 +174,13 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
     user = db.query(User).filter(User.username == username).first()
     if not user or not verify_password(password, user.hashed_password):
         return None
-    return user
\ No newline at end of file
+    return user
+
+async def get_admin_user_async(current_user: User = Depends(get_current_user_async)) -> User:
+    """Verificar que el usuario actual sea administrador (endpoints async)"""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return current_user
@@ -0,0 +1,310 @@
+import asyncio
+import csv
+import io
+import json
+from collections import defaultdict
+from datetime import datetime
+from typing import AsyncIterator, Iterable, List
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from models import User, Task, TaskCompletion, Enrollment
+from schemas import CompletionChange, UserCreate
+from passwords import hasher
+from config import BATCH_CHUNK_SIZE, PASSWORD_HASH_WORKERS
+import assignments
+import counters
+
+# Operaciones en lote: los cambios se aplican por bloques de BATCH_CHUNK_SIZE,
+# cada bloque en una transacción con un número fijo de consultas, y cada
+# elemento recibe su propio resultado (status HTTP y detalle).
+
+
+def chunks(items: Iterable, size: int = BATCH_CHUNK_SIZE):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def result(index: int, status: int, detail: str = None, **fields) -> dict:
+    return {"index": index, "status": status, "detail": detail, **fields}
+
+
+def apply_completion_changes(db: Session, items: List[tuple]) -> tuple:
+    """
+    Aplicar un bloque de (índice, CompletionChange) en una transacción.
+    Devuelve (resultados, cambios efectivos como (task_id, user_id, delta)).
+    """
+    user_ids = {change.user_id for _, change in items}
+    task_ids = {change.task_id for _, change in items}
+
+    admins = dict(db.query(User.id, User.is_admin).filter(User.id.in_(user_ids)).all())
+    existing_tasks = set()
+    task_groups = {}
+    if assignments.SPARSE:
+        existing_tasks = {task_id for (task_id,) in db.query(Task.id).filter(Task.id.in_(task_ids))}
+    else:
+        task_groups = dict(
+            db.query(Task.id, Task.group_id).filter(Task.id.in_(task_ids), Task.group_id != None).all()
+        )
+    completions = {
+        (completion.task_id, completion.student_id): completion
+        for completion in db.query(TaskCompletion).filter(
+            TaskCompletion.task_id.in_(task_ids),
+            TaskCompletion.student_id.in_(user_ids)
+        ).order_by(TaskCompletion.id).with_for_update()
+    }
+
+    results = []
+    changed = []
+    now = datetime.utcnow()
+    for index, change in items:
+        if change.user_id not in admins:
+            results.append(result(index, 404, "User not found"))
+            continue
+        if admins[change.user_id]:
+            results.append(result(index, 403, "Admins cannot complete tasks"))
+            continue
+
+        key = (change.task_id, change.user_id)
+        completion = completions.get(key)
+        if completion is None and assignments.SPARSE and change.task_id in existing_tasks:
+            completion = TaskCompletion(
+                task_id=change.task_id, student_id=change.user_id, completed=False, created_at=now
+            )
+            db.add(completion)
+            completions[key] = completion
+        if completion is None:
+            results.append(result(index, 404, "Task completion record not found"))
+            continue
+
+        if completion.completed != change.completed:
+            changed.append((change.task_id, change.user_id, 1 if change.completed else -1))
+            # Volver a completarla no cambia la fecha (ni la cuenta en las series temporales)
+            if change.completed:
+                completion.completed_at = now
+        completion.completed = change.completed
+        if change.completed:
+            if change.notes:
+                completion.notes = change.notes
+        else:
+            completion.completed_at = None
+            completion.notes = None
+        results.append(result(index, 200, task_id=change.task_id, user_id=change.user_id))
+
+    # Contadores: una actualización por tarea y estudiante afectados
+    task_deltas = defaultdict(int)
+    student_deltas = defaultdict(int)
+    enrollment_deltas = defaultdict(int)
+    for task_id, user_id, delta in changed:
+        task_deltas[task_id] += delta
+        student_deltas[user_id] += delta
+        if task_id in task_groups:
+            enrollment_deltas[(task_groups[task_id], user_id)] += delta
+    counters.increment(db, counters.COMPLETED_ASSIGNMENTS, sum(task_deltas.values()))
+    for task_id, delta in task_deltas.items():
+        if delta:
+            counters.increment_task(db, task_id, completed=delta)
+    for user_id, delta in student_deltas.items():
+        if delta:
+            counters.increment_student(db, user_id, completed=delta)
+    for (group_id, user_id), delta in enrollment_deltas.items():
+        if delta:
+            db.query(Enrollment).filter(
+                Enrollment.group_id == group_id, Enrollment.student_id == user_id
+            ).update(
+                {Enrollment.completed_count: Enrollment.completed_count + delta}, synchronize_session=False
+            )
+
+    db.commit()
+    return results, changed
+
+
+def failed_chunk(items: List[tuple], detail: str) -> list:
+    return [result(index, 500, detail) for index, _ in items]
+
+
+def summary(results: list) -> dict:
+    results = sorted(results, key=lambda item: item["index"])
+    succeeded = sum(1 for item in results if item["status"] == 200)
+    return {"succeeded": succeeded, "failed": len(results) - succeeded, "results": results}
+
+
+async def run_completion_batch(database, changes: List[CompletionChange]) -> tuple:
+    """Aplicar los cambios bloque a bloque; un bloque que falla no afecta a los demás"""
+    results = []
+    changed = []
+    for chunk in chunks(enumerate(changes)):
+        try:
+            chunk_results, chunk_changed = await database.run(apply_completion_changes, chunk)
+        except Exception as e:
+            await database.run(lambda db: db.rollback())
+            print(f"Error applying completion batch: {e}")
+            results.extend(failed_chunk(chunk, "Chunk failed, no changes applied"))
+            continue
+        results.extend(chunk_results)
+        changed.extend(chunk_changed)
+    return summary(results), changed
+
+
+# Importación de usuarios
+
+IMPORT_FIELDS = ("email", "username", "password", "is_admin")
+
+
+async def read_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Líneas de un cuerpo recibido por trozos, sin cargarlo entero en memoria"""
+    buffer = b""
+    async for data in stream:
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8").rstrip("\r")
+
+
+async def parse_users(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[tuple]:
+    """
+    Filas (índice, UserCreate o mensaje de error) de un CSV con cabecera o de
+    NDJSON. En CSV los campos no pueden contener saltos de línea.
+    """
+    header = None
+    index = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        try:
+            if fmt == "csv":
+                values = next(csv.reader(io.StringIO(line)))
+                if header is None:
+                    header = [value.strip().lower() for value in values]
+                    missing = set(IMPORT_FIELDS[:3]) - set(header)
+                    if missing:
+                        raise HTTPException(status_code=400, detail=f"Missing columns: {', '.join(sorted(missing))}")
+                    continue
+                data = dict(zip(header, values))
+                data["is_admin"] = data.get("is_admin", "").strip().lower() in ("1", "true", "yes", "si", "sí")
+            else:
+                data = json.loads(line)
+            yield index, UserCreate(**{field: data[field] for field in IMPORT_FIELDS if field in data})
+        except (ValueError, ValidationError, KeyError, TypeError) as e:
+            yield index, f"Invalid row: {e}"
+        index += 1
+
+
+async def hash_passwords(users: List[tuple]) -> dict:
+    """
+    Hashes de las contraseñas de un bloque en el pool de bcrypt, como mucho
+    PASSWORD_HASH_WORKERS a la vez para no dejar sin hueco a los logins.
+    Devuelve índice -> hash o HTTPException si el pool rechazó la operación.
+    """
+    hashes = {}
+    for group in chunks(users, PASSWORD_HASH_WORKERS):
+        done = await asyncio.gather(
+            *(hasher.hash(user.password) for _, user in group), return_exceptions=True
+        )
+        for (index, _), value in zip(group, done):
+            if isinstance(value, BaseException) and not isinstance(value, HTTPException):
+                raise value
+            hashes[index] = value
+    return hashes
+
+
+def find_taken(db: Session, users: List[tuple]) -> tuple:
+    """Emails y usernames del bloque que ya existen (una consulta)"""
+    emails = {user.email for _, user in users}
+    usernames = {user.username for _, user in users}
+    rows = db.query(User.email, User.username).filter(
+        or_(User.email.in_(emails), User.username.in_(usernames))
+    ).all()
+    return {email for email, _ in rows}, {username for _, username in rows}
+
+
+def insert_users(db: Session, users: List[tuple], hashes: dict) -> list:
+    """Insertar un bloque ya validado y sumar los estudiantes a los contadores"""
+    now = datetime.utcnow()
+    db_users = []
+    for index, user in users:
+        db_user = User(
+            email=user.email,
+            username=user.username,
+            hashed_password=hashes[index],
+            is_admin=user.is_admin,
+            created_at=now
+        )
+        db.add(db_user)
+        db_users.append((index, db_user))
+    db.flush()
+    counters.increment(db, counters.TOTAL_STUDENTS, sum(1 for _, user in users if not user.is_admin))
+    db.commit()
+    return [result(index, 200, user_id=db_user.id, username=db_user.username) for index, db_user in db_users]
+
+
+async def import_chunk(database, rows: List[tuple], seen_emails: set, seen_usernames: set) -> list:
+    """Validar, hashear e insertar un bloque de filas de la importación"""
+    results = []
+    valid = []
+    for index, user in rows:
+        if isinstance(user, str):
+            results.append(result(index, 422, user))
+        elif user.email in seen_emails:
+            results.append(result(index, 409, "Duplicate email in import"))
+        elif user.username in seen_usernames:
+            results.append(result(index, 409, "Duplicate username in import"))
+        else:
+            seen_emails.add(user.email)
+            seen_usernames.add(user.username)
+            valid.append((index, user))
+    if not valid:
+        return results
+
+    taken_emails, taken_usernames = await database.run(find_taken, valid)
+    candidates = []
+    for index, user in valid:
+        if user.email in taken_emails:
+            results.append(result(index, 409, "Email already registered"))
+        elif user.username in taken_usernames:
+            results.append(result(index, 409, "Username already registered"))
+        else:
+            candidates.append((index, user))
+
+    hashes = await hash_passwords(candidates)
+    ready = []
+    for index, user in candidates:
+        if isinstance(hashes[index], HTTPException):
+            results.append(result(index, hashes[index].status_code, hashes[index].detail))
+        else:
+            ready.append((index, user))
+    if not ready:
+        return results
+
+    try:
+        results.extend(await database.run(insert_users, ready, hashes))
+    except Exception as e:
+        await database.run(lambda db: db.rollback())
+        print(f"Error importing users: {e}")
+        results.extend(failed_chunk(ready, "Chunk failed, no users created"))
+    return results
+
+
+async def run_user_import(database, lines: AsyncIterator[str], fmt: str) -> dict:
+    results = []
+    seen_emails, seen_usernames = set(), set()
+    rows = []
+    async for row in parse_users(lines, fmt):
+        rows.append(row)
+        if len(rows) >= BATCH_CHUNK_SIZE:
+            results.extend(await import_chunk(database, rows, seen_emails, seen_usernames))
+            rows = []
+    if rows:
+        results.extend(await import_chunk(database, rows, seen_emails, seen_usernames))
+    return summary(results)
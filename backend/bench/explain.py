@@ -0,0 +1,135 @@
+"""
+Comprueba los planes de ejecución de las consultas de cada endpoint. Llama a
+los endpoints en el mismo proceso contra la base sembrada con bench.seed,
+ejecuta EXPLAIN sobre cada SELECT y termina con error si alguna recorre una
+tabla completa sin estar en ALLOWED_SCANS.
+
+    python -m bench.seed --students 1000 --tasks 200 --reset
+    python -m bench.explain
+
+Con SQLite se usa EXPLAIN QUERY PLAN; con MySQL (DATABASE_URL) EXPLAIN.
+tests/test_query_plans.py hace la misma comprobación sobre una base pequeña
+que siembra la propia suite.
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///bench.db")
+os.environ.setdefault("DB_ASYNC", "False")
+
+import asyncio
+import re
+import sys
+
+import httpx
+
+from database import QueryCounter, engine, SessionLocal
+from models import User, Task
+
+# Tablas pequeñas que se pueden recorrer enteras
+SMALL_TABLES = {"stat_counters"}
+
+# Recorridos completos esperados: (endpoint, tabla) -> motivo
+ALLOWED_SCANS = {
+    ("GET /tasks", "tasks"): "primera página: recorre la clave primaria en orden hasta el LIMIT",
+    ("GET /statistics/tasks", "tasks"): "devuelve todas las tareas",
+    ("GET /sync (completa)", "tasks"): "la primera sincronización devuelve todas las tareas",
+}
+
+SQLITE_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+
+def endpoints(student_id: int, task_id: int, admin_id: int) -> list:
+    return [
+        ("GET /tasks", "GET", "/tasks", {"limit": 50}, None),
+        ("GET /tasks (creador, por fecha)", "GET", "/tasks", {"creator_id": admin_id, "sort": "due_date", "limit": 50}, None),
+        ("GET /tasks/{id}", "GET", f"/tasks/{task_id}", {"completions_limit": 50}, None),
+        ("GET /tasks/{id} (completadas)", "GET", f"/tasks/{task_id}", {"completed": "true", "completions_limit": 50}, None),
+        ("GET /users", "GET", "/users", {"is_admin": "false", "limit": 50}, None),
+        ("GET /users/{id}/tasks", "GET", f"/users/{student_id}/tasks", {"limit": 50}, None),
+        ("GET /users/{id}/tasks (pendientes)", "GET", f"/users/{student_id}/tasks", {"completed": "false", "limit": 50}, None),
+        ("GET /users/{id}/dashboard", "GET", f"/users/{student_id}/dashboard", {}, None),
+        ("GET /statistics/overview", "GET", "/statistics/overview", {}, None),
+        ("GET /statistics/tasks", "GET", "/statistics/tasks", {}, None),
+        ("GET /statistics/students", "GET", "/statistics/students", {}, None),
+        ("GET /statistics/timeseries", "GET", "/statistics/timeseries", {}, None),
+        ("GET /sync (completa)", "GET", "/sync", {"user_id": student_id}, None),
+        ("PUT /tasks/{id}/complete", "PUT", f"/tasks/{task_id}/complete", {}, {"user_id": student_id}),
+        ("PUT /tasks/{id}/uncomplete", "PUT", f"/tasks/{task_id}/uncomplete", {}, {"user_id": student_id}),
+    ]
+
+
+def full_scans(connection, statement: str, parameters) -> list:
+    """Tablas que el plan recorre enteras"""
+    if connection.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+        return [match.group(1) for match in (SQLITE_SCAN.match(row[-1]) for row in rows) if match]
+    rows = connection.exec_driver_sql("EXPLAIN " + statement, parameters).mappings().fetchall()
+    return [row["table"] for row in rows if row["type"] == "ALL"]
+
+
+async def collect(client: httpx.AsyncClient, targets: list) -> list:
+    """(endpoint, sentencias SELECT con sus parámetros) de cada llamada"""
+    collected = []
+    for index, (name, method, path, params, data) in enumerate(targets):
+        # Parámetro único para que la caché de respuestas no evite las consultas
+        with QueryCounter(engine) as counter:
+            response = await client.request(method, path, params={**params, "_": index}, data=data)
+        if response.status_code >= 400:
+            print(f"AVISO {name}: {response.status_code} {response.text[:200]}")
+        selects = [(s, p) for s, p in counter.executions if s.lstrip().upper().startswith("SELECT")]
+        collected.append((name, selects))
+    return collected
+
+
+def scans(collected: list) -> list:
+    """(endpoint, tabla, sentencia, motivo o None si no está permitido) de cada recorrido completo"""
+    found = []
+    with engine.connect() as connection:
+        for name, selects in collected:
+            for statement, parameters in selects:
+                for table in full_scans(connection, statement, parameters):
+                    if table not in SMALL_TABLES:
+                        found.append((name, table, statement, ALLOWED_SCANS.get((name, table))))
+    return found
+
+
+async def run(app, student_id: int, task_id: int, admin_id: int) -> list:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://explain") as client:
+        return await collect(client, endpoints(student_id, task_id, admin_id))
+
+
+async def main() -> int:
+    from api import app
+
+    db = SessionLocal()
+    try:
+        student = db.query(User.id).filter(User.is_admin == False).first()
+        admin = db.query(User.id).filter(User.is_admin == True).first()
+        task = db.query(Task.id).first()
+    finally:
+        db.close()
+    if not (student and admin and task):
+        print("No hay datos: ejecuta antes python -m bench.seed")
+        return 1
+
+    collected = await run(app, student.id, task.id, admin.id)
+    unexpected = 0
+    for name, table, statement, reason in scans(collected):
+        if reason:
+            print(f"ok    {name}: recorrido de {table} ({reason})")
+            continue
+        unexpected += 1
+        print(f"SCAN  {name}: recorrido completo de {table}\n      {' '.join(statement.split())}")
+    for name, selects in collected:
+        print(f"{name}: {len(selects)} consultas")
+
+    if unexpected:
+        print(f"{unexpected} recorridos completos inesperados")
+        return 1
+    print("Sin recorridos completos inesperados")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,266 @@
+"""
+Prueba de carga de los endpoints principales. Por defecto llama a la app en
+el mismo proceso (httpx + ASGI) contra la base sembrada con bench.seed y
+cuenta las consultas SQL por petición; con --url ataca un servidor en marcha.
+
+    python -m bench.seed --students 1000 --tasks 200 --reset
+    python -m bench.loadtest --save bench/baselines/main.json
+    python -m bench.loadtest --compare bench/baselines/main.json
+
+Requiere httpx (pip install -r bench/requirements.txt).
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///bench.db")
+os.environ.setdefault("DB_ASYNC", "False")
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+from bench.seed import STUDENT_PASSWORD
+
+PAGE = 50
+
+
+class Target:
+    """Cliente HTTP y datos de la base (estudiantes y tareas) para los escenarios"""
+
+    def __init__(self, client: httpx.AsyncClient, bust_cache: bool):
+        self.client = client
+        self.bust_cache = bust_cache
+        self.sequence = itertools.count()
+        self.students = []
+        self.tasks = []
+
+    def params(self, **params) -> dict:
+        # Un parámetro distinto en cada GET evita la caché de respuestas
+        if self.bust_cache:
+            params["_"] = next(self.sequence)
+        return params
+
+    async def discover(self):
+        response = await self.client.get("/users", params={"is_admin": "false", "limit": 500})
+        response.raise_for_status()
+        self.students = response.json()
+        response = await self.client.get("/tasks", params={"limit": 500})
+        response.raise_for_status()
+        self.tasks = response.json()
+        if not self.students or not self.tasks:
+            raise SystemExit("No hay datos: ejecuta antes python -m bench.seed")
+
+
+async def login(target: Target, rng: random.Random):
+    student = rng.choice(target.students)
+    return await target.client.post("/login", data={"username": student["username"], "password": STUDENT_PASSWORD})
+
+
+async def list_tasks(target: Target, rng: random.Random):
+    return await target.client.get("/tasks", params=target.params(limit=PAGE))
+
+
+async def task_detail(target: Target, rng: random.Random):
+    task = rng.choice(target.tasks)
+    return await target.client.get(f"/tasks/{task['id']}", params=target.params(completions_limit=PAGE))
+
+
+async def student_tasks(target: Target, rng: random.Random):
+    student = rng.choice(target.students)
+    return await target.client.get(f"/users/{student['id']}/tasks", params=target.params(limit=PAGE))
+
+
+async def student_dashboard(target: Target, rng: random.Random):
+    student = rng.choice(target.students)
+    return await target.client.get(f"/users/{student['id']}/dashboard", params=target.params())
+
+
+async def toggle_completion(target: Target, rng: random.Random):
+    task = rng.choice(target.tasks)
+    student = rng.choice(target.students)
+    action = rng.choice(["complete", "uncomplete"])
+    return await target.client.put(f"/tasks/{task['id']}/{action}", data={"user_id": student["id"]})
+
+
+async def statistics_overview(target: Target, rng: random.Random):
+    return await target.client.get("/statistics/overview", params=target.params())
+
+
+async def statistics_tasks(target: Target, rng: random.Random):
+    return await target.client.get("/statistics/tasks", params=target.params())
+
+
+async def statistics_students(target: Target, rng: random.Random):
+    return await target.client.get("/statistics/students", params=target.params())
+
+
+SCENARIOS = {
+    "login": login,
+    "list_tasks": list_tasks,
+    "task_detail": task_detail,
+    "student_tasks": student_tasks,
+    "student_dashboard": student_dashboard,
+    "toggle_completion": toggle_completion,
+    "statistics_overview": statistics_overview,
+    "statistics_tasks": statistics_tasks,
+    "statistics_students": statistics_students,
+}
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Percentil por rango más cercano de una lista ordenada"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(fraction * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+async def run_scenario(target: Target, scenario, requests: int, concurrency: int, seed: int, query_counter=None) -> dict:
+    rng = random.Random(seed)
+    latencies = []
+    errors = 0
+    remaining = itertools.count()
+
+    async def worker():
+        nonlocal errors
+        while next(remaining) < requests:
+            started = time.perf_counter()
+            try:
+                response = await scenario(target, rng)
+                failed = response.status_code >= 500
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            errors += failed
+
+    counter = query_counter() if query_counter else None
+    if counter:
+        counter.__enter__()
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finally:
+        elapsed = time.perf_counter() - started
+        if counter:
+            counter.__exit__(None, None, None)
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "queries_per_request": round(counter.count / len(latencies), 2) if counter and latencies else None,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results: dict):
+    print(f"{'escenario':<22}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'consultas':>11}{'errores':>9}")
+    for name, result in results.items():
+        queries = result["queries_per_request"]
+        print(
+            f"{name:<22}{result['throughput']:>9}{result['p50_ms']:>9}{result['p95_ms']:>9}"
+            f"{result['p99_ms']:>9}{queries if queries is not None else '-':>11}{result['errors']:>9}"
+        )
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Escenarios cuyo p95 o consultas por petición empeoran respecto a la línea base"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline["results"].get(name)
+        if not base:
+            continue
+        if result["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['p95_ms']} -> {result['p95_ms']} ms")
+        if (result["queries_per_request"] or 0) > (base["queries_per_request"] or 0):
+            regressions.append(
+                f"{name}: consultas/petición {base['queries_per_request']} -> {result['queries_per_request']}"
+            )
+    return regressions
+
+
+async def main(args) -> int:
+    query_counter = None
+    if args.url:
+        transport = None
+        base_url = args.url.rstrip("/")
+    else:
+        from api import app
+        from database import QueryCounter
+
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://bench"
+        query_counter = QueryCounter
+
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60) as client:
+        target = Target(client, args.bust_cache)
+        await target.discover()
+        results = {}
+        for index, name in enumerate(args.scenarios):
+            results[name] = await run_scenario(
+                target, SCENARIOS[name], args.requests, args.concurrency, args.seed + index, query_counter
+            )
+
+    print_results(results)
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "commit": git_commit(),
+        "target": args.url or "in-process",
+        "database": os.environ.get("DATABASE_URL") if not args.url else None,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "bust_cache": args.bust_cache,
+        "results": results,
+    }
+
+    if args.save:
+        path = Path(args.save)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2))
+        print(f"Línea base guardada en {path}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(results, baseline, args.tolerance)
+        print(f"Comparado con {args.compare} (commit {baseline.get('commit')})")
+        for regression in regressions:
+            print(f"  REGRESIÓN {regression}")
+        if regressions:
+            return 1
+        print("  Sin regresiones")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API")
+    parser.add_argument("--url", help="Servidor a probar (por defecto, la app en el mismo proceso)")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="Peticiones por escenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--bust-cache", action="store_true", help="Evitar la caché de respuestas en los GET")
+    parser.add_argument("--save", help="Guardar los resultados como línea base (JSON)")
+    parser.add_argument("--compare", help="Línea base con la que comparar")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Empeoramiento de p95 tolerado (0.2 = 20%%)")
+    sys.exit(asyncio.run(main(parser.parse_args())))
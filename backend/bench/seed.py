@@ -0,0 +1,130 @@
+"""
+Genera datos sintéticos para los benchmarks: N estudiantes, M tareas y sus
+completaciones. Por defecto usa SQLite; con DATABASE_URL apunta a otra base.
+
+    python -m bench.seed --students 1000 --tasks 200 --reset
+"""
+import os
+
+# SQLite y sesión síncrona salvo que se indique otra cosa (antes de importar config)
+os.environ.setdefault("DATABASE_URL", "sqlite:///bench.db")
+os.environ.setdefault("DB_ASYNC", "False")
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from database import Base, engine, SessionLocal
+from models import User, Task, TaskCompletion
+from passwords import pwd_context
+from config import DEFAULT_ADMIN_EMAIL, DEFAULT_ADMIN_USERNAME, DEFAULT_ADMIN_PASSWORD
+import assignments
+import counters
+
+# Todos los estudiantes sintéticos comparten contraseña (el harness la usa para el login)
+STUDENT_PASSWORD = "bench123"
+INSERT_CHUNK = 10000
+
+
+def student_username(i: int) -> str:
+    return f"student{i:06d}"
+
+
+def insert_chunks(db, model, rows):
+    for start in range(0, len(rows), INSERT_CHUNK):
+        db.execute(insert(model), rows[start:start + INSERT_CHUNK])
+
+
+def seed(students: int, tasks: int, completion_rate: float, seed_value: int, reset: bool):
+    rng = random.Random(seed_value)
+    if reset:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        admin = db.query(User).filter(User.username == DEFAULT_ADMIN_USERNAME).first()
+        if admin is None:
+            admin = User(
+                email=DEFAULT_ADMIN_EMAIL,
+                username=DEFAULT_ADMIN_USERNAME,
+                hashed_password=pwd_context.hash(DEFAULT_ADMIN_PASSWORD),
+                is_admin=True,
+                created_at=now
+            )
+            db.add(admin)
+            db.flush()
+
+        # Un único hash: bcrypt por estudiante haría la siembra lentísima
+        hashed_password = pwd_context.hash(STUDENT_PASSWORD)
+        first = db.query(User).count()
+        insert_chunks(db, User, [
+            {
+                "email": f"{student_username(first + i)}@bench.local",
+                "username": student_username(first + i),
+                "hashed_password": hashed_password,
+                "is_admin": False,
+                "created_at": now - timedelta(days=rng.randint(0, 365)),
+            }
+            for i in range(students)
+        ])
+
+        insert_chunks(db, Task, [
+            {
+                "title": f"Tarea {i}",
+                "description": f"Descripción de la tarea sintética {i}",
+                "due_date": now + timedelta(days=rng.randint(-30, 60)),
+                "created_at": now - timedelta(days=rng.randint(0, 90)),
+                "creator_id": admin.id,
+            }
+            for i in range(tasks)
+        ])
+
+        student_ids = [id for (id,) in db.query(User.id).filter(User.is_admin == False)]
+        task_ids = [id for (id,) in db.query(Task.id)]
+        db.commit()
+
+        # En modo sparse solo tienen fila las completaciones hechas
+        rows = []
+        for task_id in task_ids:
+            for student_id in student_ids:
+                completed = rng.random() < completion_rate
+                if not completed and assignments.SPARSE:
+                    continue
+                rows.append({
+                    "task_id": task_id,
+                    "student_id": student_id,
+                    "completed": completed,
+                    "completed_at": now - timedelta(hours=rng.randint(0, 24 * 60)) if completed else None,
+                    "created_at": now,
+                })
+            if len(rows) >= INSERT_CHUNK:
+                insert_chunks(db, TaskCompletion, rows)
+                rows = []
+        insert_chunks(db, TaskCompletion, rows)
+        db.commit()
+
+        # Los contadores se derivan de las filas insertadas
+        counters.reconcile(db, fix=True)
+        return len(student_ids), len(task_ids)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generar datos sintéticos para los benchmarks")
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--tasks", type=int, default=100)
+    parser.add_argument("--completion-rate", type=float, default=0.4, help="Fracción de completaciones hechas")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla para datos reproducibles")
+    parser.add_argument("--reset", action="store_true", help="Borrar y recrear las tablas antes de sembrar")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    total_students, total_tasks = seed(args.students, args.tasks, args.completion_rate, args.seed, args.reset)
+    print(f"{total_students} estudiantes y {total_tasks} tareas en {time.perf_counter() - started:.1f}s "
+          f"({engine.url.render_as_string(hide_password=True)})")
@@ -0,0 +1,160 @@
+"""
+Compara por separado cada camino de serialización de los listados grandes
+(GET /tasks, GET /users y /statistics/students) con filas sintéticas en
+memoria, sin base de datos ni HTTP, y comprueba que todos producen los
+mismos bytes que el camino por defecto de FastAPI.
+
+    python -m bench.serialization --rows 5000 --repeat 20
+
+orjson solo se mide si está instalado (pip install -r bench/requirements.txt).
+Para medir el efecto de extremo a extremo, lanza bench.loadtest con cada
+SERIALIZATION_MODE y compara los resultados.
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///bench.db")
+os.environ.setdefault("DB_ASYNC", "False")
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+import serialization
+from schemas import TaskResponse, UserResponse
+
+
+def make_users(count: int, start: datetime) -> list:
+    return [
+        SimpleNamespace(
+            id=i, email=f"student{i:06d}@example.com", username=f"student{i:06d}",
+            is_admin=False, created_at=start + timedelta(seconds=i, microseconds=i % 1000)
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def make_tasks(count: int, start: datetime, creator) -> list:
+    return [
+        SimpleNamespace(
+            id=i, title=f"Tarea {i} · robótica", description="Montar y programar el robot " * 4,
+            image_path=f"/uploads/{i:064x}.png", created_at=start + timedelta(minutes=i),
+            due_date=start + timedelta(days=i % 30) if i % 3 else None, group_id=i % 7 or None,
+            creator=creator
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def task_tuple(task) -> SimpleNamespace:
+    """Fila como la que devuelve la consulta de serialization.TASK_COLUMNS"""
+    creator = task.creator
+    return SimpleNamespace(
+        id=task.id, title=task.title, description=task.description, image_path=task.image_path,
+        created_at=task.created_at, due_date=task.due_date, group_id=task.group_id,
+        creator_id=creator.id, creator_email=creator.email, creator_username=creator.username,
+        creator_is_admin=creator.is_admin, creator_created_at=creator.created_at
+    )
+
+
+def make_student_stats(users: list) -> list:
+    stats = []
+    for user in users:
+        total = user.id % 40
+        completed = user.id % 17 if total else 0
+        completed = min(completed, total)
+        stats.append({
+            "student_id": user.id,
+            "student_name": user.username,
+            "student_email": user.email,
+            "total_tasks": total,
+            "completed_tasks": completed,
+            "pending_tasks": total - completed,
+            "completion_rate": round(completed / total * 100, 2) if total > 0 else 0
+        })
+    return stats
+
+
+def default_with_model(adapter: TypeAdapter):
+    """response_model de FastAPI: validar los objetos ORM y volcarlos en modo JSON"""
+    def render(objects) -> bytes:
+        return JSONResponse(adapter.dump_python(adapter.validate_python(objects, from_attributes=True), mode="json")).body
+    return render
+
+
+def default_without_model(rows) -> bytes:
+    """Endpoint sin response_model: jsonable_encoder y JSONResponse"""
+    return JSONResponse(jsonable_encoder(rows)).body
+
+
+def measure(render, data, repeat: int) -> tuple:
+    body = render(data)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        render(data)
+    return (time.perf_counter() - started) / repeat, body
+
+
+def scenarios(rows: int) -> dict:
+    """Por listado: (datos del camino por defecto, render por defecto, datos en tuplas, constructor, adapter)"""
+    start = datetime(2026, 1, 1, 8, 0, 0)
+    users = make_users(rows, start)
+    admin = SimpleNamespace(id=0, email="admin@example.com", username="admin", is_admin=True, created_at=start)
+    tasks = make_tasks(rows, start, admin)
+    stats = make_student_stats(users)
+    return {
+        "GET /users": (
+            users, default_with_model(TypeAdapter(List[UserResponse])),
+            users, serialization.user_rows, serialization.USER_LIST
+        ),
+        "GET /tasks": (
+            tasks, default_with_model(TypeAdapter(List[TaskResponse])),
+            [task_tuple(task) for task in tasks], serialization.task_rows, serialization.TASK_LIST
+        ),
+        "GET /statistics/students": (
+            stats, default_without_model,
+            stats, lambda rows: rows, serialization.STUDENT_STATS_LIST
+        ),
+    }
+
+
+def main(args) -> int:
+    modes = [serialization.TYPEADAPTER]
+    if serialization.orjson is not None:
+        modes.append(serialization.ORJSON)
+    else:
+        print("orjson no está instalado: solo se mide typeadapter")
+
+    mismatches = 0
+    print(f"{'listado':<26}{'camino':<14}{'ms/respuesta':>14}{'filas/s':>12}{'aceleración':>13}")
+    for name, (objects, default_render, tuples, build, adapter) in scenarios(args.rows).items():
+        base_time, expected = measure(default_render, objects, args.repeat)
+        print(f"{name:<26}{serialization.PYDANTIC:<14}{base_time * 1000:>14.2f}{args.rows / base_time:>12.0f}{'1.00x':>13}")
+        for mode in modes:
+            encoder = serialization.ENCODERS[mode]
+            elapsed, body = measure(lambda data: encoder(build(data), adapter), tuples, args.repeat)
+            same = body == expected
+            mismatches += not same
+            print(
+                f"{name:<26}{mode:<14}{elapsed * 1000:>14.2f}{args.rows / elapsed:>12.0f}"
+                f"{base_time / elapsed:>12.2f}x" + ("" if same else "  DISTINTO")
+            )
+
+    if mismatches:
+        print(f"{mismatches} caminos no producen los mismos bytes que el camino por defecto")
+        return 1
+    print("Todos los caminos producen los mismos bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de los caminos de serialización")
+    parser.add_argument("--rows", type=int, default=5000, help="Filas por respuesta")
+    parser.add_argument("--repeat", type=int, default=20, help="Respuestas serializadas por camino")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,226 @@
+from abc import ABC, abstractmethod
+import hashlib
+import re
+import secrets
+import time
+from collections import OrderedDict
+from typing import Optional, Sequence
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import RESPONSE_CACHE_BACKEND, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL, REDIS_URL, REPLICA_STICKY_SECONDS
+
+# Caché de respuestas de los endpoints de lectura. Las claves incluyen un
+# contador de versión de los datos que se incrementa con cada escritura que
+# modifica datos cacheados, así que nunca hace falta borrar entradas: las
+# antiguas dejan de pedirse. La versión empieza por una época aleatoria que
+# cambia cuando el contador se pierde (reinicio del proceso o de Redis), para
+# que un ETag anterior no coincida con la nueva numeración.
+
+
+def _new_epoch() -> str:
+    return secrets.token_hex(8)
+
+
+class CacheBackend(ABC):
+    """Interfaz de los backends de la caché de respuestas"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[tuple]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, value: tuple):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_version(self) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def bump_version(self) -> int:
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """Backend en proceso (LRU con TTL); válido con un único worker"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.epoch = _new_epoch()
+        self.version = 0
+
+    async def get(self, key: str) -> Optional[tuple]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: tuple):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    async def get_version(self) -> str:
+        return f"{self.epoch}.{self.version}"
+
+    async def bump_version(self) -> int:
+        self.version += 1
+        return self.version
+
+
+class RedisBackend(CacheBackend):
+    """Backend compartido entre workers; requiere el paquete opcional `redis`"""
+
+    version_key = "response_cache:version"
+    epoch_key = "response_cache:epoch"
+
+    def __init__(self, url: str, ttl: int):
+        import redis.asyncio
+        import pickle
+
+        self.client = redis.asyncio.from_url(url)
+        self.ttl = ttl
+        self.pickle = pickle
+
+    async def get(self, key: str) -> Optional[tuple]:
+        value = await self.client.get(f"response_cache:{key}")
+        return self.pickle.loads(value) if value is not None else None
+
+    async def set(self, key: str, value: tuple):
+        await self.client.set(f"response_cache:{key}", self.pickle.dumps(value), ex=self.ttl)
+
+    async def get_version(self) -> str:
+        epoch, version = await self.client.mget(self.epoch_key, self.version_key)
+        if epoch is None:
+            # Redis ha perdido los datos: nueva época (la primera que se guarde)
+            await self.client.set(self.epoch_key, _new_epoch(), nx=True)
+            epoch, version = await self.client.mget(self.epoch_key, self.version_key)
+        return f"{epoch.decode()}.{int(version or 0)}"
+
+    async def bump_version(self) -> int:
+        return await self.client.incr(self.version_key)
+
+
+def create_backend() -> CacheBackend:
+    if RESPONSE_CACHE_BACKEND == "redis":
+        return RedisBackend(REDIS_URL, RESPONSE_CACHE_TTL)
+    return MemoryBackend(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+
+response_cache = create_backend()
+
+
+def _etag(version: str, key: str) -> str:
+    return '"' + hashlib.sha1(f"{version}:{key}".encode()).hexdigest() + '"'
+
+
+class ResponseCacheMiddleware:
+    """
+    Sirve desde caché las respuestas 200 de los GET en `paths` y responde 304
+    si el If-None-Match del cliente coincide, sin llegar a la base de datos.
+    Las escrituras con éxito en `write_paths` ((método, ruta)) incrementan la
+    versión; el resto (login, logout...) no invalidan nada. Una ruta de
+    `paths` puede ser (ruta, segundos) si su respuesta depende de la hora: la
+    clave y el ETag incluyen además la ventana de tiempo actual.
+    """
+
+    def __init__(
+        self, app: ASGIApp, paths: Sequence, write_paths: Sequence[tuple], backend: CacheBackend = None
+    ):
+        self.app = app
+        self.paths = [
+            (re.compile(path[0]), path[1]) if isinstance(path, tuple) else (re.compile(path), None)
+            for path in paths
+        ]
+        self.write_paths = [(method, re.compile(path)) for method, path in write_paths]
+        self.backend = backend or response_cache
+        self.last_write = 0.0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        if any(method == write_method and path.match(scope["path"]) for write_method, path in self.write_paths):
+            await self._write(scope, receive, send)
+            return
+
+        route = next((route for route in self.paths if route[0].match(scope["path"])), None)
+        if method != "GET" or route is None:
+            await self.app(scope, receive, send)
+            return
+
+        query = "&".join(sorted(scope.get("query_string", b"").decode("latin-1").split("&")))
+        key = f"{scope['path']}?{query}"
+        if route[1]:
+            key += f"#{int(time.time() // route[1])}"
+        version = await self.backend.get_version()
+        etag = _etag(version, key)
+
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+            await send({"type": "http.response.start", "status": 304, "headers": [(b"etag", etag.encode())]})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        cached = await self.backend.get(f"{version}:{key}")
+        if cached is not None:
+            status, headers, body = cached
+            await send({"type": "http.response.start", "status": status, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        start = {}
+        chunks = []
+
+        async def capture(message: Message):
+            if message["type"] == "http.response.start":
+                # Solo las respuestas que se guardan llevan ETag: un 304 para
+                # una versión que no está en caché podría no incluir escrituras
+                start["cache"] = message["status"] == 200 and not self._maybe_stale(scope)
+                if start["cache"]:
+                    message["headers"] = list(message.get("headers", [])) + [(b"etag", etag.encode())]
+                    start["headers"] = message["headers"]
+            elif message["type"] == "http.response.body" and start.get("cache"):
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    await self.backend.set(f"{version}:{key}", (200, start["headers"], b"".join(chunks)))
+            await send(message)
+
+        await self.app(scope, receive, capture)
+
+    def _maybe_stale(self, scope: Scope) -> bool:
+        """Leída de una réplica poco después de una escritura: puede no incluirla"""
+        replica = scope.get("state", {}).get("db_replica", False)
+        return replica and time.monotonic() - self.last_write < REPLICA_STICKY_SECONDS
+
+    async def _write(self, scope: Scope, receive: Receive, send: Send):
+        status = {}
+        self.last_write = time.monotonic()
+
+        async def track(message: Message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                # Los cambios ya están confirmados: invalidar antes de responder
+                # para que el cliente lea sus propias escrituras
+                if 200 <= message["status"] < 400:
+                    await self.backend.bump_version()
+            await send(message)
+
+        await self.app(scope, receive, track)
+        # Las tareas en segundo plano (p. ej. crear completaciones) terminan
+        # después de la respuesta y también modifican datos
+        if 200 <= status.get("code", 500) < 400:
+            self.last_write = time.monotonic()
+            await self.backend.bump_version()
@@ -14,6 +14,21 @@ MYSQL_DATABASE = os.getenv("MYSQL_DATABASE", "tasks_app")
 
 # URL de conexión a MySQL
 SQLALCHEMY_DATABASE_URL = f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
+ASYNC_DATABASE_URL = f"mysql+aiomysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
+# URLs alternativas (p. ej. DATABASE_URL=sqlite:///bench.db con DB_ASYNC=False para los benchmarks)
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", SQLALCHEMY_DATABASE_URL)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", ASYNC_DATABASE_URL)
+# True: los endpoints usan AsyncSession (aiomysql); False: sesión síncrona en el threadpool
+DB_ASYNC = os.getenv("DB_ASYNC", "True").lower() == "true"
+
+# Réplicas de lectura (URLs separadas por comas). Las peticiones GET leen de
+# ellas salvo durante REPLICA_STICKY_SECONDS tras una escritura del mismo cliente
+READ_REPLICA_URLS = [url.strip() for url in os.getenv("READ_REPLICA_URLS", "").split(",") if url.strip()]
+ASYNC_READ_REPLICA_URLS = [
+    url.strip() for url in os.getenv("ASYNC_READ_REPLICA_URLS", "").split(",") if url.strip()
+] or [url.replace("+mysqlconnector", "+aiomysql") for url in READ_REPLICA_URLS]
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+REPLICA_HEALTH_CHECK_SECONDS = float(os.getenv("REPLICA_HEALTH_CHECK_SECONDS", "10"))
 
 # Configuración de seguridad
 SECRET_KEY = os.getenv("SECRET_KEY", "rootpassword")
@@ -32,4 +47,80 @@ DEFAULT_ADMIN_PASSWORD = os.getenv("DEFAULT_ADMIN_PASSWORD", "admin123")
 # Configuración de la aplicación
 APP_HOST = os.getenv("APP_HOST", "0.0.0.0")
 APP_PORT = int(os.getenv("APP_PORT", "8000"))
-APP_RELOAD = os.getenv("APP_RELOAD", "True").lower() == "true"
\ No newline at end of file
+APP_RELOAD = os.getenv("APP_RELOAD", "True").lower() == "true"
+
+# Configuración de asignación de tareas
+# Con más estudiantes que este umbral, las completaciones se crean en segundo plano
+FANOUT_BACKGROUND_THRESHOLD = int(os.getenv("FANOUT_BACKGROUND_THRESHOLD", "5000"))
+
+# eager: una TaskCompletion por estudiante y tarea al crear la tarea
+# sparse: la fila solo existe cuando el estudiante actúa sobre la tarea;
+#         las pendientes se derivan (no se admite volver a eager sin migrar)
+ASSIGNMENT_MODE = os.getenv("ASSIGNMENT_MODE", "eager").lower()
+
+# Paginación: tamaño máximo de página en los listados (y por defecto si se envía un cursor)
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+
+# Panel del estudiante: días por delante en los que una tarea cuenta como próxima
+DASHBOARD_UPCOMING_DAYS = int(os.getenv("DASHBOARD_UPCOMING_DAYS", "7"))
+# Las vencidas y próximas dependen de la hora: el panel se cachea como mucho estos segundos
+DASHBOARD_CACHE_SECONDS = int(os.getenv("DASHBOARD_CACHE_SECONDS", "60"))
+
+# Series temporales de completaciones (rollups.py): segundos entre pasadas del
+# agregador en segundo plano (0 = desactivado, p. ej. si lo lanza un cron),
+# segundos de retraso respecto a la hora actual para no perder transacciones
+# en curso, horas agregadas por transacción y puntos máximos por respuesta
+ROLLUP_INTERVAL_SECONDS = int(os.getenv("ROLLUP_INTERVAL_SECONDS", "60"))
+ROLLUP_LAG_SECONDS = int(os.getenv("ROLLUP_LAG_SECONDS", "60"))
+ROLLUP_WINDOW_HOURS = int(os.getenv("ROLLUP_WINDOW_HOURS", "24"))
+TIMESERIES_MAX_POINTS = int(os.getenv("TIMESERIES_MAX_POINTS", "1000"))
+
+# Serialización de los listados grandes: "pydantic" (por defecto),
+# "typeadapter" o "orjson" (requiere `orjson`); ver serialization.py
+SERIALIZATION_MODE = os.getenv("SERIALIZATION_MODE", "pydantic").lower()
+
+# Configuración del hash de contraseñas
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+# Operaciones de hash en curso o en cola a partir de las cuales se responde 503
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "64"))
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "1"))
+
+# Caché de usuarios autenticados (por subject del token)
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+
+# Configuración de imágenes de tareas
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", "200"))
+MEDIUM_SIZE = int(os.getenv("MEDIUM_SIZE", "800"))
+
+# Almacenamiento de subidas: "local" (UPLOAD_DIR) u otro backend registrado en storage.py
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+
+# Caché de respuestas de lectura: "memory" (un worker) o "redis" (compartida, requiere `redis`)
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "300"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Eventos en vivo (SSE): eventos pendientes por conexión antes de pedir
+# resincronización y segundos entre keep-alives
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "100"))
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+
+# Sincronización incremental: segundos que se retrasa el cursor de GET /sync
+# para no perder transacciones que aún no habían hecho commit
+SYNC_SAFETY_WINDOW = int(os.getenv("SYNC_SAFETY_WINDOW", "5"))
+
+# Operaciones en lote: elementos por transacción y máximo por petición
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "500"))
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "10000"))
+
+# Exportaciones: filas que se leen del cursor del servidor en cada bloque
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Métricas: peticiones más lentas que este umbral (segundos) se registran con su SQL
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+SLOW_REQUEST_MAX_STATEMENTS = int(os.getenv("SLOW_REQUEST_MAX_STATEMENTS", "100"))
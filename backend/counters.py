@@ -0,0 +1,202 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models import User, Task, TaskCompletion, StatCounter, Enrollment
+from aggregates import task_statistics_query, student_statistics_query, enrollment_statistics_query
+from config import ASSIGNMENT_MODE
+
+# Contadores globales de la tabla stat_counters
+TOTAL_TASKS = "total_tasks"
+TOTAL_STUDENTS = "total_students"
+TOTAL_ASSIGNMENTS = "total_assignments"
+COMPLETED_ASSIGNMENTS = "completed_assignments"
+
+COUNTER_NAMES = (TOTAL_TASKS, TOTAL_STUDENTS, TOTAL_ASSIGNMENTS, COMPLETED_ASSIGNMENTS)
+
+
+def increment(db: Session, name: str, delta: int = 1):
+    """Incrementar un contador global dentro de la transacción actual"""
+    if delta == 0:
+        return
+    updated = db.query(StatCounter).filter(StatCounter.name == name).update(
+        {StatCounter.value: StatCounter.value + delta}, synchronize_session=False
+    )
+    if not updated:
+        db.add(StatCounter(name=name, value=delta))
+        db.flush()
+
+
+def increment_task(db: Session, task_id: int, assigned: int = 0, completed: int = 0):
+    db.query(Task).filter(Task.id == task_id).update(
+        {
+            Task.assigned_count: Task.assigned_count + assigned,
+            Task.completed_count: Task.completed_count + completed,
+            # Los contadores no son un cambio de la tarea para GET /sync
+            Task.updated_at: Task.updated_at
+        },
+        synchronize_session=False
+    )
+
+
+def increment_student(db: Session, student_id: int, assigned: int = 0, completed: int = 0):
+    db.query(User).filter(User.id == student_id).update(
+        {
+            User.assigned_count: User.assigned_count + assigned,
+            User.completed_count: User.completed_count + completed
+        },
+        synchronize_session=False
+    )
+
+
+def increment_enrollment(db: Session, task_id: int, student_id: int, completed: int):
+    """Contador de la matrícula del estudiante en el grupo de la tarea (si lo tiene)"""
+    group_id = select(Task.group_id).where(Task.id == task_id).scalar_subquery()
+    db.query(Enrollment).filter(
+        Enrollment.group_id == group_id,
+        Enrollment.student_id == student_id
+    ).update(
+        {Enrollment.completed_count: Enrollment.completed_count + completed},
+        synchronize_session=False
+    )
+
+
+def record_completion(db: Session, task_id: int, student_id: int, delta: int):
+    """Reflejar en todos los contadores que una completación cambió de estado (+1 / -1)"""
+    increment(db, COMPLETED_ASSIGNMENTS, delta)
+    increment_task(db, task_id, completed=delta)
+    increment_student(db, student_id, completed=delta)
+    if ASSIGNMENT_MODE != "sparse":
+        increment_enrollment(db, task_id, student_id, delta)
+
+
+def remove_task(db: Session, task: Task):
+    """
+    Descontar de los contadores una tarea que se va a borrar, junto con sus
+    completaciones. Debe llamarse antes de borrar las filas.
+    """
+    increment(db, TOTAL_TASKS, -1)
+    increment(db, TOTAL_ASSIGNMENTS, -task.assigned_count)
+    increment(db, COMPLETED_ASSIGNMENTS, -task.completed_count)
+
+    assigned = db.query(TaskCompletion.student_id).filter(TaskCompletion.task_id == task.id)
+    completed = assigned.filter(TaskCompletion.completed == True)
+    if ASSIGNMENT_MODE != "sparse":
+        db.query(User).filter(User.id.in_(assigned.scalar_subquery())).update(
+            {User.assigned_count: User.assigned_count - 1}, synchronize_session=False
+        )
+    db.query(User).filter(User.id.in_(completed.scalar_subquery())).update(
+        {User.completed_count: User.completed_count - 1}, synchronize_session=False
+    )
+    if task.group_id is not None:
+        enrollments = db.query(Enrollment).filter(Enrollment.group_id == task.group_id)
+        enrollments.filter(Enrollment.student_id.in_(assigned.scalar_subquery())).update(
+            {Enrollment.assigned_count: Enrollment.assigned_count - 1}, synchronize_session=False
+        )
+        enrollments.filter(Enrollment.student_id.in_(completed.scalar_subquery())).update(
+            {Enrollment.completed_count: Enrollment.completed_count - 1}, synchronize_session=False
+        )
+
+
+def read_all(db: Session) -> dict:
+    values = {name: 0 for name in COUNTER_NAMES}
+    values.update(dict(db.query(StatCounter.name, StatCounter.value).all()))
+    return values
+
+
+def _set(db: Session, name: str, value: int):
+    counter = db.get(StatCounter, name)
+    if counter is None:
+        db.add(StatCounter(name=name, value=value))
+    else:
+        counter.value = value
+
+
+def reconcile(db: Session, fix: bool = True) -> list:
+    """
+    Recalcular los contadores a partir de las filas reales y devolver las
+    diferencias encontradas como tuplas (contador, valor guardado, valor real).
+    En modo sparse las asignaciones se derivan, así que solo se revisan los
+    contadores de completadas.
+    """
+    drift = []
+    sparse = ASSIGNMENT_MODE == "sparse"
+
+    actual = {
+        TOTAL_TASKS: db.query(func.count(Task.id)).scalar(),
+        TOTAL_STUDENTS: db.query(func.count(User.id)).filter(User.is_admin == False).scalar(),
+        TOTAL_ASSIGNMENTS: db.query(func.count(TaskCompletion.id)).scalar(),
+        COMPLETED_ASSIGNMENTS: db.query(func.count(TaskCompletion.id)).filter(
+            TaskCompletion.completed == True
+        ).scalar(),
+    }
+    stored = read_all(db)
+    if sparse:
+        actual[TOTAL_ASSIGNMENTS] = stored[TOTAL_ASSIGNMENTS]
+    for name, value in actual.items():
+        if stored[name] != value:
+            drift.append((name, stored[name], value))
+            if fix:
+                _set(db, name, value)
+
+    task_counts = {
+        row.task_id: (int(row.total_assignments), int(row.completed))
+        for row in task_statistics_query(db)
+    }
+    for task in db.query(Task):
+        assigned, completed = task_counts.get(task.id, (0, 0))
+        if sparse:
+            assigned = task.assigned_count
+        if (task.assigned_count, task.completed_count) != (assigned, completed):
+            drift.append((f"task:{task.id}", (task.assigned_count, task.completed_count), (assigned, completed)))
+            if fix:
+                task.assigned_count = assigned
+                task.completed_count = completed
+
+    student_counts = {
+        row.student_id: (int(row.total_tasks), int(row.completed_tasks))
+        for row in student_statistics_query(db)
+    }
+    for student in db.query(User).filter(User.is_admin == False):
+        assigned, completed = student_counts.get(student.id, (0, 0))
+        if sparse:
+            assigned = student.assigned_count
+        if (student.assigned_count, student.completed_count) != (assigned, completed):
+            drift.append((f"student:{student.id}", (student.assigned_count, student.completed_count), (assigned, completed)))
+            if fix:
+                student.assigned_count = assigned
+                student.completed_count = completed
+
+    enrollment_counts = {
+        (row.group_id, row.student_id): (int(row.total_tasks), int(row.completed_tasks))
+        for row in enrollment_statistics_query(db)
+    }
+    for enrollment in db.query(Enrollment):
+        stored_counts = (enrollment.assigned_count, enrollment.completed_count)
+        actual_counts = enrollment_counts.get((enrollment.group_id, enrollment.student_id), (0, 0))
+        if stored_counts != actual_counts:
+            drift.append((f"enrollment:{enrollment.group_id}:{enrollment.student_id}", stored_counts, actual_counts))
+            if fix:
+                enrollment.assigned_count, enrollment.completed_count = actual_counts
+
+    if fix:
+        db.commit()
+    return drift
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Reconstruir los contadores de estadísticas")
+    parser.add_argument("--dry-run", action="store_true", help="Solo informar de las diferencias")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        drift = reconcile(db, fix=not args.dry_run)
+    finally:
+        db.close()
+
+    for name, stored, actual in drift:
+        print(f"{name}: guardado={stored} real={actual}")
+    print(f"{len(drift)} contadores con diferencias" + (" (sin corregir)" if args.dry_run else " corregidos"))
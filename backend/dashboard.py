@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, true
+from sqlalchemy.orm import Session
+
+from models import User, Task, TaskCompletion
+from images import variant_urls
+from aggregates import completion_rate
+from config import DASHBOARD_UPCOMING_DAYS
+import assignments
+
+# Panel de un estudiante (GET /users/{id}/dashboard): sus tareas con el estado
+# de su completación, agrupadas en vencidas, próximas (vencen en menos de
+# DASHBOARD_UPCOMING_DAYS días), más adelante (o sin fecha) y completadas,
+# con los totales. Todo sale de una consulta que parte de la fila del
+# usuario, así que un usuario sin tareas también devuelve una fila y no hace
+# falta otra consulta para comprobar que existe.
+
+OVERDUE = "overdue"
+UPCOMING = "upcoming"
+LATER = "later"
+COMPLETED = "completed"
+
+BUCKETS = (OVERDUE, UPCOMING, LATER, COMPLETED)
+
+
+def rows_query(db: Session, student_id: int):
+    """Usuario y, por cada tarea asignada, la tarea y su completación (o NULL)"""
+    query = db.query(
+        User.is_admin,
+        Task.id, Task.title, Task.description, Task.image_path, Task.due_date, Task.group_id,
+        TaskCompletion.completed, TaskCompletion.completed_at, TaskCompletion.notes
+    ).select_from(User)
+
+    if assignments.SPARSE:
+        # Todas las tareas; la completación solo existe si el estudiante actuó
+        query = query.outerjoin(Task, true()).outerjoin(
+            TaskCompletion,
+            and_(TaskCompletion.task_id == Task.id, TaskCompletion.student_id == User.id)
+        )
+    else:
+        # Índice (student_id, task_id) de task_completions y clave primaria de tasks
+        query = query.outerjoin(TaskCompletion, TaskCompletion.student_id == User.id).outerjoin(
+            Task, Task.id == TaskCompletion.task_id
+        )
+    return query.filter(User.id == student_id)
+
+
+def bucket(row, now: datetime, upcoming_until: datetime) -> str:
+    if row.completed:
+        return COMPLETED
+    if row.due_date is None or row.due_date > upcoming_until:
+        return LATER
+    if row.due_date < now:
+        return OVERDUE
+    return UPCOMING
+
+
+def student_dashboard(db: Session, student_id: int, now: Optional[datetime] = None) -> dict:
+    now = now or datetime.utcnow()
+    upcoming_until = now + timedelta(days=DASHBOARD_UPCOMING_DAYS)
+
+    rows = rows_query(db, student_id).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="User not found")
+    if rows[0].is_admin:
+        raise HTTPException(status_code=403, detail="Admins cannot have assigned tasks")
+
+    buckets = {name: [] for name in BUCKETS}
+    for row in rows:
+        if row.id is None:
+            continue
+        buckets[bucket(row, now, upcoming_until)].append({
+            "id": row.id,
+            "title": row.title,
+            "description": row.description,
+            "image_path": row.image_path,
+            "image_variants": variant_urls(row.image_path),
+            "due_date": row.due_date,
+            "group_id": row.group_id,
+            "completed": bool(row.completed),
+            "completed_at": row.completed_at,
+            "notes": row.notes
+        })
+
+    # Vencidas y próximas por fecha de entrega; completadas, la más reciente primero
+    buckets[OVERDUE].sort(key=lambda task: (task["due_date"], task["id"]))
+    buckets[UPCOMING].sort(key=lambda task: (task["due_date"], task["id"]))
+    buckets[LATER].sort(key=lambda task: (task["due_date"] is None, task["due_date"] or now, task["id"]))
+    buckets[COMPLETED].sort(key=lambda task: (task["completed_at"] or now, task["id"]), reverse=True)
+
+    completed = len(buckets[COMPLETED])
+    total = completed + len(buckets[OVERDUE]) + len(buckets[UPCOMING]) + len(buckets[LATER])
+    return {
+        "student_id": student_id,
+        "generated_at": now,
+        "summary": {
+            "total": total,
+            "completed": completed,
+            "pending": total - completed,
+            "overdue": len(buckets[OVERDUE]),
+            "upcoming": len(buckets[UPCOMING]),
+            "completion_rate": completion_rate(completed, total)
+        },
+        **buckets
+    }
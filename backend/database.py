@@ -1,15 +1,28 @@
-from sqlalchemy import create_engine
+import time
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import sessionmaker, Session
+from starlette.concurrency import run_in_threadpool
+from fastapi import Request
 import mysql.connector
 from mysql.connector import Error
-from config import SQLALCHEMY_DATABASE_URL, MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE
+import metrics
+from replicas import ReplicaSet, Stickiness, routing_session_class, client_key, async_ping
+from config import (
+    SQLALCHEMY_DATABASE_URL, ASYNC_DATABASE_URL, DB_ASYNC,
+    READ_REPLICA_URLS, ASYNC_READ_REPLICA_URLS, REPLICA_STICKY_SECONDS, REPLICA_HEALTH_CHECK_SECONDS,
+    MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE
+)
 
 # Crear la base de datos si no existe
 
 # Configuración de SQLAlchemy
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
+    # SQLite (benchmarks): la sesión se usa desde el threadpool
+    connect_args={"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {},
     pool_pre_ping=True,
     pool_recycle=300,
     echo=False  # Cambiar a True para debug
@@ -17,8 +30,92 @@ engine = create_engine(
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine asíncrono para los endpoints (DB_ASYNC)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    pool_recycle=300,
+    echo=False
+) if DB_ASYNC else None
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+) if DB_ASYNC else None
+
 Base = declarative_base()
 
+
+# Instrumentación para /metrics: duración de cada sentencia (atribuida a la
+# petición en curso) y espera para obtener conexión del pool
+def instrument_engine(sync_engine, name: str):
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _end_query(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        metrics.record_query(statement, time.perf_counter() - started)
+
+    pool = sync_engine.pool
+    do_get = pool._do_get
+
+    def timed_do_get():
+        started = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            metrics.db_pool_wait.observe(time.perf_counter() - started, name)
+
+    pool._do_get = timed_do_get
+
+
+instrument_engine(engine, "sync")
+if DB_ASYNC:
+    instrument_engine(async_engine.sync_engine, "async")
+
+
+# Réplicas de lectura (opcionales): cada sesión de lectura fija una réplica
+def create_replica_set(sync_engines, name: str, ping=None) -> ReplicaSet:
+    replica_set = ReplicaSet(sync_engines, REPLICA_HEALTH_CHECK_SECONDS, ping)
+    for replica in sync_engines:
+        instrument_engine(replica, name)
+
+        @event.listens_for(replica, "handle_error")
+        def _replica_error(context, replica=replica):
+            # Conexión perdida: dejar de usar la réplica hasta la próxima comprobación
+            if context.is_disconnect:
+                replica_set.mark_down(replica)
+
+    return replica_set
+
+
+replicas = None
+async_replicas = None
+stickiness = Stickiness(REPLICA_STICKY_SECONDS)
+
+if READ_REPLICA_URLS:
+    replicas = create_replica_set([
+        create_engine(url, pool_pre_ping=True, pool_recycle=300) for url in READ_REPLICA_URLS
+    ], "replica")
+    SessionLocal = sessionmaker(
+        class_=routing_session_class(engine, replicas), autocommit=False, autoflush=False
+    )
+    if DB_ASYNC:
+        async_replica_engines = [
+            create_async_engine(url, pool_pre_ping=True, pool_recycle=300) for url in ASYNC_READ_REPLICA_URLS
+        ]
+        async_replicas = create_replica_set(
+            [replica.sync_engine for replica in async_replica_engines], "async_replica",
+            async_ping(async_replica_engines)
+        )
+        AsyncSessionLocal = async_sessionmaker(
+            async_engine,
+            sync_session_class=routing_session_class(async_engine.sync_engine, async_replicas),
+            autoflush=False,
+            expire_on_commit=False
+        )
+
 # Función para obtener la sesión de base de datos
 def get_db():
     db = SessionLocal()
@@ -27,4 +124,111 @@ def get_db():
     finally:
         db.close()
 
+# Ejecución de código ORM desde endpoints async
+class AsyncSessionRunner:
+    """
+    Ejecuta funciones ORM síncronas con AsyncSession.run_sync: la E/S con
+    MySQL se espera en el event loop, sin ocupar un hilo del threadpool.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def run(self, fn, *args, **kwargs):
+        return await self.session.run_sync(fn, *args, **kwargs)
+
+    def use_primary(self):
+        """Leer del primario aunque sea una petición GET (datos que no admiten retraso)"""
+        self.session.info["read_only"] = False
+
+
+class ThreadedSessionRunner:
+    """Ejecuta funciones ORM síncronas en el threadpool (ruta síncrona, DB_ASYNC=False)"""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def run(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+    def use_primary(self):
+        self.session.info["read_only"] = False
+
+
+# Dependencia para endpoints async: `await database.run(fn)` llama a fn(session).
+# Con réplicas, las peticiones GET leen de ellas salvo que el cliente haya
+# escrito hace poco (stickiness); cualquier otra petición marca al cliente.
+async def get_async_db(request: Request):
+    client = client_key(request)
+    reading = request.method in ("GET", "HEAD")
+    info = {
+        "read_only": reading and not stickiness.is_sticky(client),
+        "request_state": request.state,
+    }
+    # La limpieza de la dependencia se ejecuta después de enviar la respuesta:
+    # marcar antes para que las lecturas que el cliente haga justo después ya
+    # vayan al primario, y otra vez al final para contar el plazo desde el commit
+    if not reading:
+        stickiness.mark(client)
+    try:
+        if DB_ASYNC:
+            async with AsyncSessionLocal() as session:
+                session.info.update(info)
+                yield AsyncSessionRunner(session)
+        else:
+            db = SessionLocal()
+            db.info.update(info)
+            try:
+                yield ThreadedSessionRunner(db)
+            finally:
+                await run_in_threadpool(db.close)
+    finally:
+        if not reading:
+            stickiness.mark(client)
+
 # Función para crear las tablas en la base de datos
+
+
+# Conteo de consultas SQL, para detectar N+1 en los endpoints
+class QueryCounter:
+    """Registra las sentencias SQL que ejecuta el engine mientras está activo"""
+
+    def __init__(self, bind=None):
+        if bind is None:
+            bind = async_engine.sync_engine if DB_ASYNC else engine
+        self.bind = bind
+        self.statements = []
+        # (sentencia, parámetros) de las ejecuciones simples, para EXPLAIN
+        self.executions = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+        if not executemany:
+            self.executions.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(self.bind, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.bind, "before_cursor_execute", self._record)
+        return False
+
+
+@contextmanager
+def assert_max_queries(expected: int, bind=None):
+    """
+    Fallar si el bloque ejecuta más de `expected` consultas. Uso en pruebas:
+
+        with assert_max_queries(2):
+            client.get("/tasks")
+    """
+    with QueryCounter(bind) as counter:
+        yield counter
+    if counter.count > expected:
+        statements = "\n".join(counter.statements)
+        raise AssertionError(f"Expected at most {expected} queries, got {counter.count}:\n{statements}")
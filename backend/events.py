@@ -0,0 +1,87 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Optional
+
+from config import EVENT_QUEUE_SIZE, EVENT_HEARTBEAT_SECONDS
+
+# Publicación de cambios a los dashboards (server-sent events). EventHub
+# reparte los eventos en proceso; para varios workers se puede sustituir
+# `hub` por una implementación con la misma interfaz sobre un broker.
+
+RESYNC = "resync"
+
+
+class Subscription:
+    """Cola acotada de una conexión; si se llena, la conexión debe resincronizar"""
+
+    def __init__(self, queue_size: int, user_id: Optional[int] = None):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.user_id = user_id
+        self.lagged = False
+
+    def wants(self, event: dict) -> bool:
+        student_id = event["data"].get("student_id")
+        return self.user_id is None or student_id is None or student_id == self.user_id
+
+
+class EventHub:
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.subscriptions = set()
+        self.last_id = 0
+
+    def subscribe(self, user_id: Optional[int] = None) -> Subscription:
+        subscription = Subscription(self.queue_size, user_id)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscriptions.discard(subscription)
+
+    def publish(self, event_type: str, **data):
+        """
+        Encolar un evento en todas las conexiones interesadas. Nunca bloquea:
+        a una conexión con la cola llena se le descartan los eventos y se le
+        pide que vuelva a cargar los datos completos.
+        """
+        self.last_id += 1
+        event = {"id": self.last_id, "type": event_type, "data": data}
+        for subscription in list(self.subscriptions):
+            if subscription.lagged or not subscription.wants(event):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.lagged = True
+
+
+hub = EventHub(EVENT_QUEUE_SIZE)
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value)}")
+
+
+def format_event(event: dict) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'], default=_default)}\n\n"
+
+
+async def stream(request, subscription: Subscription, heartbeat: float = EVENT_HEARTBEAT_SECONDS):
+    """Generador SSE de una conexión; envía comentarios de keep-alive y se cierra al desconectar"""
+    try:
+        yield "retry: 3000\n\n"
+        while not await request.is_disconnected():
+            if subscription.lagged:
+                yield format_event({"id": hub.last_id, "type": RESYNC, "data": {}})
+                return
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        hub.unsubscribe(subscription)
@@ -0,0 +1,179 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator, List, Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import select, and_, func
+from sqlalchemy.sql import Select
+
+from database import SessionLocal
+from models import User, Task, TaskCompletion
+from aggregates import completion_rate
+from pagination import after_condition
+from config import ASSIGNMENT_MODE, EXPORT_BATCH_SIZE
+
+# Exportaciones en CSV/NDJSON. Las filas se leen por bloques de
+# EXPORT_BATCH_SIZE con consultas keyset (cada bloque continúa tras la clave
+# del anterior) en una sesión propia y se escriben según llegan, así que la
+# memoria del worker no depende del tamaño de los datos. No se usa
+# stream_results: mysqlconnector siempre trae el resultado completo al cliente.
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+COMPLETION_COLUMNS = {
+    "completion_id": TaskCompletion.id,
+    "task_id": Task.id,
+    "task_title": Task.title,
+    "due_date": Task.due_date,
+    "student_id": User.id,
+    "student_username": User.username,
+    "student_email": User.email,
+    "completed": TaskCompletion.completed,
+    "completed_at": TaskCompletion.completed_at,
+    "notes": TaskCompletion.notes,
+}
+
+# Claves de orden de cada exportación (únicas por fila)
+COMPLETION_KEYS = (Task.id, User.id)
+STUDENT_KEYS = (User.id,)
+
+STUDENT_COLUMNS = (
+    "student_id", "student_username", "student_email", "created_at",
+    "total_tasks", "completed_tasks", "pending_tasks", "completion_rate",
+)
+
+
+def select_columns(requested: Optional[str], available: Sequence[str]) -> List[str]:
+    """Columnas pedidas en `columns=a,b,c` (todas si no se indica); 400 si alguna no existe"""
+    if not requested:
+        return list(available)
+    columns = [column.strip() for column in requested.split(",") if column.strip()]
+    unknown = [column for column in columns if column not in available]
+    if unknown or not columns:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown columns: {', '.join(unknown)}. Available: {', '.join(available)}"
+        )
+    return columns
+
+
+def completions_statement(
+    columns: List[str],
+    task_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+    completed: Optional[bool] = None,
+    completed_from: Optional[datetime] = None,
+    completed_to: Optional[datetime] = None,
+) -> Select:
+    """
+    Completaciones con su tarea y su estudiante. En modo sparse las pendientes
+    sin fila salen del producto tareas x estudiantes con un outer join.
+    """
+    expressions = dict(COMPLETION_COLUMNS)
+    if ASSIGNMENT_MODE == "sparse":
+        # Sin fila la completación está pendiente
+        expressions["completed"] = func.coalesce(TaskCompletion.completed, False)
+    selected = [expressions[column].label(column) for column in columns]
+
+    if ASSIGNMENT_MODE == "sparse":
+        statement = select(*selected).select_from(Task).join(User, User.is_admin == False).outerjoin(
+            TaskCompletion,
+            and_(TaskCompletion.task_id == Task.id, TaskCompletion.student_id == User.id)
+        )
+    else:
+        statement = select(*selected).select_from(TaskCompletion).join(
+            Task, Task.id == TaskCompletion.task_id
+        ).join(User, User.id == TaskCompletion.student_id)
+
+    if task_id is not None:
+        statement = statement.where(Task.id == task_id)
+    if student_id is not None:
+        statement = statement.where(User.id == student_id)
+    if completed is True:
+        statement = statement.where(TaskCompletion.completed == True)
+    elif completed is False:
+        statement = statement.where((TaskCompletion.completed == False) | (TaskCompletion.id == None))
+    if completed_from is not None:
+        statement = statement.where(TaskCompletion.completed_at >= completed_from)
+    if completed_to is not None:
+        statement = statement.where(TaskCompletion.completed_at <= completed_to)
+    return statement
+
+
+def students_statement(created_from: Optional[datetime] = None, created_to: Optional[datetime] = None) -> Select:
+    statement = select(
+        User.id, User.username, User.email, User.created_at, User.assigned_count, User.completed_count
+    ).where(User.is_admin == False)
+    if created_from is not None:
+        statement = statement.where(User.created_at >= created_from)
+    if created_to is not None:
+        statement = statement.where(User.created_at <= created_to)
+    return statement
+
+
+def student_row(row, total_tasks: Optional[int]) -> dict:
+    """Estadísticas de un estudiante a partir de sus contadores"""
+    total = total_tasks if total_tasks is not None else row.assigned_count
+    return {
+        "student_id": row.id,
+        "student_username": row.username,
+        "student_email": row.email,
+        "created_at": row.created_at,
+        "total_tasks": total,
+        "completed_tasks": row.completed_count,
+        "pending_tasks": total - row.completed_count,
+        "completion_rate": completion_rate(row.completed_count, total),
+    }
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _encode(rows: List[dict], columns: List[str], fmt: str) -> str:
+    if fmt == "ndjson":
+        return "".join(json.dumps({column: _value(row[column]) for column in columns}) + "\n" for row in rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([[_value(row[column]) for column in columns] for row in rows])
+    return buffer.getvalue()
+
+
+def stream(
+    statement: Select, keys: Sequence, columns: List[str], fmt: str, transform=None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[str]:
+    """
+    Generador síncrono (StreamingResponse lo itera en el threadpool). La sesión
+    se abre al empezar a enviar y se cierra al terminar o si el cliente corta.
+    Cada bloque es un SELECT ordenado por `keys` con LIMIT `batch_size`.
+    """
+    db = SessionLocal()
+    # Lectura pesada sin requisitos de frescura: puede ir a una réplica
+    db.info["read_only"] = True
+    labels = [f"_key{index}" for index in range(len(keys))]
+    statement = statement.add_columns(*[key.label(label) for key, label in zip(keys, labels)]).order_by(*keys)
+    try:
+        if fmt == "csv":
+            yield _encode([dict(zip(columns, columns))], columns, fmt)
+
+        last = None
+        while True:
+            batch = statement if last is None else statement.where(after_condition(keys, last))
+            rows = db.execute(batch.limit(batch_size)).all()
+            if rows:
+                yield _encode([transform(row) if transform else row._asdict() for row in rows], columns, fmt)
+            if len(rows) < batch_size:
+                break
+            last = [getattr(rows[-1], label) for label in labels]
+    finally:
+        db.close()
+
+
+def filename(name: str, fmt: str) -> str:
+    return f"{name}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{fmt}"
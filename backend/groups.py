@@ -0,0 +1,161 @@
+from datetime import datetime
+from typing import List
+
+from fastapi import HTTPException
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from models import User, Task, TaskCompletion, Group, Enrollment, AssignmentTombstone
+import assignments
+import counters
+
+# Grupos (clases). Una tarea con group_id solo se asigna a los estudiantes
+# matriculados en su grupo, y las estadísticas de un grupo se leen de sus
+# tareas y de los contadores de sus matrículas: el coste de cada profesor
+# depende del tamaño de su clase y no del total de la plataforma.
+# En modo sparse toda tarea está asignada a todos los estudiantes, así que
+# los grupos solo existen en modo eager.
+
+
+def require_eager():
+    if assignments.SPARSE:
+        raise HTTPException(status_code=400, detail="Groups are not available in sparse assignment mode")
+
+
+def get_group(db: Session, group_id: int, lock: bool = False) -> Group:
+    query = db.query(Group).filter(Group.id == group_id)
+    if lock:
+        query = query.with_for_update()
+    group = query.first()
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found")
+    return group
+
+
+def _clear_tombstones(db: Session, student_ids: List[int], task_ids: List[int]):
+    """Las tareas vuelven a estar asignadas: GET /sync no debe borrarlas del cliente"""
+    if student_ids and task_ids:
+        db.query(AssignmentTombstone).filter(
+            AssignmentTombstone.student_id.in_(student_ids),
+            AssignmentTombstone.task_id.in_(task_ids)
+        ).delete(synchronize_session=False)
+
+
+def enroll(db: Session, group: Group, student_ids: List[int]) -> List[int]:
+    """
+    Matricular estudiantes y asignarles las tareas que el grupo ya tiene, con
+    los contadores en la misma transacción. Devuelve los ids matriculados
+    ahora (los que ya lo estaban se ignoran). No hace commit.
+    """
+    requested = set(student_ids)
+    students = {
+        student_id for (student_id,) in
+        db.query(User.id).filter(User.id.in_(requested), User.is_admin == False)
+    }
+    missing = requested - students
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Students not found: {sorted(missing)}")
+
+    enrolled = {
+        student_id for (student_id,) in
+        db.query(Enrollment.student_id).filter(
+            Enrollment.group_id == group.id,
+            Enrollment.student_id.in_(students)
+        )
+    }
+    new = sorted(students - enrolled)
+    if not new:
+        return []
+
+    task_ids = [task_id for (task_id,) in db.query(Task.id).filter(Task.group_id == group.id)]
+    now = datetime.utcnow()
+    db.execute(insert(Enrollment), [
+        {
+            "group_id": group.id,
+            "student_id": student_id,
+            "created_at": now,
+            "assigned_count": len(task_ids),
+            "completed_count": 0
+        }
+        for student_id in new
+    ])
+
+    _clear_tombstones(db, new, task_ids)
+    if task_ids:
+        db.execute(insert(TaskCompletion), [
+            {
+                "task_id": task_id,
+                "student_id": student_id,
+                "completed": False,
+                "created_at": now,
+                "updated_at": now
+            }
+            for student_id in new
+            for task_id in task_ids
+        ])
+        db.query(Task).filter(Task.group_id == group.id).update(
+            {Task.assigned_count: Task.assigned_count + len(new), Task.updated_at: Task.updated_at},
+            synchronize_session=False
+        )
+        db.query(User).filter(User.id.in_(new)).update(
+            {User.assigned_count: User.assigned_count + len(task_ids)}, synchronize_session=False
+        )
+        counters.increment(db, counters.TOTAL_ASSIGNMENTS, len(new) * len(task_ids))
+
+    group.student_count += len(new)
+    return new
+
+
+def unenroll(db: Session, group: Group, student_id: int):
+    """
+    Dar de baja a un estudiante: se borran sus completaciones de las tareas
+    del grupo y se descuentan de los contadores. Las tareas quedan como
+    retiradas (assignment_tombstones) para que GET /sync las borre del
+    cliente. No hace commit.
+    """
+    enrollment = db.query(Enrollment).filter(
+        Enrollment.group_id == group.id,
+        Enrollment.student_id == student_id
+    ).with_for_update().first()
+    if not enrollment:
+        raise HTTPException(status_code=404, detail="Student not enrolled in group")
+
+    group_tasks = select(Task.id).where(Task.group_id == group.id).scalar_subquery()
+    rows = db.query(TaskCompletion).filter(
+        TaskCompletion.student_id == student_id,
+        TaskCompletion.task_id.in_(group_tasks)
+    )
+    assigned = [task_id for (task_id,) in rows.with_entities(TaskCompletion.task_id)]
+    completed = [
+        task_id for (task_id,) in
+        rows.filter(TaskCompletion.completed == True).with_entities(TaskCompletion.task_id)
+    ]
+
+    for task_ids, column in ((assigned, Task.assigned_count), (completed, Task.completed_count)):
+        if task_ids:
+            db.query(Task).filter(Task.id.in_(task_ids)).update(
+                {column: column - 1, Task.updated_at: Task.updated_at}, synchronize_session=False
+            )
+    counters.increment_student(db, student_id, assigned=-len(assigned), completed=-len(completed))
+    counters.increment(db, counters.TOTAL_ASSIGNMENTS, -len(assigned))
+    counters.increment(db, counters.COMPLETED_ASSIGNMENTS, -len(completed))
+
+    rows.delete(synchronize_session=False)
+    task_ids = [task_id for (task_id,) in db.query(Task.id).filter(Task.group_id == group.id)]
+    _clear_tombstones(db, [student_id], task_ids)
+    if task_ids:
+        now = datetime.utcnow()
+        db.execute(insert(AssignmentTombstone), [
+            {"student_id": student_id, "task_id": task_id, "deleted_at": now} for task_id in task_ids
+        ])
+    db.delete(enrollment)
+    group.student_count -= 1
+
+
+def overview(db: Session, group: Group) -> tuple:
+    """(tareas, asignaciones, completadas) del grupo, sumando los contadores de sus tareas"""
+    return db.query(
+        func.count(Task.id),
+        func.coalesce(func.sum(Task.assigned_count), 0),
+        func.coalesce(func.sum(Task.completed_count), 0)
+    ).filter(Task.group_id == group.id).one()
@@ -0,0 +1,199 @@
+import asyncio
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import MAX_UPLOAD_BYTES, IMAGE_WORKERS, THUMBNAIL_SIZE, MEDIUM_SIZE
+
+# Variantes que se generan para cada imagen subida. Los nombres se derivan
+# del original, así que las URLs se conocen sin consultar la base de datos,
+# pero solo se anuncian las que ya existen en el almacén: se generan después
+# de responder y las imágenes antiguas pueden no tenerlas.
+VARIANTS = {
+    "thumbnail": ("_thumb", None, THUMBNAIL_SIZE),
+    "medium": ("_medium", None, MEDIUM_SIZE),
+    "webp": ("_medium", ".webp", MEDIUM_SIZE),
+}
+
+CHUNK_SIZE = 64 * 1024
+
+# Margen del cuerpo multipart sobre la imagen (límites y campos del formulario)
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Una variante que existe no se borra salvo con storage.gc; las que faltan
+# se vuelven a comprobar pasado este tiempo
+MISSING_RECHECK_SECONDS = 30
+
+_pool = None
+# Nombre de variante -> (existe, momento de la comprobación)
+_available = {}
+
+
+def variant_names(file_name: str) -> list:
+    return [variant_name(file_name, variant) for variant in VARIANTS]
+
+
+def variant_name(file_name: str, variant: str) -> str:
+    suffix, extension, _ = VARIANTS[variant]
+    stem, original_extension = os.path.splitext(file_name)
+    return f"{stem}{suffix}{extension or original_extension}"
+
+
+def variant_exists(name: str) -> bool:
+    """Si la variante ya está en el almacén (con caché en proceso)"""
+    from storage import get_storage
+
+    now = time.monotonic()
+    known = _available.get(name)
+    if known is not None and (known[0] or now - known[1] < MISSING_RECHECK_SECONDS):
+        return known[0]
+    exists = get_storage().exists(name)
+    _available[name] = (exists, now)
+    return exists
+
+
+def mark_available(names: list, exists: bool = True):
+    now = time.monotonic()
+    for name in names:
+        _available[name] = (exists, now)
+
+
+def variant_urls(image_path: Optional[str]) -> Optional[dict]:
+    """
+    URLs de las variantes ya generadas de una imagen servida desde /uploads.
+    Las que faltan no se incluyen: los clientes usan entonces image_path.
+    """
+    if not image_path:
+        return None
+    urls = {}
+    for variant in VARIANTS:
+        url = variant_name(image_path, variant)
+        if variant_exists(url.rsplit("/", 1)[-1]):
+            urls[variant] = url
+    return urls or None
+
+
+def copy_with_limit(source, file_path: str, max_bytes: int = MAX_UPLOAD_BYTES) -> Tuple[int, str]:
+    """
+    Copiar la subida por bloques cortando al superar `max_bytes` (413).
+    Devuelve el número de bytes escritos y el SHA-256 del contenido.
+    """
+    written = 0
+    digest = hashlib.sha256()
+    try:
+        with open(file_path, "wb") as buffer:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise HTTPException(status_code=413, detail="Image too large")
+                digest.update(chunk)
+                buffer.write(chunk)
+    except BaseException:
+        Path(file_path).unlink(missing_ok=True)
+        raise
+    return written, digest.hexdigest()
+
+
+def generate_variants(file_path: str) -> list:
+    """Crear las variantes redimensionadas de una imagen (se ejecuta en otro proceso)"""
+    from PIL import Image, ImageOps
+
+    created = []
+    directory, file_name = os.path.split(file_path)
+    with Image.open(file_path) as original:
+        # exif_transpose devuelve una imagen nueva sin `format`
+        source_format = original.format
+        original = ImageOps.exif_transpose(original)
+        for variant, (_, extension, size) in VARIANTS.items():
+            image = original.copy()
+            image.thumbnail((size, size))
+            target = os.path.join(directory, variant_name(file_name, variant))
+            if extension == ".webp":
+                image.save(target, "WEBP", quality=80)
+            elif source_format == "PNG" or image.mode in ("RGBA", "P"):
+                image.save(target, "PNG", optimize=True)
+            else:
+                image.convert("RGB").save(target, "JPEG", quality=85, optimize=True, progressive=True)
+            created.append(target)
+    return created
+
+
+def _finish(future):
+    if future.cancelled():
+        return
+    if future.exception() is not None:
+        print(f"Error generating image variants: {future.exception()}")
+        return
+    mark_available([os.path.basename(path) for path in future.result()])
+
+
+def schedule_variants(file_path: str):
+    """Encolar la generación de variantes en el pool de procesos sin esperar el resultado"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    future = asyncio.get_running_loop().run_in_executor(_pool, generate_variants, file_path)
+    future.add_done_callback(_finish)
+    return future
+
+
+class UploadLimitMiddleware:
+    """
+    Rechazar con 413 las subidas a `paths` que superan MAX_UPLOAD_BYTES antes
+    de que Starlette vuelque el formulario a disco: por Content-Length si
+    viene, y si no contando los bytes a medida que llegan.
+    """
+
+    def __init__(self, app: ASGIApp, paths: Sequence[str], max_bytes: int = MAX_UPLOAD_BYTES):
+        self.app = app
+        self.paths = set(paths)
+        self.max_body = max_bytes + MULTIPART_OVERHEAD
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_body:
+            await JSONResponse({"detail": "Image too large"}, status_code=413)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    # FastAPI propaga las HTTPException al leer el formulario
+                    raise HTTPException(status_code=413, detail="Image too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+if __name__ == "__main__":
+    # Regenerar las variantes de todas las imágenes existentes
+    from config import UPLOAD_DIR
+
+    suffixes = tuple(suffix for suffix, _, _ in VARIANTS.values())
+    for path in sorted(Path(UPLOAD_DIR).iterdir()):
+        if path.is_file() and path.suffix.lower() in (".jpg", ".jpeg", ".png") and not path.stem.endswith(suffixes):
+            try:
+                generate_variants(str(path))
+                print(f"OK {path.name}")
+            except Exception as e:
+                print(f"ERROR {path.name}: {e}")
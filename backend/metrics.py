@@ -0,0 +1,237 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import SLOW_REQUEST_SECONDS, SLOW_REQUEST_MAX_STATEMENTS
+
+# Métricas de la API en formato de texto de Prometheus (GET /metrics), sin
+# dependencias externas. Las consultas SQL se atribuyen a la petición en
+# curso mediante una ContextVar que rellenan los eventos del engine.
+
+logger = logging.getLogger("slow_requests")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self.lock:
+            items = list(self.values.items())
+        return self.header() + [f"{self.name}{_labels(self.label_names, k)} {v}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *labels, value: float):
+        with self.lock:
+            self.values[labels] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        with self.lock:
+            counts, total = self.values.get(labels, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect_left(self.buckets, value)] += 1
+            self.values[labels] = (counts, total + value)
+
+    def render(self) -> List[str]:
+        with self.lock:
+            items = [(k, (list(counts), total)) for k, (counts, total) in self.values.items()]
+        lines = self.header()
+        names = self.label_names + ("le",)
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(names, labels + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        # Funciones que devuelven líneas ya formateadas (estado de pools, cachés...)
+        self.collectors = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], List[str]]):
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status")
+))
+http_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP", ("method", "route")
+))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Peticiones HTTP en curso"
+))
+db_queries = registry.register(Histogram(
+    "db_queries_per_request", "Sentencias SQL por petición", ("method", "route"), QUERY_BUCKETS
+))
+db_time = registry.register(Histogram(
+    "db_time_per_request_seconds", "Tiempo en la base de datos por petición", ("method", "route")
+))
+db_pool_wait = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Espera para obtener una conexión del pool", ("engine",),
+    (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+))
+slow_requests = registry.register(Counter(
+    "http_slow_requests_total", "Peticiones por encima de SLOW_REQUEST_SECONDS", ("method", "route")
+))
+
+
+def sample_lines(
+    name: str, documentation: str, values: Dict[Tuple, float], label_names: Sequence[str] = (), kind: str = "gauge"
+) -> List[str]:
+    """Líneas de una métrica calculada al vuelo (para los collectors)"""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{_labels(label_names, labels)} {value}" for labels, value in values.items())
+    return lines
+
+
+# Estadísticas de la petición en curso
+
+class RequestStats:
+    __slots__ = ("queries", "db_time", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = []
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def record_query(statement: str, duration: float):
+    """Llamado desde los eventos del engine tras cada sentencia"""
+    stats = current_request.get()
+    if stats is None:
+        return
+    stats.queries += 1
+    stats.db_time += duration
+    if len(stats.statements) < SLOW_REQUEST_MAX_STATEMENTS:
+        stats.statements.append((duration, statement))
+
+
+def route_template(routes, scope: Scope) -> str:
+    """Ruta con parámetros (/tasks/{task_id}) para no crear una serie por id"""
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", scope["path"])
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Mide latencia, estado, consultas SQL y tiempo en base de datos de cada
+    petición HTTP. Las que superan SLOW_REQUEST_SECONDS se registran en el log
+    `slow_requests` con el SQL que ejecutaron.
+    """
+
+    def __init__(self, app: ASGIApp, routes: Sequence, skip_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.routes = routes
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = {"code": 500}
+
+        async def track(message: Message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        http_in_flight.inc(amount=1)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, track)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_flight.inc(amount=-1)
+            current_request.reset(token)
+            self.observe(scope, status["code"], elapsed, stats)
+
+    def observe(self, scope: Scope, status: int, elapsed: float, stats: RequestStats):
+        method = scope["method"]
+        route = route_template(self.routes, scope)
+        http_requests.inc(method, route, status)
+        http_latency.observe(elapsed, method, route)
+        db_queries.observe(stats.queries, method, route)
+        db_time.observe(stats.db_time, method, route)
+
+        if elapsed >= SLOW_REQUEST_SECONDS:
+            slow_requests.inc(method, route)
+            statements = "\n".join(
+                f"  [{duration * 1000:.1f} ms] {statement}" for duration, statement in stats.statements
+            )
+            logger.warning(
+                "Slow request %s %s (%s): %.3fs, %d queries, %.3fs in DB\n%s",
+                method, scope["path"], route, elapsed, stats.queries, stats.db_time, statements
+            )
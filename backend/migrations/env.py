@@ -0,0 +1,57 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+
+from config import SQLALCHEMY_DATABASE_URL
+from database import Base
+import models  # noqa: F401 (registra las tablas en Base.metadata)
+
+# Las migraciones son las dueñas del esquema; models.py debe coincidir con
+# el resultado de `alembic upgrade head` (alembic revision --autogenerate lo comprueba)
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    """Generar el SQL sin conexión: alembic upgrade head --sql"""
+    context.configure(
+        url=SQLALCHEMY_DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        # SQLite no admite ALTER TABLE completo: usar el modo batch
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # Las pruebas pasan su propia conexión en config.attributes
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        run_migrations(connection)
+        return
+    connectable = create_engine(SQLALCHEMY_DATABASE_URL)
+    with connectable.connect() as connection:
+        run_migrations(connection)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
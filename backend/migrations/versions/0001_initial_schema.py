@@ -0,0 +1,59 @@
+"""Esquema inicial (models.py antes de usar migraciones)
+
+Las bases creadas antes de usar migraciones se marcan con
+`alembic stamp 0001` y después se actualizan con `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(255), nullable=False, unique=True),
+        sa.Column("username", sa.String(255), nullable=False, unique=True),
+        sa.Column("hashed_password", sa.String(255), nullable=False),
+        sa.Column("is_admin", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+
+    op.create_table(
+        "tasks",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(255), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("image_path", sa.String(255), nullable=True),
+        sa.Column("due_date", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("creator_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+    )
+    op.create_index("ix_tasks_id", "tasks", ["id"])
+
+    op.create_table(
+        "task_completions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("task_id", sa.Integer(), sa.ForeignKey("tasks.id"), nullable=False),
+        sa.Column("student_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("completed", sa.Boolean(), nullable=False),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+        sa.Column("notes", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_task_completions_id", "task_completions", ["id"])
+
+
+def downgrade():
+    op.drop_table("task_completions")
+    op.drop_table("tasks")
+    op.drop_table("users")
@@ -0,0 +1,38 @@
+"""Índices para las consultas más frecuentes y unicidad de las completaciones
+
+- task_completions: una fila por (task_id, student_id)
+- task_completions: (task_id, completed, student_id) y
+  (student_id, completed, task_id) cubren los filtros por estado con cursor
+- users: (is_admin, id) para listados de estudiantes y el fan-out
+
+Antes de crear el índice único se borran las completaciones duplicadas
+(se conserva la de menor id).
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "DELETE FROM task_completions WHERE id NOT IN ("
+        "SELECT id FROM (SELECT MIN(id) AS id FROM task_completions GROUP BY task_id, student_id) AS keep)"
+    )
+    op.create_index("uq_task_completions_task_student", "task_completions", ["task_id", "student_id"], unique=True)
+    op.create_index("ix_task_completions_task_completed", "task_completions", ["task_id", "completed", "student_id"])
+    op.create_index("ix_task_completions_student_completed", "task_completions", ["student_id", "completed", "task_id"])
+    op.create_index("ix_users_is_admin_id", "users", ["is_admin", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_users_is_admin_id", table_name="users")
+    op.drop_index("ix_task_completions_student_completed", table_name="task_completions")
+    op.drop_index("ix_task_completions_task_completed", table_name="task_completions")
+    op.drop_index("uq_task_completions_task_student", table_name="task_completions")
@@ -0,0 +1,62 @@
+"""Grupos (clases) y matrículas
+
+- student_groups: grupos de cada profesor, con (owner_id, id) para listarlos
+- enrollments: matrículas con sus contadores; la clave primaria
+  (group_id, student_id) sirve los listados y estadísticas por grupo y
+  (student_id, group_id) los grupos de un estudiante
+- tasks.group_id: NULL para las tareas de todos los estudiantes; el índice
+  (group_id, id) sirve los listados y estadísticas de un grupo
+
+Las tareas existentes quedan sin grupo, así que no hay datos que migrar.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "student_groups",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("student_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index("ix_student_groups_owner_id_id", "student_groups", ["owner_id", "id"])
+
+    op.create_table(
+        "enrollments",
+        sa.Column("group_id", sa.Integer(), sa.ForeignKey("student_groups.id"), primary_key=True),
+        sa.Column("student_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("assigned_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("completed_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index("ix_enrollments_student_group", "enrollments", ["student_id", "group_id"])
+
+    # Modo batch: SQLite no puede añadir una FK con ALTER TABLE y recrea la tabla
+    with op.batch_alter_table("tasks") as batch_op:
+        batch_op.add_column(sa.Column("group_id", sa.Integer(), nullable=True))
+        # El índice antes de la FK: MySQL lo usa para ella en lugar de crear otro
+        batch_op.create_index("ix_tasks_group_id_id", ["group_id", "id"])
+        batch_op.create_foreign_key("fk_tasks_group_id", "student_groups", ["group_id"], ["id"])
+
+
+def downgrade():
+    with op.batch_alter_table("tasks") as batch_op:
+        batch_op.drop_constraint("fk_tasks_group_id", type_="foreignkey")
+        batch_op.drop_index("ix_tasks_group_id_id")
+        batch_op.drop_column("group_id")
+    op.drop_index("ix_enrollments_student_group", table_name="enrollments")
+    op.drop_table("enrollments")
+    op.drop_index("ix_student_groups_owner_id_id", table_name="student_groups")
+    op.drop_table("student_groups")
@@ -0,0 +1,51 @@
+"""Series temporales de completaciones
+
+- completion_rollups: completaciones por hora y por día del total, de cada
+  tarea, estudiante y grupo; la clave primaria (granularity, scope,
+  scope_id, bucket_start) sirve /statistics/timeseries
+- rollup_watermarks: hasta dónde ha agregado rollups.py
+- task_completions: índice por completed_at para el recorrido incremental
+
+Las tablas se crean vacías; el agregador de la API (o `python rollups.py`)
+agrega el histórico en su primera pasada.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "completion_rollups",
+        sa.Column("granularity", sa.String(8), primary_key=True),
+        sa.Column("scope", sa.String(8), primary_key=True),
+        sa.Column("scope_id", sa.Integer(), primary_key=True),
+        sa.Column("bucket_start", sa.DateTime(), primary_key=True),
+        sa.Column("completed", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index(
+        "ix_completion_rollups_granularity_bucket", "completion_rollups", ["granularity", "bucket_start"]
+    )
+
+    op.create_table(
+        "rollup_watermarks",
+        sa.Column("name", sa.String(64), primary_key=True),
+        sa.Column("value", sa.DateTime(), nullable=False),
+    )
+
+    op.create_index("ix_task_completions_completed_at", "task_completions", ["completed_at"])
+
+
+def downgrade():
+    op.drop_index("ix_task_completions_completed_at", table_name="task_completions")
+    op.drop_table("rollup_watermarks")
+    op.drop_index("ix_completion_rollups_granularity_bucket", table_name="completion_rollups")
+    op.drop_table("completion_rollups")
@@ -0,0 +1,34 @@
+"""Tareas retiradas a un estudiante
+
+- assignment_tombstones: (student_id, task_id) de las tareas de un grupo
+  al dar de baja al estudiante, para que GET /sync las borre del cliente;
+  el índice (student_id, deleted_at) sirve la sincronización incremental
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "assignment_tombstones",
+        sa.Column("student_id", sa.Integer(), primary_key=True),
+        sa.Column("task_id", sa.Integer(), primary_key=True),
+        sa.Column("deleted_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index(
+        "ix_assignment_tombstones_student_deleted", "assignment_tombstones", ["student_id", "deleted_at"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_assignment_tombstones_student_deleted", table_name="assignment_tombstones")
+    op.drop_table("assignment_tombstones")
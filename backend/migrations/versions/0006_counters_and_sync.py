@@ -0,0 +1,115 @@
+"""Contadores, sincronización incremental y almacenamiento de imágenes
+
+- users y tasks: assigned_count y completed_count, mantenidos junto a las
+  completaciones; stat_counters guarda los totales globales
+- tasks: updated_at y assignment_status (estado del fan-out), con índices
+  (creator_id, id), (due_date, id) y (updated_at, id) para los listados
+- task_completions: updated_at y los índices (student_id, task_id) y
+  (student_id, updated_at) para /users/{id}/tasks y GET /sync
+- upload_blobs: imágenes direccionadas por contenido con su ref_count
+- task_tombstones: tareas borradas, para GET /sync
+
+updated_at se rellena con la última fecha conocida de cada fila y las tareas
+existentes quedan con assignment_status "done" (ya tienen sus completaciones).
+Los contadores se calculan con counters.reconcile; en modo --sql hay que
+ejecutar `python counters.py` después de aplicar el script.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def _counter_columns():
+    return [
+        sa.Column("assigned_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("completed_count", sa.Integer(), nullable=False, server_default="0"),
+    ]
+
+
+def upgrade():
+    for column in _counter_columns():
+        op.add_column("users", column)
+
+    # updated_at se añade admitiendo NULL, se rellena y después pasa a NOT NULL
+    # (SQLite no acepta un valor por defecto no constante en ADD COLUMN)
+    op.add_column("tasks", sa.Column("updated_at", sa.DateTime(), nullable=True))
+    for column in _counter_columns():
+        op.add_column("tasks", column)
+    op.add_column("tasks", sa.Column("assignment_status", sa.String(16), nullable=False, server_default="done"))
+    op.execute("UPDATE tasks SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)")
+    with op.batch_alter_table("tasks") as batch_op:
+        batch_op.alter_column("updated_at", existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_index("ix_tasks_creator_id_id", ["creator_id", "id"])
+        batch_op.create_index("ix_tasks_due_date_id", ["due_date", "id"])
+        batch_op.create_index("ix_tasks_updated_at_id", ["updated_at", "id"])
+
+    op.add_column("task_completions", sa.Column("updated_at", sa.DateTime(), nullable=True))
+    op.execute("UPDATE task_completions SET updated_at = COALESCE(completed_at, created_at, CURRENT_TIMESTAMP)")
+    with op.batch_alter_table("task_completions") as batch_op:
+        batch_op.alter_column("updated_at", existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_index("ix_task_completions_student_task", ["student_id", "task_id"])
+        batch_op.create_index("ix_task_completions_student_updated", ["student_id", "updated_at"])
+
+    op.create_table(
+        "stat_counters",
+        sa.Column("name", sa.String(64), primary_key=True),
+        sa.Column("value", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+    op.create_table(
+        "upload_blobs",
+        sa.Column("name", sa.String(80), primary_key=True),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+
+    op.create_table(
+        "task_tombstones",
+        sa.Column("task_id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("deleted_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_task_tombstones_deleted_at", "task_tombstones", ["deleted_at"])
+
+    if context.is_offline_mode():
+        return
+    # Los modelos coinciden con el esquema de esta revisión; la sesión usa la
+    # transacción de la migración, así que su commit no la cierra
+    import counters
+
+    with Session(bind=op.get_bind()) as db:
+        counters.reconcile(db, fix=True)
+
+
+def downgrade():
+    op.drop_index("ix_task_tombstones_deleted_at", table_name="task_tombstones")
+    op.drop_table("task_tombstones")
+    op.drop_table("upload_blobs")
+    op.drop_table("stat_counters")
+
+    with op.batch_alter_table("task_completions") as batch_op:
+        batch_op.drop_index("ix_task_completions_student_updated")
+        batch_op.drop_index("ix_task_completions_student_task")
+        batch_op.drop_column("updated_at")
+
+    with op.batch_alter_table("tasks") as batch_op:
+        batch_op.drop_index("ix_tasks_updated_at_id")
+        batch_op.drop_index("ix_tasks_due_date_id")
+        batch_op.drop_index("ix_tasks_creator_id_id")
+        batch_op.drop_column("assignment_status")
+        batch_op.drop_column("completed_count")
+        batch_op.drop_column("assigned_count")
+        batch_op.drop_column("updated_at")
+
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("completed_count")
+        batch_op.drop_column("assigned_count")
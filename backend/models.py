@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -12,11 +12,19 @@ class User(Base):
     hashed_password = Column(String(255), nullable=False)
     is_admin = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Contadores mantenidos en la misma transacción que las completaciones
+    assigned_count = Column(Integer, default=0, nullable=False)
+    completed_count = Column(Integer, default=0, nullable=False)
 
     # Relationships
     completions = relationship("TaskCompletion", back_populates="student")
     created_tasks = relationship("Task", back_populates="creator")
 
+    # Listados y fan-out filtran por is_admin y ordenan por id
+    __table_args__ = (
+        Index("ix_users_is_admin_id", "is_admin", "id"),
+    )
+
 
 class Task(Base):
     __tablename__ = "tasks"
@@ -27,12 +35,30 @@ class Task(Base):
     image_path = Column(String(255), nullable=True)
     due_date = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Último cambio visible para los clientes (GET /sync)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     creator_id = Column(Integer, ForeignKey("users.id"))
+    # Grupo al que se asigna la tarea; NULL = todos los estudiantes
+    group_id = Column(Integer, ForeignKey("student_groups.id"), nullable=True)
+    # Contadores mantenidos en la misma transacción que las completaciones
+    assigned_count = Column(Integer, default=0, nullable=False)
+    completed_count = Column(Integer, default=0, nullable=False)
+    # Estado de la creación de completaciones: pending, running, done, failed
+    assignment_status = Column(String(16), default="done", nullable=False)
 
     # Relationships
     creator = relationship("User", back_populates="created_tasks")
+    group = relationship("Group", back_populates="tasks")
     completions = relationship("TaskCompletion", back_populates="task", cascade="all, delete-orphan")
 
+    # Índices para los filtros y cursores de GET /tasks
+    __table_args__ = (
+        Index("ix_tasks_creator_id_id", "creator_id", "id"),
+        Index("ix_tasks_due_date_id", "due_date", "id"),
+        Index("ix_tasks_updated_at_id", "updated_at", "id"),
+        Index("ix_tasks_group_id_id", "group_id", "id"),
+    )
+
 
 class TaskCompletion(Base):
     __tablename__ = "task_completions"
@@ -44,8 +70,122 @@ class TaskCompletion(Base):
     completed_at = Column(DateTime, nullable=True)
     notes = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
     # Relationships
     task = relationship("Task", back_populates="completions")
     student = relationship("User", back_populates="completions")
-    
\ No newline at end of file
+
+    # Una completación por tarea y estudiante. Los índices cubren los cursores
+    # de /users/{id}/tasks y /tasks/{id} (también filtrando por estado), GET /sync
+    # y el recorrido incremental por completed_at de rollups.py
+    __table_args__ = (
+        Index("uq_task_completions_task_student", "task_id", "student_id", unique=True),
+        Index("ix_task_completions_student_task", "student_id", "task_id"),
+        Index("ix_task_completions_task_completed", "task_id", "completed", "student_id"),
+        Index("ix_task_completions_student_completed", "student_id", "completed", "task_id"),
+        Index("ix_task_completions_student_updated", "student_id", "updated_at"),
+        Index("ix_task_completions_completed_at", "completed_at"),
+    )
+
+
+class StatCounter(Base):
+    __tablename__ = "stat_counters"
+
+    name = Column(String(64), primary_key=True)
+    value = Column(Integer, default=0, nullable=False)
+
+
+class UploadBlob(Base):
+    __tablename__ = "upload_blobs"
+
+    # Nombre direccionado por contenido: <sha256>.<extensión>
+    name = Column(String(80), primary_key=True)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class TaskTombstone(Base):
+    __tablename__ = "task_tombstones"
+
+    # Tareas borradas, para que GET /sync pueda comunicar los borrados
+    task_id = Column(Integer, primary_key=True)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+class AssignmentTombstone(Base):
+    __tablename__ = "assignment_tombstones"
+
+    # Tareas retiradas a un estudiante (baja de un grupo), para GET /sync
+    student_id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, primary_key=True)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_assignment_tombstones_student_deleted", "student_id", "deleted_at"),
+    )
+
+
+class Group(Base):
+    __tablename__ = "student_groups"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), nullable=False)
+    # Profesor (admin) responsable del grupo
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # Contador mantenido al matricular y dar de baja
+    student_count = Column(Integer, default=0, nullable=False)
+
+    tasks = relationship("Task", back_populates="group")
+    enrollments = relationship("Enrollment", back_populates="group")
+
+    __table_args__ = (
+        Index("ix_student_groups_owner_id_id", "owner_id", "id"),
+    )
+
+
+class Enrollment(Base):
+    __tablename__ = "enrollments"
+
+    group_id = Column(Integer, ForeignKey("student_groups.id"), primary_key=True)
+    student_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # Contadores del estudiante limitados a las tareas del grupo
+    assigned_count = Column(Integer, default=0, nullable=False)
+    completed_count = Column(Integer, default=0, nullable=False)
+
+    group = relationship("Group", back_populates="enrollments")
+    student = relationship("User")
+
+    # La clave primaria (group_id, student_id) sirve los listados por grupo
+    __table_args__ = (
+        Index("ix_enrollments_student_group", "student_id", "group_id"),
+    )
+
+
+class CompletionRollup(Base):
+    __tablename__ = "completion_rollups"
+
+    # Completaciones por hora o día de un ámbito: total (all, scope_id 0),
+    # una tarea, un estudiante o un grupo. Las rellena rollups.py
+    granularity = Column(String(8), primary_key=True)
+    scope = Column(String(8), primary_key=True)
+    scope_id = Column(Integer, primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    completed = Column(Integer, default=0, nullable=False)
+
+    # La clave primaria sirve las series de /statistics/timeseries; este índice,
+    # las filas que el agregador actualiza en cada ventana
+    __table_args__ = (
+        Index("ix_completion_rollups_granularity_bucket", "granularity", "bucket_start"),
+    )
+
+
+class RollupWatermark(Base):
+    __tablename__ = "rollup_watermarks"
+
+    # Hasta dónde (completed_at) se han agregado las completaciones
+    name = Column(String(64), primary_key=True)
+    value = Column(DateTime, nullable=False)
@@ -0,0 +1,91 @@
+import base64
+import json
+from datetime import datetime
+from typing import Callable, Optional, Sequence
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+
+from config import MAX_PAGE_SIZE
+
+# Paginación por cursor (keyset): el cursor codifica los valores de las
+# columnas de orden de la última fila devuelta, de modo que cada página es
+# un rango de índice y no depende de OFFSET. Sin `limit` ni cursor se
+# devuelve la lista completa, como antes de paginar, para los clientes que
+# no siguen X-Next-Cursor.
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Sequence) -> str:
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        return [
+            datetime.fromisoformat(v) if isinstance(v, str) and column.type.python_type is datetime else v
+            for column, v in zip(columns, values)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def after_condition(columns: Sequence, values: Sequence, descending: bool = False):
+    """
+    Condición "fila posterior al cursor" para (columna, id). Solo la primera
+    columna puede ser nula; los NULL van primero en orden ascendente y al
+    final en descendente (como en MySQL y SQLite).
+    """
+    def beyond(column, value):
+        return column < value if descending else column > value
+
+    if len(columns) == 1:
+        return beyond(columns[0], values[0])
+
+    first, last = columns
+    first_value, last_value = values
+    if first_value is None:
+        if descending:
+            return and_(first == None, beyond(last, last_value))
+        return or_(first != None, and_(first == None, beyond(last, last_value)))
+
+    condition = or_(beyond(first, first_value), and_(first == first_value, beyond(last, last_value)))
+    if descending:
+        condition = or_(condition, first == None)
+    return condition
+
+
+def paginate(
+    query,
+    columns: Sequence,
+    key: Callable,
+    after: Optional[str],
+    limit: Optional[int],
+    descending: bool = False
+):
+    """
+    Aplicar el cursor y el límite a `query` ordenando por `columns`.
+    `key(fila)` devuelve los valores de orden de una fila para el siguiente cursor.
+    Con cursor y sin `limit` se usan páginas de MAX_PAGE_SIZE.
+    Devuelve (filas, siguiente_cursor o None).
+    """
+    order = [column.desc() if descending else column.asc() for column in columns]
+    if limit is None and not after:
+        return query.order_by(*order).all(), None
+    limit = limit or MAX_PAGE_SIZE
+    if after:
+        query = query.filter(after_condition(columns, decode_cursor(after, columns), descending))
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = encode_cursor(key(rows[limit - 1])) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
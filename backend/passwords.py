@@ -0,0 +1,63 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from config import (
+    BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT, PASSWORD_HASH_RETRY_AFTER
+)
+
+# Contexto de contraseñas único para toda la aplicación. Cualquier hash con un
+# coste distinto de BCRYPT_ROUNDS se marca para recalcular en el próximo login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS
+)
+
+
+class PasswordHasher:
+    """
+    Ejecuta bcrypt en un pool de hilos de tamaño fijo (bcrypt libera el GIL).
+    Si hay demasiadas operaciones en curso o en cola se rechaza la petición
+    con 503 y Retry-After en lugar de saturar la CPU del resto de endpoints.
+    """
+
+    def __init__(self, workers: int, queue_limit: int, retry_after: int):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.slots = threading.BoundedSemaphore(queue_limit)
+        self.retry_after = retry_after
+
+    def _submit(self, fn, *args):
+        if not self.slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server busy, please retry",
+                headers={"Retry-After": str(self.retry_after)}
+            )
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    async def hash(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(pwd_context.hash, password))
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Devuelve (válida, nuevo_hash); nuevo_hash no es None si cambió el coste"""
+        return await asyncio.wrap_future(self._submit(pwd_context.verify_and_update, password, hashed))
+
+    def hash_sync(self, password: str) -> str:
+        """Versión bloqueante para código que ya corre fuera del event loop"""
+        return self._submit(pwd_context.hash, password).result()
+
+
+hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT, PASSWORD_HASH_RETRY_AFTER)
@@ -0,0 +1,165 @@
+import asyncio
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+# Enrutado de lecturas a réplicas. Las sesiones de peticiones GET se marcan
+# como de solo lectura y sus SELECT simples van a una réplica sana, siempre
+# la misma durante toda la sesión; todo lo demás (escrituras, SELECT ... FOR
+# UPDATE, sesiones que ya escribieron o peticiones que necesitan datos
+# frescos) va al primario.
+
+
+class ReplicaSet:
+    """
+    Réplicas en round-robin. La salud de cada una (SELECT 1) la comprueba
+    `monitor` en segundo plano cada `check_interval` segundos; elegir réplica
+    solo lee el último resultado. Una réplica que falla se descarta hasta la
+    siguiente comprobación; si no queda ninguna sana, las lecturas vuelven al
+    primario.
+    """
+
+    def __init__(
+        self, engines: List[Engine], check_interval: float,
+        ping: Optional[Callable[[Engine], Awaitable[bool]]] = None
+    ):
+        self.engines = engines
+        self.check_interval = check_interval
+        self.healthy = {id(engine): True for engine in engines}
+        self.lock = threading.Lock()
+        self.cycle = itertools.cycle(engines)
+        self.ping = ping or self.ping_in_thread
+
+    def choose(self) -> Optional[Engine]:
+        for _ in range(len(self.engines)):
+            with self.lock:
+                engine = next(self.cycle)
+            if self.is_healthy(engine):
+                return engine
+        return None
+
+    def is_healthy(self, engine: Engine) -> bool:
+        return self.healthy[id(engine)]
+
+    @staticmethod
+    def ping_sync(engine: Engine) -> bool:
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            return True
+        except Exception as e:
+            print(f"Read replica {engine.url.render_as_string(hide_password=True)} unavailable: {e}")
+            return False
+
+    @classmethod
+    async def ping_in_thread(cls, engine: Engine) -> bool:
+        return await asyncio.to_thread(cls.ping_sync, engine)
+
+    async def check(self):
+        for engine in self.engines:
+            self.healthy[id(engine)] = await self.ping(engine)
+
+    async def monitor(self):
+        """Comprobar todas las réplicas cada `check_interval` segundos (tarea del proceso de la API)"""
+        while True:
+            await self.check()
+            await asyncio.sleep(self.check_interval)
+
+    def mark_down(self, engine: Engine):
+        with self.lock:
+            self.healthy[id(engine)] = False
+
+    def status(self) -> list:
+        return [
+            {"url": engine.url.render_as_string(hide_password=True), "healthy": self.healthy[id(engine)]}
+            for engine in self.engines
+        ]
+
+
+def async_ping(async_engines: list) -> Callable[[Engine], Awaitable[bool]]:
+    """Comprobación de salud para réplicas de AsyncEngine (el conjunto guarda su sync_engine)"""
+    by_sync_engine = {id(async_engine.sync_engine): async_engine for async_engine in async_engines}
+
+    async def ping(engine: Engine) -> bool:
+        try:
+            async with by_sync_engine[id(engine)].connect() as connection:
+                await connection.execute(text("SELECT 1"))
+            return True
+        except Exception as e:
+            print(f"Read replica {engine.url.render_as_string(hide_password=True)} unavailable: {e}")
+            return False
+
+    return ping
+
+
+def routing_session_class(primary: Engine, replicas: ReplicaSet):
+    """
+    Clase de sesión que enruta cada sentencia (get_bind). La réplica se elige
+    en la primera lectura y se mantiene hasta cerrar la sesión, así que todas
+    las lecturas de una petición ven el mismo retraso.
+    """
+
+    class RoutingSession(Session):
+        def get_bind(self, mapper=None, clause=None, **kw):
+            if (
+                self.info.get("read_only")
+                and not self.info.get("wrote")
+                and not self._flushing
+                and isinstance(clause, Select)
+                and clause._for_update_arg is None
+            ):
+                if "replica" not in self.info:
+                    self.info["replica"] = replicas.choose()
+                engine = self.info["replica"]
+                if engine is not None:
+                    state = self.info.get("request_state")
+                    if state is not None:
+                        state.db_replica = True
+                    return engine
+            # A partir de aquí la sesión lee del primario: ve sus propias escrituras
+            if not isinstance(clause, Select):
+                self.info["wrote"] = True
+            return primary
+
+    return RoutingSession
+
+
+class Stickiness:
+    """
+    Clientes que escribieron hace menos de `seconds` segundos: sus lecturas
+    van al primario para que vean sus propias escrituras aunque las réplicas
+    lleven retraso. Se guarda en memoria del proceso.
+    """
+
+    def __init__(self, seconds: float, max_clients: int = 10000):
+        self.seconds = seconds
+        self.max_clients = max_clients
+        self.until = OrderedDict()
+        self.lock = threading.Lock()
+
+    def mark(self, client: str):
+        with self.lock:
+            self.until[client] = time.monotonic() + self.seconds
+            self.until.move_to_end(client)
+            while len(self.until) > self.max_clients:
+                self.until.popitem(last=False)
+
+    def is_sticky(self, client: str) -> bool:
+        with self.lock:
+            until = self.until.get(client)
+        return until is not None and until > time.monotonic()
+
+
+def client_key(request) -> str:
+    """Identidad del cliente para la stickiness: token si lo hay, si no la IP"""
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return authorization
+    return request.client.host if request.client else "unknown"
@@ -0,0 +1,223 @@
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from models import Task, TaskCompletion, CompletionRollup, RollupWatermark
+from config import ROLLUP_LAG_SECONDS, ROLLUP_WINDOW_HOURS
+
+# Series temporales de completaciones. Un agregador recorre task_completions
+# por completed_at desde la marca de agua (watermark) y suma cada completación
+# a su hora y a su día en completion_rollups, para el total y para su tarea,
+# su estudiante y su grupo. /statistics/timeseries lee esas filas en lugar de
+# recorrer el histórico de completaciones.
+#
+# Cada ventana se agrega y avanza la marca en la misma transacción, así que
+# el agregador se puede interrumpir y retoma donde lo dejó. La marca se queda
+# ROLLUP_LAG_SECONDS por detrás de la hora actual para no perder
+# transacciones que aún no habían hecho commit.
+#
+# Las series cuentan completaciones registradas: desmarcar una tarea después
+# de agregada no la descuenta (volver a completarla cuenta otra vez). Borrar
+# una tarea tampoco borra su histórico. `python rollups.py --rebuild` recalcula
+# todo a partir del estado actual.
+
+WATERMARK = "completions"
+
+HOUR = "hour"
+DAY = "day"
+
+ALL = "all"
+TASK = "task"
+STUDENT = "student"
+GROUP = "group"
+
+GRANULARITIES = {
+    HOUR: lambda value: value.replace(minute=0, second=0, microsecond=0),
+    DAY: lambda value: value.replace(hour=0, minute=0, second=0, microsecond=0),
+}
+STEPS = {HOUR: timedelta(hours=1), DAY: timedelta(days=1)}
+
+
+def as_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Fechas con zona horaria a UTC sin zona, como las guarda la base de datos"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def aggregate_window(db: Session, start: datetime, end: datetime) -> int:
+    """
+    Sumar a los rollups las completaciones con completed_at en [start, end).
+    Devuelve cuántas se han agregado. No hace commit.
+    """
+    rows = db.query(
+        TaskCompletion.task_id, TaskCompletion.student_id, TaskCompletion.completed_at, Task.group_id
+    ).join(Task, Task.id == TaskCompletion.task_id).filter(
+        TaskCompletion.completed == True,
+        TaskCompletion.completed_at >= start,
+        TaskCompletion.completed_at < end
+    ).all()
+    if not rows:
+        return 0
+
+    counts = Counter()
+    for task_id, student_id, completed_at, group_id in rows:
+        for granularity, floor in GRANULARITIES.items():
+            bucket = floor(completed_at)
+            counts[(granularity, ALL, 0, bucket)] += 1
+            counts[(granularity, TASK, task_id, bucket)] += 1
+            counts[(granularity, STUDENT, student_id, bucket)] += 1
+            if group_id is not None:
+                counts[(granularity, GROUP, group_id, bucket)] += 1
+
+    # Solo pueden existir ya filas de los buckets que empezaron antes de la
+    # ventana: se cargan con el índice (granularity, bucket_start) y el resto
+    # se inserta de una vez
+    existing = {}
+    for granularity, floor in GRANULARITIES.items():
+        for rollup in db.query(CompletionRollup).filter(
+            CompletionRollup.granularity == granularity,
+            CompletionRollup.bucket_start >= floor(start),
+            CompletionRollup.bucket_start < end
+        ):
+            existing[(rollup.granularity, rollup.scope, rollup.scope_id, rollup.bucket_start)] = rollup
+
+    new_rows = []
+    for key, completed in counts.items():
+        if key in existing:
+            existing[key].completed += completed
+        else:
+            granularity, scope, scope_id, bucket = key
+            new_rows.append({
+                "granularity": granularity,
+                "scope": scope,
+                "scope_id": scope_id,
+                "bucket_start": bucket,
+                "completed": completed
+            })
+    if new_rows:
+        db.execute(insert(CompletionRollup), new_rows)
+    return len(rows)
+
+
+def _watermark(db: Session, until: datetime) -> Optional[RollupWatermark]:
+    """
+    Marca de agua bloqueada (FOR UPDATE: un solo agregador a la vez). La
+    primera vez empieza en el día de la completación más antigua.
+    """
+    mark = db.query(RollupWatermark).filter(RollupWatermark.name == WATERMARK).with_for_update().first()
+    if mark is not None:
+        return mark
+
+    oldest = db.query(func.min(TaskCompletion.completed_at)).scalar()
+    mark = RollupWatermark(name=WATERMARK, value=GRANULARITIES[DAY](oldest) if oldest else until)
+    try:
+        with db.begin_nested():
+            db.add(mark)
+    except IntegrityError:
+        # Otro agregador la ha creado a la vez
+        return None
+    return mark
+
+
+def run(db: Session, until: Optional[datetime] = None) -> int:
+    """Agregar ventana a ventana hasta `until` (por defecto, ahora menos el retraso)"""
+    until = until or datetime.utcnow() - timedelta(seconds=ROLLUP_LAG_SECONDS)
+    window = timedelta(hours=ROLLUP_WINDOW_HOURS)
+    total = 0
+    while True:
+        mark = _watermark(db, until)
+        if mark is None or mark.value >= until:
+            db.commit()
+            return total
+        end = min(mark.value + window, until)
+        total += aggregate_window(db, mark.value, end)
+        mark.value = end
+        db.commit()
+
+
+def watermark(db: Session) -> Optional[datetime]:
+    return db.query(RollupWatermark.value).filter(RollupWatermark.name == WATERMARK).scalar()
+
+
+def rebuild(db: Session) -> int:
+    """Borrar los rollups y la marca de agua y agregar de nuevo todo el histórico"""
+    db.query(CompletionRollup).delete(synchronize_session=False)
+    db.query(RollupWatermark).filter(RollupWatermark.name == WATERMARK).delete(synchronize_session=False)
+    db.commit()
+    return run(db)
+
+
+def series(
+    db: Session, granularity: str, scope: str, scope_id: int, start: datetime, end: datetime
+) -> list:
+    """
+    Puntos [start, end) del ámbito, uno por bucket (0 si no hubo completaciones).
+    Lee un rango de la clave primaria (granularity, scope, scope_id, bucket_start).
+    """
+    floor, step = GRANULARITIES[granularity], STEPS[granularity]
+    first = floor(start)
+    values = dict(
+        db.query(CompletionRollup.bucket_start, CompletionRollup.completed).filter(
+            CompletionRollup.granularity == granularity,
+            CompletionRollup.scope == scope,
+            CompletionRollup.scope_id == scope_id,
+            CompletionRollup.bucket_start >= first,
+            CompletionRollup.bucket_start < end
+        ).all()
+    )
+    points = []
+    bucket = first
+    while bucket < end:
+        points.append({"bucket_start": bucket, "completed": values.get(bucket, 0)})
+        bucket += step
+    return points
+
+
+def point_count(granularity: str, start: datetime, end: datetime) -> int:
+    floor, step = GRANULARITIES[granularity], STEPS[granularity]
+    first = floor(start)
+    return max(0, -(-(end - first) // step))
+
+
+def run_once() -> int:
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return run(db)
+    except Exception as e:
+        db.rollback()
+        print(f"Error aggregating completion rollups: {e}")
+        return 0
+    finally:
+        db.close()
+
+
+async def run_forever(interval: float):
+    """Agregador en segundo plano del proceso de la API"""
+    while True:
+        await run_in_threadpool(run_once)
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Agregar las completaciones en series temporales")
+    parser.add_argument("--rebuild", action="store_true", help="Borrar los rollups y agregar todo de nuevo")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        aggregated = rebuild(db) if args.rebuild else run(db)
+        print(f"{aggregated} completaciones agregadas; marca de agua: {watermark(db)}")
+    finally:
+        db.close()
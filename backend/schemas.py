@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, AliasChoices, computed_field
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
+from images import variant_urls
 
 # Usuario
 class UserCreate(BaseModel):
@@ -16,8 +17,7 @@ class UserResponse(BaseModel):
     is_admin: bool
     created_at: datetime
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Tarea
 class TaskCreate(BaseModel):
@@ -33,20 +33,27 @@ class TaskResponse(BaseModel):
     created_at: datetime
     due_date: Optional[datetime]
     creator: UserResponse
+    group_id: Optional[int] = None   # None = asignada a todos los estudiantes
+
+    # URLs de las variantes ya generadas (thumbnail, medium, webp) para que
+    # los clientes descarguen la imagen más pequeña; si falta, image_path
+    @computed_field
+    @property
+    def image_variants(self) -> Optional[Dict[str, str]]:
+        return variant_urls(self.image_path)
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Completaciones (task_completions)
 class TaskCompletionResponse(BaseModel):
-    id: int
+    id: Optional[int]         # None para tareas pendientes sin fila (modo sparse)
     task_id: int
-    user: UserResponse        # Cambiado de 'student' a 'user' para coincidir con el modelo SQLAlchemy
+    # En el modelo SQLAlchemy la relación se llama 'student'
+    user: UserResponse = Field(validation_alias=AliasChoices("user", "student"))
     completed_at: Optional[datetime]
     notes: Optional[str]
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class TaskWithCompletions(BaseModel):
     id: int
@@ -61,8 +68,87 @@ class TaskWithCompletions(BaseModel):
     completion_rate: float
     completions: List[TaskCompletionResponse]
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+# Panel del estudiante (GET /users/{id}/dashboard): sin el usuario anidado en cada tarea
+class DashboardTask(BaseModel):
+    id: int
+    title: str
+    description: Optional[str]
+    image_path: Optional[str]
+    image_variants: Optional[Dict[str, str]]
+    due_date: Optional[datetime]
+    group_id: Optional[int]
+    completed: bool
+    completed_at: Optional[datetime]
+    notes: Optional[str]
+
+class DashboardSummary(BaseModel):
+    total: int
+    completed: int
+    pending: int
+    overdue: int
+    upcoming: int
+    completion_rate: float
+
+class StudentDashboard(BaseModel):
+    student_id: int
+    generated_at: datetime
+    summary: DashboardSummary
+    overdue: List[DashboardTask]
+    upcoming: List[DashboardTask]
+    later: List[DashboardTask]       # vencen más adelante o no tienen fecha
+    completed: List[DashboardTask]
+
+# Grupos (clases) y matrículas
+class GroupResponse(BaseModel):
+    id: int
+    name: str
+    owner_id: int
+    created_at: datetime
+    student_count: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+class EnrollmentChange(BaseModel):
+    student_ids: List[int]
+
+# Operaciones en lote
+class CompletionChange(BaseModel):
+    task_id: int
+    user_id: int
+    completed: bool
+    notes: Optional[str] = None
+
+class BatchItemResult(BaseModel):
+    index: int                # posición del elemento en la petición
+    status: int               # código HTTP que habría devuelto la operación individual
+    detail: Optional[str] = None
+    task_id: Optional[int] = None
+    user_id: Optional[int] = None
+    username: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BatchItemResult]
+
+# Sincronización incremental (GET /sync)
+class SyncCompletion(BaseModel):
+    task_id: int
+    completed: bool
+    completed_at: Optional[datetime]
+    notes: Optional[str]
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+class SyncResponse(BaseModel):
+    cursor: str
+    full: bool                # True si el cliente debe reemplazar sus datos
+    tasks: List[TaskResponse]
+    completions: List[SyncCompletion]
+    deleted_tasks: List[int]
 
 # Autenticación
 class Token(BaseModel):
@@ -106,5 +192,4 @@ class MyTaskResponse(BaseModel):
     completed_at: Optional[datetime]
     notes: Optional[str]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,140 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+from typing_extensions import TypedDict
+
+from models import User, Task
+from images import variant_urls
+from pagination import set_next_cursor
+from config import SERIALIZATION_MODE
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Serialización rápida de los listados grandes (GET /tasks, GET /users y
+# /statistics/students). En lugar de validar cada objeto ORM con su modelo
+# Pydantic y pasar el resultado por jsonable_encoder, los endpoints leen
+# tuplas de columnas, construyen diccionarios con las claves en el orden de
+# los modelos de schemas.py y los serializan de una vez. La salida es la
+# misma, byte a byte, que la del camino por defecto de FastAPI: JSON
+# compacto en UTF-8 con las fechas en ISO 8601.
+#
+# SERIALIZATION_MODE:
+#   pydantic     camino por defecto (response_model de cada endpoint)
+#   typeadapter  TypeAdapter de Pydantic v2 precompilados sobre TypedDict
+#   orjson       orjson.dumps (requiere el paquete opcional `orjson`)
+
+PYDANTIC = "pydantic"
+TYPEADAPTER = "typeadapter"
+ORJSON = "orjson"
+
+FAST = SERIALIZATION_MODE in (TYPEADAPTER, ORJSON)
+
+
+class UserRow(TypedDict):
+    id: int
+    email: str
+    username: str
+    is_admin: bool
+    created_at: datetime
+
+
+class TaskRow(TypedDict):
+    id: int
+    title: str
+    description: str
+    image_path: Optional[str]
+    created_at: datetime
+    due_date: Optional[datetime]
+    creator: Optional[UserRow]
+    group_id: Optional[int]
+    image_variants: Optional[Dict[str, str]]
+
+
+class StudentStatsRow(TypedDict):
+    student_id: int
+    student_name: str
+    student_email: str
+    total_tasks: int
+    completed_tasks: int
+    pending_tasks: int
+    # int (0) o float, como devuelve completion_rate: Any conserva el formato
+    completion_rate: Any
+
+
+# Los TypeAdapter compilan su serializador una sola vez, al importar el módulo
+USER_LIST = TypeAdapter(List[UserRow])
+TASK_LIST = TypeAdapter(List[TaskRow])
+STUDENT_STATS_LIST = TypeAdapter(List[StudentStatsRow])
+
+USER_COLUMNS = (User.id, User.email, User.username, User.is_admin, User.created_at)
+
+TASK_COLUMNS = (
+    Task.id, Task.title, Task.description, Task.image_path, Task.created_at, Task.due_date, Task.group_id,
+    User.id.label("creator_id"),
+    User.email.label("creator_email"),
+    User.username.label("creator_username"),
+    User.is_admin.label("creator_is_admin"),
+    User.created_at.label("creator_created_at"),
+)
+
+
+def dump_typeadapter(rows: List[dict], adapter: TypeAdapter) -> bytes:
+    return adapter.dump_json(rows)
+
+
+def dump_orjson(rows: List[dict], adapter: TypeAdapter) -> bytes:
+    return orjson.dumps(rows)
+
+
+ENCODERS = {TYPEADAPTER: dump_typeadapter, ORJSON: dump_orjson}
+
+if SERIALIZATION_MODE == ORJSON and orjson is None:
+    raise RuntimeError("SERIALIZATION_MODE=orjson requires the orjson package")
+if SERIALIZATION_MODE not in (PYDANTIC, TYPEADAPTER, ORJSON):
+    raise RuntimeError(f"Unknown SERIALIZATION_MODE: {SERIALIZATION_MODE}")
+encode = ENCODERS.get(SERIALIZATION_MODE)
+
+
+def user_rows(rows) -> List[dict]:
+    return [
+        {"id": row.id, "email": row.email, "username": row.username, "is_admin": row.is_admin, "created_at": row.created_at}
+        for row in rows
+    ]
+
+
+def task_rows(rows) -> List[dict]:
+    return [
+        {
+            "id": row.id,
+            "title": row.title,
+            "description": row.description,
+            "image_path": row.image_path,
+            "created_at": row.created_at,
+            "due_date": row.due_date,
+            "creator": {
+                "id": row.creator_id,
+                "email": row.creator_email,
+                "username": row.creator_username,
+                "is_admin": row.creator_is_admin,
+                "created_at": row.creator_created_at
+            } if row.creator_id is not None else None,
+            "group_id": row.group_id,
+            "image_variants": variant_urls(row.image_path)
+        }
+        for row in rows
+    ]
+
+
+def json_response(rows: List[dict], adapter: TypeAdapter, next_cursor: Optional[str] = None) -> Response:
+    """
+    Respuesta ya serializada. La cabecera del cursor se pone aquí porque
+    FastAPI no copia las del parámetro `response` a una Response devuelta.
+    """
+    response = Response(content=encode(rows, adapter), media_type="application/json")
+    set_next_cursor(response, next_cursor)
+    return response
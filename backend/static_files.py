@@ -0,0 +1,163 @@
+import hashlib
+import mimetypes
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Receive, Scope, Send
+
+# Los ficheros de /uploads nunca se reescriben (nombres únicos o por
+# contenido), así que se pueden cachear indefinidamente.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# <sha256>.<ext> o <sha256>_<variante>.<ext>
+CONTENT_ADDRESSED = re.compile(r"^([0-9a-f]{64})(_[a-z]+)?\.([a-z0-9]+)$")
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class AssetResponse(Response):
+    """
+    Respuesta de fichero (completa o un rango) que usa la extensión ASGI
+    zerocopysend (sendfile) cuando el servidor la ofrece y si no lee por bloques.
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, path: str, headers: dict, status_code: int, byte_range: Tuple[int, int]):
+        self.path = path
+        self.status_code = status_code
+        self.byte_range = byte_range
+        self.background = None
+        start, end = byte_range
+        headers["content-length"] = str(end - start + 1)
+        self.raw_headers = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        start, end = self.byte_range
+        count = end - start + 1
+        if count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": start,
+                    "count": count,
+                    "more_body": False
+                })
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(start)
+            remaining = count
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def strong_etag(name: str, stat_result: os.stat_result) -> str:
+    """ETag fuerte: el hash del contenido si está en el nombre; si no, nombre+tamaño+mtime"""
+    match = CONTENT_ADDRESSED.match(name)
+    if match:
+        return f'"{match.group(1)}{match.group(2) or ""}"'
+    key = f"{name}-{stat_result.st_size}-{stat_result.st_mtime_ns}"
+    return f'"{hashlib.md5(key.encode()).hexdigest()}"'
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Rango único "bytes=a-b" (o sufijo "bytes=-n"). Devuelve None si no se
+    puede satisfacer; ValueError si la cabecera no es un rango único válido.
+    """
+    match = RANGE.match(header.strip())
+    if not match:
+        raise ValueError(header)
+    first, last = match.groups()
+    if first == "" and last == "":
+        raise ValueError(header)
+    if size == 0:
+        return None
+    if first == "":
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        return None
+    return start, end
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    StaticFiles para /uploads con Cache-Control inmutable, ETag fuerte,
+    respuestas 304 a peticiones condicionales y 206 a peticiones de rango.
+    """
+
+    @staticmethod
+    def not_modified(request_headers: Headers, etag: str, stat_result: os.stat_result) -> bool:
+        """If-None-Match tiene prioridad sobre If-Modified-Since (RFC 9110)"""
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(stat_result.st_mtime) <= since
+        return False
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        name = os.path.basename(full_path)
+        etag = strong_etag(name, stat_result)
+        headers = {
+            "etag": etag,
+            "cache-control": IMMUTABLE_CACHE_CONTROL,
+            "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+            "accept-ranges": "bytes",
+            "content-type": mimetypes.guess_type(name)[0] or "application/octet-stream",
+        }
+
+        if self.not_modified(request_headers, etag, stat_result):
+            return Response(status_code=304, headers={"etag": etag, "cache-control": IMMUTABLE_CACHE_CONTROL})
+
+        size = stat_result.st_size
+        byte_range = (0, size - 1)
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and status_code == 200 and (if_range is None or if_range == etag):
+            try:
+                requested = parse_range(range_header, size)
+            except ValueError:
+                # Rangos múltiples o mal formados: se sirve el fichero completo
+                requested = byte_range
+            else:
+                if requested is None:
+                    return Response(status_code=416, headers={"content-range": f"bytes */{size}"})
+                headers["content-range"] = f"bytes {requested[0]}-{requested[1]}/{size}"
+                status_code = 206
+            byte_range = requested
+
+        return AssetResponse(str(full_path), headers, status_code, byte_range)
@@ -0,0 +1,216 @@
+from abc import ABC, abstractmethod
+import os
+import re
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from models import Task, UploadBlob
+from config import UPLOAD_DIR, STORAGE_BACKEND
+import images
+
+# Almacén de subidas direccionado por contenido: cada imagen se guarda una
+# sola vez como <sha256>.<extensión> y upload_blobs lleva la cuenta de las
+# tareas que la usan. Las imágenes sin referencias se borran con `gc`.
+
+BLOB_NAME = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]+$")
+
+
+class StorageBackend(ABC):
+    """Interfaz de los backends de almacenamiento de subidas"""
+
+    @abstractmethod
+    def exists(self, name: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def put(self, local_path: str, name: str):
+        """Mover un fichero local al almacén con el nombre indicado"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, name: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def list(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def age(self, name: str) -> float:
+        """Segundos desde que se escribió el objeto"""
+        raise NotImplementedError
+
+    def local_path(self, name: str) -> Optional[str]:
+        """Ruta local del objeto, si el backend la tiene (para generar variantes)"""
+        return None
+
+    def url(self, name: str) -> str:
+        return f"/uploads/{name}"
+
+
+class LocalStorage(StorageBackend):
+    """Backend en disco; es el directorio que se sirve en /uploads"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(exist_ok=True)
+
+    def exists(self, name: str) -> bool:
+        return (self.directory / name).exists()
+
+    def put(self, local_path: str, name: str):
+        os.replace(local_path, self.directory / name)
+
+    def delete(self, name: str):
+        (self.directory / name).unlink(missing_ok=True)
+
+    def list(self) -> Iterable[str]:
+        return [path.name for path in self.directory.iterdir() if path.is_file()]
+
+    def age(self, name: str) -> float:
+        return time.time() - (self.directory / name).stat().st_mtime
+
+    def local_path(self, name: str) -> Optional[str]:
+        return str(self.directory / name)
+
+
+# Backends disponibles; un almacén de objetos se añade con register_backend
+_backends = {
+    "local": lambda: LocalStorage(UPLOAD_DIR),
+}
+_storage = None
+
+
+def register_backend(name: str, factory):
+    _backends[name] = factory
+
+
+def get_storage() -> StorageBackend:
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND not in _backends:
+            raise RuntimeError(f"Unknown storage backend: {STORAGE_BACKEND}")
+        _storage = _backends[STORAGE_BACKEND]()
+    return _storage
+
+
+def blob_name(sha256: str, extension: str) -> str:
+    return f"{sha256}.{extension}"
+
+
+def store_upload(temp_path: str, name: str, reuse: bool) -> bool:
+    """
+    Guardar una subida ya escrita en `temp_path`, después de add_reference y en
+    su misma transacción. Con `reuse` (la fila ya existía y está bloqueada, así
+    que gc no puede borrar el fichero) se usa el objeto guardado si sigue
+    ahí; si no, se escribe desde `temp_path`. Devuelve True si se ha escrito.
+    """
+    backend = get_storage()
+    if reuse and backend.exists(name):
+        Path(temp_path).unlink(missing_ok=True)
+        return False
+    backend.put(temp_path, name)
+    return True
+
+
+def add_reference(db: Session, name: str, size: int) -> bool:
+    """
+    Sumar una referencia al blob dentro de la transacción actual; la fila
+    queda bloqueada hasta el commit. Devuelve True si la fila es nueva.
+    """
+    updated = db.query(UploadBlob).filter(UploadBlob.name == name).update(
+        {UploadBlob.ref_count: UploadBlob.ref_count + 1}, synchronize_session=False
+    )
+    if not updated:
+        db.add(UploadBlob(name=name, size=size, ref_count=1))
+        db.flush()
+    return not updated
+
+
+def release_reference(db: Session, image_path: Optional[str]):
+    """Restar una referencia al blob de una imagen (no lo borra; eso lo hace gc)"""
+    if not image_path:
+        return
+    name = image_path.rsplit("/", 1)[-1]
+    db.query(UploadBlob).filter(UploadBlob.name == name).update(
+        {UploadBlob.ref_count: UploadBlob.ref_count - 1}, synchronize_session=False
+    )
+
+
+def gc(db: Session, min_age: float = 3600, dry_run: bool = False) -> list:
+    """
+    Borrar los blobs sin referencias y los ficheros direccionados por
+    contenido que no tienen fila en upload_blobs. De estos últimos se
+    conservan los escritos hace menos de `min_age` segundos: pueden ser
+    subidas cuya transacción aún no ha terminado.
+    """
+    backend = get_storage()
+    removed = []
+
+    candidates = [name for (name,) in db.query(UploadBlob.name).filter(UploadBlob.ref_count <= 0)]
+    for name in candidates:
+        # Fila bloqueada y comprobada de nuevo: una subida del mismo contenido
+        # puede haber sumado una referencia desde la consulta anterior, y las
+        # que lleguen después esperan al commit y vuelven a escribir el fichero
+        blob = db.query(UploadBlob).filter(UploadBlob.name == name).with_for_update().first()
+        if (
+            blob is None
+            or blob.ref_count > 0
+            or db.query(Task.id).filter(Task.image_path == backend.url(name)).first()
+        ):
+            db.rollback()
+            continue
+        if dry_run:
+            removed.append(name)
+            db.rollback()
+            continue
+        deleted = db.query(UploadBlob).filter(
+            UploadBlob.name == name, UploadBlob.ref_count <= 0
+        ).delete(synchronize_session=False)
+        if deleted:
+            removed.append(name)
+            for variant in [name] + images.variant_names(name):
+                backend.delete(variant)
+            images.mark_available(images.variant_names(name), exists=False)
+        db.commit()
+
+    known = {name for (name,) in db.query(UploadBlob.name)}
+    for name in backend.list():
+        if not BLOB_NAME.match(name) or name in known or name in removed:
+            continue
+        if backend.age(name) < min_age:
+            continue
+        removed.append(name)
+        if not dry_run:
+            for orphan in [name] + images.variant_names(name):
+                backend.delete(orphan)
+            images.mark_available(images.variant_names(name), exists=False)
+
+    if not dry_run:
+        db.commit()
+    return removed
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Gestión del almacén de subidas")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    gc_parser = subcommands.add_parser("gc", help="Borrar imágenes sin referencias")
+    gc_parser.add_argument("--min-age", type=float, default=3600, help="Edad mínima en segundos")
+    gc_parser.add_argument("--dry-run", action="store_true", help="Solo listar lo que se borraría")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        removed = gc(db, min_age=args.min_age, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    for name in removed:
+        print(name)
+    print(f"{len(removed)} blobs " + ("a borrar" if args.dry_run else "borrados"))
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session, joinedload
+
+from models import Task, TaskCompletion, TaskTombstone, AssignmentTombstone, Enrollment
+from pagination import encode_cursor, decode_cursor
+from schemas import TaskResponse, SyncCompletion
+from config import SYNC_SAFETY_WINDOW
+
+# Sincronización incremental de los clientes móviles. El cursor es una marca
+# de tiempo del servidor; cada respuesta incluye las filas cambiadas desde
+# ella (inclusive) y el cursor para la siguiente llamada. Los clientes
+# aplican los cambios como upserts, así que repetir filas no es un problema.
+#
+# El cursor nuevo se retrasa SYNC_SAFETY_WINDOW segundos respecto a la hora
+# de la consulta para no perder transacciones que ya tenían su updated_at
+# pero aún no habían hecho commit. Una tarea sin completación en la
+# respuesta está pendiente para el estudiante (como en modo sparse).
+
+
+def changes(db: Session, student_id: int, since: Optional[str] = None) -> dict:
+    """Tareas, completaciones del estudiante y borrados posteriores al cursor"""
+    started = datetime.utcnow()
+    since_at = decode_cursor(since, [Task.updated_at])[0] if since else None
+
+    # Tareas de todos los estudiantes y las de los grupos del estudiante
+    groups = select(Enrollment.group_id).where(Enrollment.student_id == student_id)
+    tasks = db.query(Task).options(joinedload(Task.creator)).filter(
+        or_(Task.group_id == None, Task.group_id.in_(groups))
+    )
+    completions = db.query(TaskCompletion).filter(TaskCompletion.student_id == student_id)
+    # En la primera sincronización no hay nada que borrar en el cliente
+    deleted = []
+    if since_at is not None:
+        # Al matricularse en un grupo llegan también sus tareas anteriores
+        new_groups = groups.where(Enrollment.created_at >= since_at)
+        tasks = tasks.filter(or_(Task.updated_at >= since_at, Task.group_id.in_(new_groups)))
+        completions = completions.filter(TaskCompletion.updated_at >= since_at)
+        # Tareas borradas y tareas retiradas al estudiante (baja de un grupo)
+        deleted = db.query(TaskTombstone.task_id).filter(TaskTombstone.deleted_at >= since_at).union_all(
+            db.query(AssignmentTombstone.task_id).filter(
+                AssignmentTombstone.student_id == student_id,
+                AssignmentTombstone.deleted_at >= since_at
+            )
+        )
+
+    return {
+        "cursor": encode_cursor([started - timedelta(seconds=SYNC_SAFETY_WINDOW)]),
+        "full": since_at is None,
+        "tasks": [TaskResponse.model_validate(task) for task in tasks.order_by(Task.updated_at, Task.id)],
+        "completions": [
+            SyncCompletion.model_validate(completion)
+            for completion in completions.order_by(TaskCompletion.updated_at, TaskCompletion.id)
+        ],
+        "deleted_tasks": [task_id for (task_id,) in deleted],
+    }
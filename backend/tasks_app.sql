@@ -1,15 +1,46 @@
-use tasks_app;
+-- Esquema de referencia de tasks_app (MySQL), equivalente a `alembic upgrade head`.
+-- El esquema lo gestionan las migraciones de backend/migrations: para una base
+-- nueva usa `alembic upgrade head`. Una base creada con este fichero queda
+-- marcada en la última revisión (tabla alembic_version).
 
-/*select * from task_submissions;
-select * from tasks;*/
+CREATE DATABASE IF NOT EXISTS tasks_app;
+use tasks_app;
 
 CREATE TABLE users (
     id INT PRIMARY KEY AUTO_INCREMENT,
-    email VARCHAR(255) UNIQUE NOT NULL,
-    username VARCHAR(100) UNIQUE NOT NULL,
+    email VARCHAR(255) NOT NULL UNIQUE,
+    username VARCHAR(255) NOT NULL UNIQUE,
     hashed_password VARCHAR(255) NOT NULL,
     is_admin BOOLEAN DEFAULT FALSE,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at DATETIME,
+    assigned_count INT NOT NULL DEFAULT 0,
+    completed_count INT NOT NULL DEFAULT 0,
+    INDEX ix_users_id (id),
+    INDEX ix_users_is_admin_id (is_admin, id)
+);
+
+-- Grupos (clases) de cada profesor
+CREATE TABLE student_groups (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    name VARCHAR(255) NOT NULL,
+    owner_id INT NOT NULL,
+    created_at DATETIME,
+    student_count INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (owner_id) REFERENCES users(id),
+    INDEX ix_student_groups_owner_id_id (owner_id, id)
+);
+
+-- Matrículas de estudiantes en grupos
+CREATE TABLE enrollments (
+    group_id INT NOT NULL,
+    student_id INT NOT NULL,
+    created_at DATETIME,
+    assigned_count INT NOT NULL DEFAULT 0,
+    completed_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (group_id, student_id),
+    FOREIGN KEY (group_id) REFERENCES student_groups(id),
+    FOREIGN KEY (student_id) REFERENCES users(id),
+    INDEX ix_enrollments_student_group (student_id, group_id)
 );
 
 -- Tabla de tareas
@@ -17,32 +48,94 @@ CREATE TABLE tasks (
     id INT PRIMARY KEY AUTO_INCREMENT,
     title VARCHAR(255) NOT NULL,
     description TEXT,
-    status ENUM('pending', 'in_progress', 'completed') DEFAULT 'pending',
-    priority ENUM('low', 'medium', 'high') DEFAULT 'medium',
-    due_date DATE,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    image_path VARCHAR(255),
+    due_date DATETIME,
+    created_at DATETIME,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    creator_id INT,
+    group_id INT,
+    assigned_count INT NOT NULL DEFAULT 0,
+    completed_count INT NOT NULL DEFAULT 0,
+    assignment_status VARCHAR(16) NOT NULL DEFAULT 'done',
+    FOREIGN KEY (creator_id) REFERENCES users(id),
+    CONSTRAINT fk_tasks_group_id FOREIGN KEY (group_id) REFERENCES student_groups(id),
+    INDEX ix_tasks_id (id),
+    INDEX ix_tasks_creator_id_id (creator_id, id),
+    INDEX ix_tasks_due_date_id (due_date, id),
+    INDEX ix_tasks_updated_at_id (updated_at, id),
+    INDEX ix_tasks_group_id_id (group_id, id)
 );
 
--- Tabla de asignaciones (relación muchos a muchos)
-CREATE TABLE task_assignments (
+-- Completaciones: una fila por tarea y estudiante
+CREATE TABLE task_completions (
     id INT PRIMARY KEY AUTO_INCREMENT,
     task_id INT NOT NULL,
-    user_id INT NOT NULL,
-    assigned_by INT NOT NULL, -- ID del admin que asignó la tarea
-    assigned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (task_id) REFERENCES tasks(id) ON DELETE CASCADE,
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-    FOREIGN KEY (assigned_by) REFERENCES users(id),
-    UNIQUE KEY unique_assignment (task_id, user_id)
+    student_id INT NOT NULL,
+    completed BOOLEAN NOT NULL DEFAULT FALSE,
+    completed_at DATETIME,
+    notes TEXT,
+    created_at DATETIME,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (task_id) REFERENCES tasks(id),
+    FOREIGN KEY (student_id) REFERENCES users(id),
+    UNIQUE INDEX uq_task_completions_task_student (task_id, student_id),
+    INDEX ix_task_completions_id (id),
+    INDEX ix_task_completions_student_task (student_id, task_id),
+    INDEX ix_task_completions_task_completed (task_id, completed, student_id),
+    INDEX ix_task_completions_student_completed (student_id, completed, task_id),
+    INDEX ix_task_completions_student_updated (student_id, updated_at),
+    INDEX ix_task_completions_completed_at (completed_at)
 );
 
+-- Contadores globales de estadísticas
+CREATE TABLE stat_counters (
+    name VARCHAR(64) PRIMARY KEY,
+    value INT NOT NULL DEFAULT 0
+);
 
+-- Imágenes subidas (direccionadas por contenido) y sus referencias
+CREATE TABLE upload_blobs (
+    name VARCHAR(80) PRIMARY KEY,
+    size INT NOT NULL,
+    ref_count INT NOT NULL DEFAULT 0,
+    created_at DATETIME
+);
 
+-- Tareas borradas, para GET /sync
+CREATE TABLE task_tombstones (
+    task_id INT PRIMARY KEY,
+    deleted_at DATETIME NOT NULL,
+    INDEX ix_task_tombstones_deleted_at (deleted_at)
+);
 
+-- Tareas retiradas a un estudiante al darle de baja de un grupo, para GET /sync
+CREATE TABLE assignment_tombstones (
+    student_id INT NOT NULL,
+    task_id INT NOT NULL,
+    deleted_at DATETIME NOT NULL,
+    PRIMARY KEY (student_id, task_id),
+    INDEX ix_assignment_tombstones_student_deleted (student_id, deleted_at)
+);
 
+-- Completaciones por hora y día (total, tarea, estudiante y grupo), para
+-- /statistics/timeseries; las rellena rollups.py
+CREATE TABLE completion_rollups (
+    granularity VARCHAR(8) NOT NULL,
+    scope VARCHAR(8) NOT NULL,
+    scope_id INT NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    completed INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, scope, scope_id, bucket_start),
+    INDEX ix_completion_rollups_granularity_bucket (granularity, bucket_start)
+);
 
+-- Hasta dónde ha agregado rollups.py
+CREATE TABLE rollup_watermarks (
+    name VARCHAR(64) PRIMARY KEY,
+    value DATETIME NOT NULL
+);
 
-
-
-
+CREATE TABLE alembic_version (
+    version_num VARCHAR(32) NOT NULL PRIMARY KEY
+);
+INSERT INTO alembic_version (version_num) VALUES ('0006');
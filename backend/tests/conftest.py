@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+
+# Base SQLite temporal y sesión síncrona (antes de importar config). Se fijan
+# aquí para que el .env no apunte las pruebas a la base MySQL de desarrollo.
+_tmp = tempfile.mkdtemp(prefix="tasks_app_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/tests.db"
+os.environ["DB_ASYNC"] = "False"
+os.environ["READ_REPLICA_URLS"] = ""
+os.environ["UPLOAD_DIR"] = os.path.join(_tmp, "uploads")
+os.environ["ASSIGNMENT_MODE"] = "eager"
+os.environ["SERIALIZATION_MODE"] = "pydantic"
+os.environ["RESPONSE_CACHE_BACKEND"] = "memory"
+os.environ["ROLLUP_INTERVAL_SECONDS"] = "0"
+os.environ["BCRYPT_ROUNDS"] = "4"
+
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from database import SessionLocal, engine
+from models import User, Task
+from bench.seed import seed
+
+STUDENTS = 12
+TASKS = 6
+
+
+@pytest.fixture(scope="session")
+def seeded():
+    """Base sembrada con bench.seed: ids de un estudiante, una tarea y el admin"""
+    seed(STUDENTS, TASKS, completion_rate=0.5, seed_value=7, reset=True)
+    db = SessionLocal()
+    try:
+        return SimpleNamespace(
+            student_id=db.query(User.id).filter(User.is_admin == False).order_by(User.id).first()[0],
+            admin_id=db.query(User.id).filter(User.is_admin == True).first()[0],
+            task_id=db.query(Task.id).order_by(Task.id).first()[0],
+        )
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="session")
+def client(seeded):
+    from api import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session", autouse=True)
+def temporary_directory(request):
+    """Borrar la base y las subidas temporales al terminar la sesión"""
+    def cleanup():
+        engine.dispose()
+        shutil.rmtree(_tmp, ignore_errors=True)
+
+    request.addfinalizer(cleanup)
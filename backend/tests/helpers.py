@@ -0,0 +1,8 @@
+import itertools
+
+_unique = itertools.count()
+
+
+def uncached(params: dict = None) -> dict:
+    """Parámetro único para que la caché de respuestas no evite las consultas"""
+    return {**(params or {}), "_": next(_unique)}
@@ -0,0 +1,27 @@
+import pytest
+
+from database import assert_max_queries
+from tests.helpers import uncached
+
+# Consultas por petición de los endpoints de lectura. No dependen del número
+# de filas: una consulta de más suele ser un N+1 que ha vuelto.
+
+
+@pytest.mark.parametrize("path, params, queries", [
+    ("/tasks", {}, 1),
+    ("/tasks", {"sort": "due_date"}, 1),
+    ("/tasks/{task_id}", {}, 2),
+    ("/tasks/{task_id}", {"completed": "true"}, 2),
+    ("/users/{student_id}/tasks", {}, 2),
+    ("/users/{student_id}/tasks", {"completed": "false"}, 2),
+    ("/statistics/overview", {}, 1),
+    ("/statistics/tasks", {}, 1),
+    ("/statistics/students", {}, 1),
+])
+def test_read_endpoint_query_count(client, seeded, path, params, queries):
+    url = path.format(task_id=seeded.task_id, student_id=seeded.student_id)
+    with assert_max_queries(queries) as counter:
+        response = client.get(url, params=uncached(params))
+    assert response.status_code == 200, response.text
+    assert response.json()
+    assert counter.count == queries
@@ -0,0 +1,21 @@
+import asyncio
+
+from bench import explain
+
+# Los planes de ejecución de cada endpoint no recorren tablas completas salvo
+# los casos de bench.explain.ALLOWED_SCANS. La base de la suite es pequeña,
+# pero SQLite elige el plan por los índices y no por el tamaño de las tablas.
+
+
+def test_no_unexpected_full_scans(client, seeded):
+    from api import app
+
+    collected = asyncio.run(explain.run(app, seeded.student_id, seeded.task_id, seeded.admin_id))
+    assert all(selects for _, selects in collected), "Algún endpoint no ejecutó consultas"
+
+    unexpected = [
+        f"{name}: {table}\n    {' '.join(statement.split())}"
+        for name, table, statement, reason in explain.scans(collected)
+        if reason is None
+    ]
+    assert not unexpected, "Recorridos completos inesperados:\n" + "\n".join(unexpected)
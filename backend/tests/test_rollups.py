@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+from database import SessionLocal
+from models import TaskCompletion
+import rollups
+from tests.helpers import uncached
+
+# Las series temporales cuentan cada completación una vez: volver a
+# completar una tarea ya completada no cambia su completed_at, así que el
+# agregador no la vuelve a sumar.
+
+
+def aggregate():
+    db = SessionLocal()
+    try:
+        rollups.run(db, until=datetime.utcnow() + timedelta(seconds=1))
+    finally:
+        db.close()
+
+
+def daily_totals(client, task_id: int) -> list:
+    response = client.get("/statistics/timeseries", params=uncached({"bucket": "day", "task_id": task_id}))
+    assert response.status_code == 200, response.text
+    return [point["completed"] for point in response.json()["points"]]
+
+
+def pending_completion():
+    db = SessionLocal()
+    try:
+        return db.query(TaskCompletion).filter(TaskCompletion.completed == False).first()
+    finally:
+        db.close()
+
+
+def completed_at(task_id: int, student_id: int) -> datetime:
+    db = SessionLocal()
+    try:
+        return db.query(TaskCompletion.completed_at).filter(
+            TaskCompletion.task_id == task_id, TaskCompletion.student_id == student_id
+        ).scalar()
+    finally:
+        db.close()
+
+
+def test_recompleting_does_not_change_daily_totals(client, seeded):
+    completion = pending_completion()
+    task_id, student_id = completion.task_id, completion.student_id
+
+    assert client.put(f"/tasks/{task_id}/complete", data={"user_id": student_id}).status_code == 200
+    aggregate()
+    totals = daily_totals(client, task_id)
+    first_completed_at = completed_at(task_id, student_id)
+    assert totals[-1] >= 1
+
+    # Otra vez por el endpoint y por lotes
+    assert client.put(f"/tasks/{task_id}/complete", data={"user_id": student_id, "notes": "otra vez"}).status_code == 200
+    response = client.post("/completions:batch", json=[{"task_id": task_id, "user_id": student_id, "completed": True}])
+    assert response.status_code == 200, response.text
+    aggregate()
+
+    assert completed_at(task_id, student_id) == first_completed_at
+    assert daily_totals(client, task_id) == totals
+
+
+def test_timezone_aware_range_is_read_as_utc(client, seeded):
+    naive = {"bucket": "hour", "from": "2026-10-01T10:00:00", "to": "2026-10-01T14:00:00"}
+    aware = {"bucket": "hour", "from": "2026-10-01T12:00:00+02:00", "to": "2026-10-01T14:00:00Z"}
+
+    expected = client.get("/statistics/timeseries", params=uncached(naive))
+    response = client.get("/statistics/timeseries", params=uncached(aware))
+    assert response.status_code == 200, response.text
+    assert response.json() == expected.json()
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, createContext, useContext } from 'react';
+import React, { useState, useEffect, useRef, createContext, useContext } from 'react';
 import {
   View,
   Text,
@@ -307,11 +307,43 @@ const StudentTasksScreen = () => {
   const [tasks, setTasks] = useState([]);
   const [loading, setLoading] = useState(true);
   const [refreshing, setRefreshing] = useState(false);
-  const { token } = useAuth();
+  const { token, user } = useAuth();
+  // Copia local para la sincronización incremental (GET /sync): solo se
+  // descargan las tareas y completaciones cambiadas desde el último cursor
+  const syncState = useRef({ cursor: null, tasks: {}, completions: {} });
+
+  const applySync = (data) => {
+    const state = syncState.current;
+    if (data.full) {
+      state.tasks = {};
+      state.completions = {};
+    }
+    data.tasks.forEach((task) => { state.tasks[task.id] = task; });
+    data.completions.forEach((completion) => { state.completions[completion.task_id] = completion; });
+    data.deleted_tasks.forEach((taskId) => {
+      delete state.tasks[taskId];
+      delete state.completions[taskId];
+    });
+    state.cursor = data.cursor;
+
+    // Una tarea sin completación está pendiente
+    return Object.values(state.tasks).map((task) => {
+      const completion = state.completions[task.id] || {};
+      return {
+        submission_id: task.id,
+        task,
+        completed: !!completion.completed,
+        completed_at: completion.completed_at || null,
+        notes: completion.notes || null,
+      };
+    });
+  };
 
   const fetchTasks = async () => {
     try {
-      const response = await fetch(`${API_BASE_URL}/my-tasks`, {
+      const params = new URLSearchParams({ user_id: String(user.id) });
+      if (syncState.current.cursor) params.append('since', syncState.current.cursor);
+      const response = await fetch(`${API_BASE_URL}/sync?${params.toString()}`, {
         headers: {
           'Authorization': `Bearer ${token}`,
         },
@@ -319,7 +351,7 @@ const StudentTasksScreen = () => {
 
       if (response.ok) {
         const data = await response.json();
-        setTasks(data);
+        setTasks(applySync(data));
       }
     } catch (error) {
       Alert.alert('Error', 'No se pudieron cargar las tareas');
@@ -397,7 +429,7 @@ const StudentTasksScreen = () => {
             
             {item.task.image_path && (
               <Image
-                source={{ uri: `${API_BASE_URL}${item.task.image_path}` }}
+                source={{ uri: `${API_BASE_URL}${item.task.image_variants?.thumbnail || item.task.image_path}` }}
                 style={styles.taskImage}
                 resizeMode="contain"
               />
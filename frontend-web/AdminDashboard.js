@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import {
   View,
   Text,
@@ -12,12 +12,35 @@ import {
 } from 'react-native';
 
 const API_URL = 'http://localhost:8000';
+const TREND_DAYS = 14;
+
+// Misma tasa que el servidor (porcentaje con dos decimales)
+const completionRate = (completed, total) => (total > 0 ? Math.round((completed / total) * 10000) / 100 : 0);
+
+// Sumar completadas y asignadas a una fila de estadísticas, con sus pendientes y su tasa
+const applyDelta = (row, keys, completed, total = 0) => {
+  const next = {
+    ...row,
+    [keys.completed]: (row[keys.completed] || 0) + completed,
+    [keys.total]: (row[keys.total] || 0) + total
+  };
+  next[keys.pending] = next[keys.total] - next[keys.completed];
+  next[keys.rate] = completionRate(next[keys.completed], next[keys.total]);
+  return next;
+};
+
+const OVERVIEW_KEYS = { completed: 'completed_assignments', total: 'total_assignments', pending: 'pending_assignments', rate: 'overall_completion_rate' };
+const TASK_KEYS = { completed: 'completed', total: 'total_assignments', pending: 'pending', rate: 'completion_rate' };
+const STUDENT_KEYS = { completed: 'completed_tasks', total: 'total_tasks', pending: 'pending_tasks', rate: 'completion_rate' };
 
 const AdminDashboard = ({ token, username, onLogout }) => {
   const [activeTab, setActiveTab] = useState('students');
   const [students, setStudents] = useState([]);
   const [tasks, setTasks] = useState([]);
   const [stats, setStats] = useState({});
+  const [trend, setTrend] = useState([]);
+  // Última lista de tareas, para los eventos que necesitan sus contadores
+  const tasksRef = useRef([]);
   const [loading, setLoading] = useState(true);
   const [showNewTaskModal, setShowNewTaskModal] = useState(false);
   const [newTask, setNewTask] = useState({
@@ -32,6 +55,82 @@ const AdminDashboard = ({ token, username, onLogout }) => {
     fetchData();
   }, []);
 
+  useEffect(() => {
+    tasksRef.current = tasks;
+  }, [tasks]);
+
+  // Aplicar al estado local los cambios que notifica el servidor (SSE); solo
+  // `resync` (la conexión ha perdido eventos) vuelve a cargarlo todo
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') return;
+    const source = new EventSource(`${API_URL}/events`);
+    let timer = null;
+    // Los eventos de tareas no dicen a qué estudiantes afectan (grupos,
+    // borrados): se recarga solo su lista, agrupando ráfagas
+    const refreshStudents = () => {
+      clearTimeout(timer);
+      timer = setTimeout(fetchStudents, 500);
+    };
+    const listen = (type, handler) => {
+      source.addEventListener(type, (event) => handler(JSON.parse(event.data || '{}')));
+    };
+
+    listen('completion_changed', ({ task_id, student_id, delta }) => {
+      setStats(prev => applyDelta(prev, OVERVIEW_KEYS, delta));
+      setTasks(prev => prev.map(task => (task.task_id === task_id ? applyDelta(task, TASK_KEYS, delta) : task)));
+      setStudents(prev => prev.map(student => (
+        student.student_id === student_id ? applyDelta(student, STUDENT_KEYS, delta) : student
+      )));
+      // Las series solo cuentan completaciones: el día de hoy suma las nuevas
+      if (delta > 0) {
+        const today = `${new Date().toISOString().slice(0, 10)}T00:00:00`;
+        setTrend(prev => (prev.some(point => point.bucket_start === today)
+          ? prev.map(point => (point.bucket_start === today ? { ...point, completed: point.completed + delta } : point))
+          : [...prev, { bucket_start: today, completed: delta }]));
+      }
+    });
+
+    listen('task_created', ({ task_id, group_id, title, created_at, assigned }) => {
+      setStats(prev => ({ ...applyDelta(prev, OVERVIEW_KEYS, 0, assigned), total_tasks: (prev.total_tasks || 0) + 1 }));
+      setTasks(prev => [...prev, applyDelta({ task_id, task_title: title, created_at }, TASK_KEYS, 0, assigned)]);
+      if (group_id == null) {
+        setStudents(prev => prev.map(student => applyDelta(student, STUDENT_KEYS, 0, 1)));
+      } else {
+        refreshStudents();
+      }
+    });
+
+    listen('task_deleted', ({ task_id }) => {
+      const task = tasksRef.current.find(item => item.task_id === task_id);
+      if (task) {
+        setStats(prev => ({
+          ...applyDelta(prev, OVERVIEW_KEYS, -task.completed, -task.total_assignments),
+          total_tasks: prev.total_tasks - 1
+        }));
+      }
+      setTasks(prev => prev.filter(item => item.task_id !== task_id));
+      refreshStudents();
+    });
+
+    listen('resync', fetchData);
+
+    return () => {
+      clearTimeout(timer);
+      source.close();
+    };
+  }, []);
+
+  const fetchStudents = async () => {
+    try {
+      const studentsResponse = await fetch(`${API_URL}/statistics/students`, {
+        headers: { 'Authorization': `Bearer ${token}` }
+      });
+      setStudents(await studentsResponse.json());
+    } catch (error) {
+      Alert.alert('Error', 'No se pudieron cargar los datos');
+    }
+  };
+
   const fetchData = async () => {
     try {
       const statsResponse = await fetch(`${API_URL}/statistics/overview`, {
@@ -51,6 +150,14 @@ const AdminDashboard = ({ token, username, onLogout }) => {
       });
       const tasksData = await tasksResponse.json();
       setTasks(tasksData);
+
+      // Completaciones por día de las dos últimas semanas (series agregadas)
+      const from = new Date(Date.now() - TREND_DAYS * 24 * 60 * 60 * 1000).toISOString().slice(0, 10);
+      const trendResponse = await fetch(`${API_URL}/statistics/timeseries?bucket=day&from=${from}T00:00:00`, {
+        headers: { 'Authorization': `Bearer ${token}` }
+      });
+      const trendData = await trendResponse.json();
+      setTrend(trendData.points || []);
     } catch (error) {
       Alert.alert('Error', 'No se pudieron cargar los datos');
     } finally {
@@ -91,6 +198,17 @@ const AdminDashboard = ({ token, username, onLogout }) => {
         <View style={styles.adminStatCard}><Text style={styles.adminStatLabel}>Tasa de Finalización</Text><Text style={[styles.adminStatValue, { color: '#10b981' }]}>{stats.overall_completion_rate || 0}%</Text></View>
       </View>
 
+      <View style={styles.trendCard}>
+        <Text style={styles.adminStatLabel}>Completadas por día (últimos {TREND_DAYS} días)</Text>
+        <View style={styles.trendBars}>
+          {trend.map(point => (
+            <View key={point.bucket_start} style={styles.trendColumn}>
+              <View style={[styles.trendBar, { height: `${(point.completed / Math.max(1, ...trend.map(p => p.completed))) * 100}%` }]} />
+            </View>
+          ))}
+        </View>
+      </View>
+
       <View style={styles.tabs}>
         <TouchableOpacity style={[styles.tab, activeTab === 'students' && styles.activeTab]} onPress={() => setActiveTab('students')}>
           <Text style={[styles.tabText, activeTab === 'students' && styles.activeTabText]}>👥 Estudiantes</Text>
@@ -147,6 +265,10 @@ const styles = StyleSheet.create({
   adminStatCard: { flex: 1, backgroundColor: 'white', padding: 15, borderRadius: 10, alignItems: 'center', elevation: 3 },
   adminStatLabel: { fontSize: 12, color: '#6b7280', marginBottom: 5 },
   adminStatValue: { fontSize: 24, fontWeight: 'bold', color: '#7c3aed' },
+  trendCard: { backgroundColor: 'white', marginHorizontal: 20, marginBottom: 20, padding: 15, borderRadius: 10, elevation: 3 },
+  trendBars: { flexDirection: 'row', alignItems: 'flex-end', height: 80, gap: 4, marginTop: 10 },
+  trendColumn: { flex: 1, height: '100%', justifyContent: 'flex-end' },
+  trendBar: { backgroundColor: '#7c3aed', borderRadius: 2, minHeight: 1 },
   tabs: { flexDirection: 'row', backgroundColor: 'white', marginHorizontal: 20, borderRadius: 10, padding: 5 },
   tab: { flex: 1, paddingVertical: 10, alignItems: 'center', borderRadius: 8 },
   activeTab: { backgroundColor: '#ede9fe' },
@@ -12,6 +12,7 @@ import {
   Platform
 } from 'react-native';
 import { useNavigation } from '@react-navigation/native';
+import AsyncStorage from '@react-native-async-storage/async-storage';
 
 const API_URL = 'http://localhost:8000';
 
@@ -20,6 +21,7 @@ const StudentDashboard = ({ username, onLogout }) => {
 
   const [tasks, setTasks] = useState([]);
   const [stats, setStats] = useState({ completed: 0, pending: 0, progress: 0 });
+  const [buckets, setBuckets] = useState({ overdue: 0, upcoming: 0 });
   const [loading, setLoading] = useState(true);
   const [selectedTask, setSelectedTask] = useState(null);
   const [debugInfo, setDebugInfo] = useState('');
@@ -37,6 +39,24 @@ const StudentDashboard = ({ username, onLogout }) => {
     return () => clearTimeout(timeoutId);
   }, []);
 
+  // Recargar la lista cuando se crean o borran tareas (SSE)
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') return;
+    let source;
+    let closed = false;
+    AsyncStorage.getItem('user_id').then((userId) => {
+      if (closed) return;
+      source = new EventSource(`${API_URL}/events${userId ? `?user_id=${userId}` : ''}`);
+      ['task_created', 'task_deleted', 'resync'].forEach((type) => {
+        source.addEventListener(type, () => fetchTasks());
+      });
+    });
+    return () => {
+      closed = true;
+      if (source) source.close();
+    };
+  }, []);
+
   // Actualizar estadísticas cada vez que cambian las tareas
   useEffect(() => {
     const completed = tasks.filter(t => t.completed).length;
@@ -51,7 +71,9 @@ const StudentDashboard = ({ username, onLogout }) => {
   const fetchTasks = async () => {
     try {
       setDebugInfo('Obteniendo tareas...');
-      const response = await fetch(`${API_URL}/tasks`, {
+      // Panel del estudiante: sus tareas con su estado y los totales en una petición
+      const userId = await AsyncStorage.getItem('user_id');
+      const response = await fetch(`${API_URL}/users/${userId}/dashboard`, {
         headers: {
           'Content-Type': 'application/json'
         }
@@ -60,14 +82,14 @@ const StudentDashboard = ({ username, onLogout }) => {
       if (!response.ok) throw new Error(`Status: ${response.status}`);
 
       const data = await response.json();
-      const completed = data.filter(t => t.completed).length;
-      const total = data.length;
+      const { summary } = data;
 
-      setTasks(data);
+      setTasks([...data.overdue, ...data.upcoming, ...data.later, ...data.completed]);
+      setBuckets({ overdue: summary.overdue, upcoming: summary.upcoming });
       setStats({
-        completed,
-        pending: total - completed,
-        progress: total > 0 ? Math.round((completed / total) * 100) : 0
+        completed: summary.completed,
+        pending: summary.pending,
+        progress: Math.round(summary.completion_rate)
       });
 
       setDebugInfo('Tareas cargadas correctamente.');
@@ -85,8 +107,10 @@ const StudentDashboard = ({ username, onLogout }) => {
  const toggleTaskCompletion = async (taskId, currentStatus) => {
   const endpoint = currentStatus ? 'uncomplete' : 'complete';
   try {
+    const userId = await AsyncStorage.getItem('user_id');
     const response = await fetch(`${API_URL}/tasks/${taskId}/${endpoint}`, {
-      method: 'PUT'
+      method: 'PUT',
+      body: new URLSearchParams({ user_id: userId })
     });
     if (!response.ok) throw new Error(`Error: ${response.status}`);
 
@@ -226,6 +250,7 @@ const handleLogoutSimple = () => {
         <View style={styles.statCard}>
           <Text style={styles.statLabel}>Tareas Pendientes</Text>
           <Text style={[styles.statValue, { color: '#f97316' }]}>{stats.pending}</Text>
+          <Text style={styles.statDetail}>{buckets.overdue} vencidas · {buckets.upcoming} próximas</Text>
         </View>
         <View style={styles.statCard}>
           <Text style={styles.statLabel}>Progreso Total</Text>
@@ -246,7 +271,7 @@ const handleLogoutSimple = () => {
         ) : (
           tasks.map((item) => (
             <TouchableOpacity key={item.id} style={styles.taskCard} onPress={() => setSelectedTask(item)}>
-              {item.image_path && <Image source={{ uri: `${API_URL}${item.image_path}` }} style={styles.taskImage} />}
+              {item.image_path && <Image source={{ uri: `${API_URL}${item.image_variants?.thumbnail || item.image_path}` }} style={styles.taskImage} />}
               <View style={styles.taskInfo}>
                 <Text style={styles.taskTitle}>{item.title}</Text>
                 <Text style={styles.taskDescription}>{item.description}</Text>
@@ -277,7 +302,7 @@ const handleLogoutSimple = () => {
             <View style={styles.modalContent}>
               <Text style={styles.modalTitle}>{selectedTask.title}</Text>
               {selectedTask.image_path && (
-                <Image source={{ uri: `${API_URL}${selectedTask.image_path}` }} style={styles.modalImage} />
+                <Image source={{ uri: `${API_URL}${selectedTask.image_variants?.medium || selectedTask.image_path}` }} style={styles.modalImage} />
               )}
               <Text style={styles.modalDescription}>{selectedTask.description}</Text>
               <TouchableOpacity
@@ -330,6 +355,7 @@ const styles = StyleSheet.create({
   statCard: { backgroundColor: 'white', padding: 20, borderRadius: 10, marginBottom: 15, elevation: 3 },
   statLabel: { fontSize: 14, color: '#6b7280' },
   statValue: { fontSize: 32, fontWeight: 'bold', color: '#10b981' },
+  statDetail: { fontSize: 12, color: '#9ca3af', marginTop: 5 },
   tasksSection: { padding: 20 },
   refreshButton: { backgroundColor: '#7c3aed', padding: 10, borderRadius: 8, alignItems: 'center', marginBottom: 15 },
   refreshButtonText: { color: 'white', fontWeight: 'bold' },
@@ -49,7 +49,7 @@ export default function App() {
   // Esta función borra sesión y resetea estados
   const handleLogout = async () => {
     try {
-      await AsyncStorage.multiRemove(['user_role', 'username', 'user_info']);
+      await AsyncStorage.multiRemove(['user_role', 'username', 'user_id', 'user_info']);
       setRole(null);
       setUsername(null);
       setIsAuthenticated(false);
@@ -35,9 +35,10 @@ export const login = async (username, password) => {
     }
     const userName = userData.username || username;
 
-    // Guardar solo rol y username
+    // Guardar rol, username e id (el panel del estudiante lo usa)
     await AsyncStorage.setItem('user_role', userRole);
     await AsyncStorage.setItem('username', userName);
+    await AsyncStorage.setItem('user_id', String(userData.user_id));
 
     console.log('User role and username saved:', userRole, userName);
 
@@ -54,7 +55,7 @@ export const login = async (username, password) => {
 
 export const logout = async () => {
   try {
-    await AsyncStorage.multiRemove(['user_role', 'username']);
+    await AsyncStorage.multiRemove(['user_role', 'username', 'user_id']);
     console.log('Logout successful - user data removed');
   } catch (error) {
     console.error('Logout error:', error);